@@ -1,13 +1,86 @@
 # api.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, current_app
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from werkzeug.security import check_password_hash
-from datetime import timedelta
+from datetime import timedelta, datetime, timezone
+import time
 
-from app import db, User, Complaint, ComplaintHistory, assign_nearest_officer, send_fcm_notification
+from models import db, User, Complaint, ComplaintArchive
+
+from utils.pagination import (keyset_page, iter_keyset, keyset_page_then, iter_keyset_then, decode_cursor,
+                              decode_then_cursor, parse_limit)
+from utils.serialize import Projection, dumps, ndjson
+from utils.intake import RateLimited, contact_keys
+from utils.archive import ArchivedComplaint
+from utils import hotspots, search, stats
 
 api = Blueprint("api", __name__, url_prefix="/api")
 
+# what each listing returns; selected with Core, no ORM objects in between
+LIST = Projection(id=Complaint.id, ref_id=Complaint.ref_id, status=Complaint.status,
+                  assigned_officer=Complaint.assigned_officer_id, created_at=Complaint.created_at)
+ARCHIVE_LIST = Projection(id=ComplaintArchive.id, ref_id=ComplaintArchive.ref_id, status=ComplaintArchive.status,
+                          assigned_officer=ComplaintArchive.assigned_officer_id, created_at=ComplaintArchive.created_at)
+OFFICER_LIST = Projection(id=Complaint.id, ref_id=Complaint.ref_id, status=Complaint.status,
+                          extra=(Complaint.created_at,))
+NDJSON = "application/x-ndjson"
+
+def _svc():
+    """The app's services (dispatch, notifications, caches...), handed over by create_app()."""
+    return current_app.extensions["rapid_rescue"]
+
+def _page_args(decode=decode_cursor):
+    """(cursor, limit) from ?cursor=&limit=, raises ValueError on bad input"""
+    token = request.args.get("cursor")
+    return (decode(token) if token else None), parse_limit(request.args.get("limit"))
+
+def _wants_ndjson():
+    return request.args.get("format") == "ndjson" or request.accept_mimetypes.best == NDJSON
+
+def _timestamp(value):
+    """ISO 8601 query parameter as a naive UTC datetime, like created_at; one with an offset is converted."""
+    ts = datetime.fromisoformat(value)
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+def _json(body, status=200):
+    # sorted keys like jsonify, but bytes straight from the encoder
+    return Response(dumps(body, sort_keys=True), status=status, mimetype="application/json")
+
+def _paged(stmt, proj, archive=None):
+    """
+    One keyset page of `stmt` as a JSON array (+ X-Next-Cursor), or with ?format=ndjson /
+    Accept: application/x-ndjson every row from the cursor on, streamed.
+    archive: the same listing on complaint_archive (same columns), paged after the live rows.
+    """
+    try:
+        cursor, limit = _page_args(decode_then_cursor if archive is not None else decode_cursor)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    live = (stmt, Complaint.created_at, Complaint.id)
+    if archive is not None:
+        cursor, then = cursor or (None, False)
+        archived = (archive, ComplaintArchive.created_at, ComplaintArchive.id)
+    if _wants_ndjson():
+        engine = db.engine
+
+        def generate():
+            # own connection: the request's session is gone once streaming starts
+            with engine.connect() as conn:
+                if archive is None:
+                    rows = iter_keyset(*live, conn=conn, cursor=cursor)
+                else:
+                    rows = iter_keyset_then(live, archived, conn=conn, cursor=cursor, then=then)
+                yield from ndjson(rows, proj.row)
+        return Response(generate(), mimetype=NDJSON)
+    if archive is None:
+        rows, next_cursor = keyset_page(*live, cursor, limit, conn=db.session.connection())
+    else:
+        rows, next_cursor = keyset_page_then(live, archived, cursor, then, limit, conn=db.session.connection())
+    resp = _json(proj.rows(rows))
+    if next_cursor:
+        resp.headers["X-Next-Cursor"] = next_cursor
+    return resp
+
 # ---------- AUTH ----------
 @api.post("/login")
 def api_login():
@@ -52,25 +125,20 @@ def create_complaint():
         longitude=data.get("longitude"),
         maps_link=data.get("maps_link"),
     )
-    db.session.add(c); db.session.commit()
-
-    # history
-    db.session.add(ComplaintHistory(
-        complaint_id=c.id, old_status=None, new_status="New", changed_by=f"user:{uid}"
-    )); db.session.commit()
-
-    # auto-assign
-    if c.latitude is not None and c.longitude is not None:
-        officer = assign_nearest_officer(c.latitude, c.longitude)
-        if officer:
-            c.assigned_officer_id = officer.id
-            c.status = "Assigned"
-            officer.is_available = False
-            db.session.commit()
-            if officer.fcm_token:
-                send_fcm_notification(officer.fcm_token, "New Complaint Assigned", c.description or "")
-
-    return jsonify({"id": c.id, "ref_id": c.ref_id, "status": c.status})
+    # a retry with the same Idempotency-Key, or a near-duplicate, gets the original complaint back
+    key = request.headers.get("Idempotency-Key")
+    contacts = contact_keys(c.email, c.phone_number, f"user:{uid}")
+    try:
+        # insert + history + auto-assign, one transaction
+        result, officer = _svc().submit_complaint(c, f"user:{uid}", client=f"user:{uid}", contacts=contacts,
+                                                  key=f"user:{uid}:{key}" if key else None)
+    except RateLimited as e:
+        return jsonify({"msg": "too many complaints, slow down", "retry_after": round(e.retry_after, 1)}), 429, \
+            {"Retry-After": str(int(e.retry_after) + 1)}
+    if officer and officer.fcm_token:
+        _svc().send_fcm_notification(officer.fcm_token, "New Complaint Assigned", c.description or "")
+
+    return jsonify(result)
 
 # ---------- USER: my complaints by email (simple) ----------
 @api.get("/my-complaints")
@@ -78,11 +146,9 @@ def create_complaint():
 def my_complaints():
     from flask_jwt_extended import get_jwt
     email = (get_jwt() or {}).get("username")
-    q = Complaint.query.filter_by(email=email).order_by(Complaint.created_at.desc()).all()
-    return jsonify([{
-        "id": c.id, "ref_id": c.ref_id, "status": c.status,
-        "assigned_officer": c.assigned_officer_id, "created_at": c.created_at
-    } for c in q])
+    # archived complaints are still the reporter's, listed after the live ones
+    return _paged(LIST.select().where(Complaint.email == email), LIST,
+                  archive=ARCHIVE_LIST.select().where(ComplaintArchive.email == email))
 
 # ---------- OFFICER: my assigned ----------
 from utils.jwt_auth import role_required_api
@@ -92,8 +158,7 @@ def officer_assigned():
     from flask_jwt_extended import get_jwt
     claims = get_jwt()
     officer_id = int(claims.get("sub"))  # identity
-    comps = Complaint.query.filter_by(assigned_officer_id=officer_id).all()
-    return jsonify([{"id": c.id, "ref_id": c.ref_id, "status": c.status} for c in comps])
+    return _paged(OFFICER_LIST.select().where(Complaint.assigned_officer_id == officer_id), OFFICER_LIST)
 
 # ---------- OFFICER: update status ----------
 @api.post("/complaints/<int:cid>/status")
@@ -105,38 +170,260 @@ def api_update_status(cid):
         return jsonify({"msg": "status required"}), 400
 
     c = Complaint.query.get_or_404(cid)
-    old = c.status
-    c.status = new_status
-    db.session.commit()
 
-    # history + availability
+    # status + history + availability, one transaction
     from flask_jwt_extended import get_jwt
     changer = (get_jwt() or {}).get("username")
-    db.session.add(ComplaintHistory(
-        complaint_id=c.id, old_status=old, new_status=new_status, changed_by=changer
-    ))
-    if c.assigned_officer_id:
-        officer = User.query.get(c.assigned_officer_id)
-        if officer:
-            if new_status.lower() in ["resolved", "closed"]:
-                officer.is_available = True
-            if officer.fcm_token:
-                send_fcm_notification(officer.fcm_token, "Complaint Status Updated",
-                                      f"Ref {c.ref_id}: {new_status}")
-    db.session.commit()
+    try:
+        officer = _svc().change_status(c, new_status, changer)
+    except ArchivedComplaint:
+        return jsonify({"msg": "complaint has been archived (read-only)"}), 409
+    if officer and officer.fcm_token:
+        _svc().send_fcm_notification(officer.fcm_token, "Complaint Status Updated",
+                              f"Ref {c.ref_id}: {new_status}")
 
     return jsonify({"msg": "updated", "ref_id": c.ref_id, "status": c.status})
 
+# ---------- OFFICER: live location ----------
+MAX_PINGS = 500
+PING_MAX_SKEW = 60          # seconds a device clock may run ahead of ours
+PING_MAX_AGE = 3600         # older fixes (or a ts in milliseconds read as seconds, etc.) are refused
+
+def _parse_ping(p, now):
+    """(lat, lon, ts) from {"latitude", "longitude", "ts"?}, ts in unix seconds. None if unusable."""
+    try:
+        lat, lon = float(p["latitude"]), float(p["longitude"])
+        ts = float(p["ts"]) if p.get("ts") is not None else None
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    if ts is not None and not (now - PING_MAX_AGE <= ts <= now + PING_MAX_SKEW):
+        return None
+    return lat, lon, ts
+
+@api.post("/officer/location")
+@role_required_api("officer")
+def officer_location():
+    """
+    One ping {"latitude", "longitude", "ts"?} or a batch {"pings": [...]}.
+    Only buffered here; the newest fix per officer goes to the DB on the next flush.
+    """
+    from flask_jwt_extended import get_jwt
+    data = request.get_json(silent=True) or {}
+    pings = data.get("pings") if "pings" in data else [data]
+    if not isinstance(pings, list) or not pings:
+        return jsonify({"msg": "latitude/longitude or pings required"}), 400
+    if len(pings) > MAX_PINGS:
+        return jsonify({"msg": f"at most {MAX_PINGS} pings per request"}), 413
+
+    officer_id = int(get_jwt()["sub"])
+    now = time.time()
+    parsed = [_parse_ping(p, now) if isinstance(p, dict) else None for p in pings]
+    valid = [p for p in parsed if p is not None]
+    if not valid:
+        return jsonify({"msg": "no valid pings"}), 400
+    # oldest first so the newest fix of a batch is the one that sticks; across requests arrival decides
+    valid.sort(key=lambda p: now if p[2] is None else p[2])
+    accepted = sum(_svc().officer_locations.record(officer_id, *p, received=now) for p in valid)
+    return jsonify({"accepted": accepted, "rejected": len(pings) - len(valid)}), 202
+
 # ---------- ADMIN: search ----------
 @api.get("/admin/complaints")
 @role_required_api("admin")
 def admin_search():
     ref = (request.args.get("ref") or "").strip()
-    q = Complaint.query
+    stmt = LIST.select()
+    if ref:
+        stmt = stmt.where(Complaint.ref_id.like(f"%{ref}%"))
+    return _paged(stmt, LIST)
+
+# ---------- ADMIN: streaming export ----------
+EXPORT = Projection(
+    id=Complaint.id, ref_id=Complaint.ref_id, status=Complaint.status,
+    assigned_officer_id=Complaint.assigned_officer_id, created_at=Complaint.created_at,
+    reporter_name=Complaint.reporter_name, email=Complaint.email, phone_number=Complaint.phone_number,
+    incident_type=Complaint.incident_type, description=Complaint.description, location=Complaint.location,
+    latitude=Complaint.latitude, longitude=Complaint.longitude,
+)
+
+@api.get("/admin/complaints/export")
+@role_required_api("admin")
+def admin_export():
+    """Whole table (or ?ref= matches) as NDJSON (default) or a JSON array, streamed in keyset batches."""
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in ("ndjson", "json"):
+        return jsonify({"msg": "format must be ndjson or json"}), 400
+    ref = (request.args.get("ref") or "").strip()
+    stmt = EXPORT.select()
     if ref:
-        q = q.filter(Complaint.ref_id.like(f"%{ref}%"))
-    q = q.order_by(Complaint.created_at.desc()).all()
-    return jsonify([{
-        "id": c.id, "ref_id": c.ref_id, "status": c.status,
-        "assigned_officer": c.assigned_officer_id, "created_at": c.created_at
-    } for c in q])
+        stmt = stmt.where(Complaint.ref_id.like(f"%{ref}%"))
+    engine = db.engine
+
+    def generate():
+        with engine.connect() as conn:
+            rows = iter_keyset(stmt, Complaint.created_at, Complaint.id, conn=conn)
+            if fmt == "ndjson":
+                yield from ndjson(rows, EXPORT.row)
+                return
+            yield b"["
+            first = True
+            for chunk in ndjson(rows, EXPORT.row):
+                # same chunks, newline separators turned into commas
+                yield (b"" if first else b",") + chunk.rstrip(b"\n").replace(b"\n", b",")
+                first = False
+            yield b"]"
+
+    mimetype = NDJSON if fmt == "ndjson" else "application/json"
+    return Response(generate(), mimetype=mimetype)
+
+# ---------- ADMIN: batch dispatch ----------
+@api.post("/admin/dispatch/batch")
+@role_required_api("admin")
+def admin_batch_dispatch():
+    data = request.get_json(silent=True) or {}
+    max_km = data.get("max_km")
+    plan = _svc().dispatch_pending(max_km=float(max_km) if max_km is not None else None)
+    return jsonify({
+        "assigned": len(plan),
+        "assignments": [{"complaint_id": cid, "officer_id": oid, "distance_km": round(km, 3)} for cid, oid, km in plan]
+    })
+
+# ---------- ADMIN: dispatch queue ----------
+@api.get("/admin/dispatch/queue")
+@role_required_api("admin")
+def admin_dispatch_queue():
+    """Waiting complaints: depth, oldest wait, time-to-assign percentiles."""
+    return jsonify(_svc().dispatch_queue.metrics())
+
+# ---------- ADMIN: notification delivery stats ----------
+@api.get("/admin/notifications")
+@role_required_api("admin")
+def admin_notification_metrics():
+    return jsonify(_svc().notifications.metrics())
+
+# ---------- ADMIN: slow requests ----------
+@api.get("/admin/slow-requests")
+@role_required_api("admin")
+def admin_slow_requests():
+    """The last requests over SLOW_REQUEST_SECONDS, newest last, each with the SQL it ran."""
+    return jsonify(_svc().profiler.slow_requests())
+
+# ---------- ADMIN: full-text search ----------
+@api.get("/admin/search")
+@role_required_api("admin")
+def admin_fulltext_search():
+    """
+    ?q=chain snatching sector 17  [&status=New,Assigned] [&from=2025-01-01] [&to=2025-02-01]
+    [&bbox=min_lat,min_lon,max_lat,max_lon] [&cursor=] [&limit=]
+    """
+    if not _svc().full_text_search:
+        return jsonify({"msg": "full-text search needs SQLite with migration 2 applied"}), 501
+    q = (request.args.get("q") or "").strip()
+    if not search.build_match(q):
+        return jsonify({"msg": "q required"}), 400
+    try:
+        statuses = [s.strip() for s in request.args.get("status", "").split(",") if s.strip()] or None
+        since = _timestamp(request.args["from"]) if request.args.get("from") else None
+        until = _timestamp(request.args["to"]) if request.args.get("to") else None
+        bbox = None
+        if request.args.get("bbox"):
+            bbox = tuple(float(x) for x in request.args["bbox"].split(","))
+            if len(bbox) != 4:
+                raise ValueError("bbox must be min_lat,min_lon,max_lat,max_lon")
+        cursor = search.decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    # archived complaints come after the live ones, once the archive has its own index (migration 4)
+    rows, next_cursor, truncated = search.search_all(db.session, q, statuses, since, until, bbox, cursor, limit,
+                                                     _svc().search_candidates, archive=_svc().archive_search)
+    resp = _json([{
+        "id": r.id, "ref_id": r.ref_id, "status": r.status, "incident_type": r.incident_type,
+        "location": r.location, "latitude": r.latitude, "longitude": r.longitude,
+        "assigned_officer": r.assigned_officer_id, "created_at": r.created_at, "score": r.score,
+        "archived": bool(r.archived)
+    } for r in rows])
+    if next_cursor:
+        resp.headers["X-Next-Cursor"] = next_cursor
+    if truncated:
+        # only the newest SEARCH_CANDIDATES matches were ranked; narrow q or from/to to reach older ones
+        resp.headers["X-Search-Truncated"] = "1"
+    return resp
+
+# ---------- ADMIN: hotspots ----------
+def _hours_of_day(value):
+    """"22-4" (wraps past midnight) or "8,9,10" -> set of UTC hours"""
+    if "-" in value:
+        start, end = (int(x) for x in value.split("-"))
+        hours = {h % 24 for h in range(start, end + (24 if end < start else 0) + 1)}
+    else:
+        hours = {int(x) for x in value.split(",") if x.strip()}
+    if not hours <= set(range(24)):
+        raise ValueError("hours must be 0-23")
+    return hours
+
+@api.get("/admin/hotspots")
+@role_required_api("admin")
+def admin_hotspots():
+    """
+    Busiest geohash cells: ?from=&to= (default the last 30 days) [&bbox=min_lat,min_lon,max_lat,max_lon]
+    [&type=Theft,Assault] [&hours=22-4] [&precision=1..6] [&limit=20]. Hours are UTC, like created_at.
+    """
+    try:
+        until = _timestamp(request.args["to"]) if request.args.get("to") else None
+        since = _timestamp(request.args["from"]) if request.args.get("from") else \
+            (until or datetime.utcnow()) - timedelta(days=30)
+        bbox = None
+        if request.args.get("bbox"):
+            bbox = tuple(float(x) for x in request.args["bbox"].split(","))
+            if len(bbox) != 4:
+                raise ValueError("bbox must be min_lat,min_lon,max_lat,max_lon")
+        types = [t.strip() for t in request.args.get("type", "").split(",") if t.strip()] or None
+        hours = _hours_of_day(request.args["hours"]) if request.args.get("hours") else None
+        precision = int(request.args.get("precision", hotspots.PRECISION))
+        if not 1 <= precision <= hotspots.PRECISION:
+            raise ValueError(f"precision must be 1-{hotspots.PRECISION}")
+        limit = parse_limit(request.args.get("limit"), default=20)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    total, cells = _svc().ensure_hotspots().top(since, until, bbox, types, hours, precision, limit)
+    return _json({"from": since, "to": until, "precision": precision, "total": total, "cells": cells})
+
+# ---------- ADMIN: counters ----------
+@api.get("/admin/stats")
+@role_required_api("admin")
+def admin_stats():
+    """Precomputed counters by status, incident type, officer and hour (?hours=24 for the hourly window)."""
+    dashboard_cache = _svc().dashboard_cache
+    try:
+        hours = int(request.args.get("hours", 24))
+    except ValueError:
+        return jsonify({"msg": "hours must be an integer"}), 400
+    key = ("stats", hours)
+    body = dashboard_cache.get(key)
+    if body is None:
+        since = stats.hour_bucket(datetime.utcnow() - timedelta(hours=hours - 1)) if hours > 0 else None
+        body = stats.read_stats(db.session.connection(), since)
+        dashboard_cache.set(key, body, tags=["stats"])
+    return jsonify(body)
+
+# ---------- LIVE EVENTS (SSE) ----------
+@api.get("/events")
+def api_events():
+    """
+    text/event-stream of complaint events: officers get their own, admins all of them.
+    EventSource can't send headers, so the token may also come as ?jwt=<access_token>.
+    """
+    from flask_jwt_extended import verify_jwt_in_request, get_jwt
+    try:
+        verify_jwt_in_request(locations=["headers", "query_string"])
+    except Exception as e:
+        return jsonify({"msg": "unauthorized", "error": str(e)}), 401
+    claims = get_jwt() or {}
+    channels = _svc().event_channels(int(claims.get("sub")), claims.get("role"))
+    if channels is None:
+        return jsonify({"msg": "forbidden: role not allowed"}), 403
+    return _svc().event_stream_response(channels)
@@ -1,20 +1,42 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, session, jsonify
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
+from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, session, jsonify, Response, abort
+from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
-from PIL import Image
+import atexit
+import contextlib
 import datetime
-import uuid
+import threading
+import time
 import os
-import smtplib
-import requests
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import uuid
 from functools import wraps
-from math import radians, cos, sin, asin, sqrt
+from types import SimpleNamespace
 from dotenv import load_dotenv
 from flask_jwt_extended import JWTManager
+from sqlalchemy import event, update, bindparam
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.exc import ObjectDeletedError
+from models import db, User, Complaint, ComplaintHistory, ComplaintArchive, ComplaintHistoryArchive, \
+    ComplaintStat, ComplaintHotspot
+from utils.spatial import OfficerIndex, haversine
+from utils.routing import RoadGraph
+from utils.batch_dispatch import BatchWindow, plan_assignments
+from utils.scheduler import DispatchQueue, Ticker
+from utils.notify import NotificationQueue, SmtpSender, FcmSender
+from utils.images import PhotoPipeline
+from utils.pagination import keyset_page, keyset_page_then, decode_cursor, decode_then_cursor, parse_limit
+from utils.migrations import apply_migrations, has_migration
+from utils.db_profile import engine_options, configure_engine
+from utils.cache import FragmentCache
+from utils.events import Broker, sse_stream
+from utils.locations import LocationBuffer
+from utils.serialize import FastJSONProvider
+from utils.metrics import REGISTRY, RequestProfiler, timed
+from utils.archive import Archiver, ArchivedComplaint
+from utils.hotspots import HotspotIndex
+from utils.intake import IntakeGuard, RateLimiter, RateLimited, contact_keys
+from utils import hotspots
+from utils import stats
+from utils import coordination
 
 # ---------------- CONFIG ----------------
 load_dotenv()
@@ -23,8 +45,13 @@ app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "fallback_secret")
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL", "sqlite:///police.db")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# "production" = WAL + tuned pragmas + single writer on SQLite, pooled + pre-ping elsewhere
+DB_PROFILE = os.getenv("DB_PROFILE", "production")
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], DB_PROFILE)
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "jwt_fallback")
 jwt = JWTManager(app)
+# orjson behind jsonify when installed, same output as Flask's encoder
+app.json = FastJSONProvider(app)
 
 UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "static/uploads")
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -33,9 +60,62 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 FCM_SERVER_KEY = os.getenv("FCM_SERVER_KEY")
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+FCM_URL = os.getenv("FCM_URL", "https://fcm.googleapis.com/fcm/send")
+NOTIFY_TIMEOUT = float(os.getenv("NOTIFY_TIMEOUT", "10"))
+FCM_BATCH_WINDOW = float(os.getenv("FCM_BATCH_WINDOW", "0.5"))  # 0 = one request per message
+FCM_BATCH_MAX = int(os.getenv("FCM_BATCH_MAX", "1000"))          # registration_ids per request
+
+# "immediate" = greedy nearest officer per complaint, "batch" = collect and match in bulk
+DISPATCH_MODE = os.getenv("DISPATCH_MODE", "immediate")
+DISPATCH_WINDOW_SECONDS = float(os.getenv("DISPATCH_WINDOW_SECONDS", "2"))
+DISPATCH_MAX_KM = float(os.getenv("DISPATCH_MAX_KM", "50"))
+# road-distance dispatch: set to a local OSM extract (.osm/.osm.gz/.osm.bz2) to rank officers by travel time
+ROAD_GRAPH_PATH = os.getenv("ROAD_GRAPH_PATH")
+ROUTE_CANDIDATES = int(os.getenv("ROUTE_CANDIDATES", "8"))    # straight-line nearest officers to route
+# complaints nobody could take wait in a priority queue; their search radius starts at DISPATCH_BASE_KM
+# and grows by DISPATCH_RADIUS_GROWTH_KM per minute of waiting, past DISPATCH_MAX_KM anyone will do
+DISPATCH_BASE_KM = float(os.getenv("DISPATCH_BASE_KM", "10"))
+DISPATCH_RADIUS_GROWTH_KM = float(os.getenv("DISPATCH_RADIUS_GROWTH_KM", "5"))
+DISPATCH_TICK_SECONDS = float(os.getenv("DISPATCH_TICK_SECONDS", "10"))
+
+# live dashboard updates (Server-Sent Events); seconds between keep-alive comments on idle streams
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+
+# request / SQL profiling behind /metrics; requests slower than SLOW_REQUEST_SECONDS are logged with their queries
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")      # if set, /metrics wants "Authorization: Bearer <token>"
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+
+# resolved / closed complaints untouched for ARCHIVE_AFTER_DAYS move to the archive tables (0 = never)
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "500"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+# hotspot counts are kept in memory for /api/admin/hotspots; the last couple of hours are re-read
+# from the table this often to pick up other processes' complaints
+HOTSPOT_REFRESH_SECONDS = float(os.getenv("HOTSPOT_REFRESH_SECONDS", "60"))
+
+# repeats of a recent complaint (same Idempotency-Key, or same phone / email within INTAKE_DUPLICATE_KM and a
+# similar description) get the original back for INTAKE_DUPLICATE_WINDOW seconds (0 = off); new complaints
+# are limited per client to INTAKE_BURST at once, refilled at INTAKE_RATE_PER_MIN (0 = no limit)
+INTAKE_DUPLICATE_WINDOW = float(os.getenv("INTAKE_DUPLICATE_WINDOW", "600"))
+INTAKE_DUPLICATE_KM = float(os.getenv("INTAKE_DUPLICATE_KM", "0.5"))
+INTAKE_SIMILARITY = float(os.getenv("INTAKE_SIMILARITY", "0.6"))     # trigram overlap of the descriptions, 0..1
+INTAKE_RATE_PER_MIN = float(os.getenv("INTAKE_RATE_PER_MIN", "6"))
+INTAKE_BURST = int(os.getenv("INTAKE_BURST", "5"))
+
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1") == "1"
+# several worker processes on one SQLite database (serve.py / wsgi.py turn it on), see utils/coordination.py
+MULTIPROCESS = os.getenv("MULTIPROCESS", "0") == "1"
+SYNC_POLL_SECONDS = float(os.getenv("SYNC_POLL_SECONDS", "0.2"))          # how soon workers see each other's changes
+SYNC_RETENTION_SECONDS = float(os.getenv("SYNC_RETENTION_SECONDS", "600"))
 
 # ---------------- INIT ----------------
-db = SQLAlchemy(app)
+# models live in models.py; engine setup, schema and background work wait for create_app()
+db.init_app(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = "login"
@@ -45,90 +125,712 @@ def load_user(user_id):
     # ✅ Fixed: SQLAlchemy 2.x compatible
     return db.session.get(User, int(user_id))
 
-# ---------------- MODELS ----------------
-class User(UserMixin, db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(100), unique=True, nullable=False)
-    password = db.Column(db.String(200), nullable=False)
-    role = db.Column(db.String(20), default='user')  # 'user', 'officer', 'admin'
-    latitude = db.Column(db.Float)
-    longitude = db.Column(db.Float)
-    fcm_token = db.Column(db.String(255))
-    is_available = db.Column(db.Boolean, default=True)  # ✅ Added column to fix error
-
-class Complaint(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    ref_id = db.Column(db.String(12), unique=True, default=lambda: uuid.uuid4().hex[:12].upper())
-    reporter_name = db.Column(db.String(100))
-    email = db.Column(db.String(100))
-    phone_number = db.Column(db.String(15))
-    incident_type = db.Column(db.String(100))
-    description = db.Column(db.Text)
-    location = db.Column(db.String(200))
-    latitude = db.Column(db.Float)
-    longitude = db.Column(db.Float)
-    maps_link = db.Column(db.String(300))
-    photo_path = db.Column(db.String(300))
-    status = db.Column(db.String(50), default="New")
-    assigned_officer_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-
-class ComplaintHistory(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    complaint_id = db.Column(db.Integer, db.ForeignKey('complaint.id'))
-    old_status = db.Column(db.String(50))
-    new_status = db.Column(db.String(50))
-    changed_by = db.Column(db.String(100))
-    timestamp = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-
-with app.app_context():
-    db.create_all()
+db_writer = None    # WriterLock from configure_engine(), set by create_app()
+
+profiler = RequestProfiler(slow_seconds=SLOW_REQUEST_SECONDS)
+
+def _prune_fcm_tokens(tokens):
+    # FCM says these devices are gone, stop pushing to them
+    with app.app_context():
+        User.query.filter(User.fcm_token.in_(tokens)).update({User.fcm_token: None}, synchronize_session=False)
+        db.session.commit()
+
+os.makedirs(app.instance_path, exist_ok=True)
+notifications = NotificationQueue(
+    os.getenv("NOTIFY_QUEUE_PATH", os.path.join(app.instance_path, "notifications.db")),
+    {
+        "email": SmtpSender(SMTP_HOST, SMTP_PORT, EMAIL_ADDRESS, EMAIL_PASSWORD, SMTP_STARTTLS, NOTIFY_TIMEOUT),
+        "fcm": FcmSender(FCM_URL, FCM_SERVER_KEY, NOTIFY_TIMEOUT, FCM_BATCH_WINDOW, FCM_BATCH_MAX, _prune_fcm_tokens),
+    },
+    workers=int(os.getenv("NOTIFY_WORKERS", "2")),
+    max_attempts=int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5")),
+)
+
+def _photo_ready(complaint_id, paths):
+    with app.app_context():
+        Complaint.query.filter_by(id=complaint_id).update({Complaint.photo_path: paths["full"]})
+        db.session.commit()
+
+photos = PhotoPipeline(UPLOAD_FOLDER, workers=int(os.getenv("PHOTO_WORKERS", "2")), on_done=_photo_ready)
 
 # ---------------- HELPERS ----------------
+@timed("send_email")
 def send_email(to_email, subject, body):
     try:
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_ADDRESS
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-        server.send_message(msg)
-        server.quit()
+        notifications.enqueue("email", {"from": EMAIL_ADDRESS, "to": to_email, "subject": subject, "body": body})
     except Exception as e:
         print("Email Error:", e)
 
+@timed("send_fcm_notification")
 def send_fcm_notification(token, title, body):
-    headers = {
-        'Authorization': f'key={FCM_SERVER_KEY}',
-        'Content-Type': 'application/json',
-    }
-    payload = {
-        'to': token,
-        'notification': {'title': title, 'body': body}
-    }
     try:
-        requests.post('https://fcm.googleapis.com/fcm/send', headers=headers, json=payload)
+        notifications.enqueue("fcm", {"token": token, "title": title, "body": body})
     except Exception as e:
         print("FCM Error:", e)
 
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    return R * c
+officer_index = OfficerIndex(cell_km=float(os.getenv("DISPATCH_CELL_KM", "5")))
+road_graph = RoadGraph.load(ROAD_GRAPH_PATH, cache_size=int(os.getenv("ROUTE_CACHE_SIZE", "100000"))) \
+    if ROAD_GRAPH_PATH else None
+
+def _write_locations(rows):
+    # Core executemany: one statement for the whole flush, and no ORM events (the index already moved)
+    stmt = User.__table__.update().where(User.__table__.c.id == bindparam("oid")).values(
+        latitude=bindparam("lat"), longitude=bindparam("lon"))
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(stmt, [{"oid": oid, "lat": lat, "lon": lon} for oid, lat, lon, _ in rows])
+            if feed is not None:
+                feed.write(conn, {"positions": [[oid, lat, lon] for oid, lat, lon, _ in rows]})
+
+# live positions from /api/officer/location; the dispatcher reads these before the DB catches up
+# a ping older than LOCATION_TTL_SECONDS no longer overrides the officer's row (e.g. an admin's edit)
+officer_locations = LocationBuffer(_write_locations, interval=float(os.getenv("LOCATION_FLUSH_SECONDS", "2")),
+                                   on_update=officer_index.move, ttl=float(os.getenv("LOCATION_TTL_SECONDS", "120")))
+atexit.register(officer_locations.shutdown)
 
+def current_position(officer_id, lat, lon):
+    """Newest known position: the last ping if there is one, else what the DB row says."""
+    return officer_locations.latest(officer_id, (lat, lon))
+
+def _ensure_officer_index():
+    if not officer_index.loaded:
+        rows = db.session.query(User.id, User.latitude, User.longitude).filter_by(role='officer', is_available=True).all()
+        officer_index.load((oid, *current_position(oid, lat, lon)) for oid, lat, lon in rows)
+
+def dispatch_order(lat, lon, k, max_km=None):
+    """
+    Up to k available officer ids within max_km, best first. With a road graph the
+    ROUTE_CANDIDATES straight-line nearest are re-ranked by travel time; otherwise straight line.
+    """
+    _ensure_officer_index()
+    if road_graph is None:
+        return [oid for oid, _ in officer_index.k_nearest(lat, lon, k, max_km)]
+    near = [(oid, officer_index.position(oid))
+            for oid, _ in officer_index.k_nearest(lat, lon, max(k, ROUTE_CANDIDATES), max_km)]
+    ranked = road_graph.rank(lat, lon, [(oid, *pos) for oid, pos in near if pos is not None])
+    return [oid for oid, _ in ranked[:k]]
+
+@timed("assign_nearest_officer")
 def assign_nearest_officer(lat, lon):
-    officers = User.query.filter_by(role='officer', is_available=True).all()
-    if not officers:
+    if lat is None or lon is None:
+        return None
+    _ensure_officer_index()
+    ids = dispatch_order(lat, lon, 1)
+    officer_id = ids[0] if ids else officer_index.nearest(lat, lon)
+    if officer_id is None:
+        return None
+    return db.session.get(User, officer_id)
+
+@timed("dispatch_pending")
+def dispatch_pending(max_km=None, limit=500):
+    """
+    Match every waiting "New" complaint to an available officer in one batch,
+    minimising the total travel distance. Returns [(complaint_id, officer_id, km)].
+    """
+    max_km = DISPATCH_MAX_KM if max_km is None else max_km
+    pending = db.session.query(Complaint.id, Complaint.latitude, Complaint.longitude).filter(
+        Complaint.status == "New",
+        Complaint.assigned_officer_id.is_(None),
+        Complaint.latitude.isnot(None),
+        Complaint.longitude.isnot(None),
+    ).order_by(Complaint.created_at).limit(limit).all()
+    if not pending:
+        return []
+
+    # an optimal matching of n complaints only ever uses each complaint's n nearest officers
+    _ensure_officer_index()
+    candidates = set()
+    for _, lat, lon in pending:
+        candidates.update(oid for oid, _ in officer_index.k_nearest(lat, lon, len(pending), max_km))
+    if not candidates:
+        return []
+    officers = [(oid, *current_position(oid, lat, lon)) for oid, lat, lon in db.session.query(
+        User.id, User.latitude, User.longitude
+    ).filter(User.id.in_(candidates), User.is_available == True)]
+
+    # complaints and officers taken by a concurrent intake (or another worker's batch) since we read
+    # them are skipped; the complaint waits for the next batch, the officer is left to whoever has them
+    done = []
+    for cid, oid, km in plan_assignments(pending, officers, max_km):
+        if not _take_complaint(cid, oid):
+            continue
+        if not _take_officer(oid):
+            _untake_complaint(cid)
+            continue
+        db.session.add(ComplaintHistory(complaint_id=cid, old_status="New", new_status="Assigned", changed_by="dispatch"))
+        done.append((cid, oid, km))
+    db.session.commit()
+    if not done:
+        return []
+    assigned = {u.id: u for u in User.query.filter(User.id.in_([p[1] for p in done]))}
+    descriptions = dict(db.session.query(Complaint.id, Complaint.description).filter(
+        Complaint.id.in_([p[0] for p in done])))
+
+    for cid, oid, _ in done:
+        if assigned[oid].fcm_token:
+            send_fcm_notification(assigned[oid].fcm_token, "New Complaint Assigned", descriptions[cid] or "")
+    return done
+
+def _run_batch_dispatch():
+    with app.app_context():
+        try:
+            dispatch_pending()
+        except Exception as e:
+            db.session.rollback()
+            print("Batch Dispatch Error:", e)
+
+batch_window = BatchWindow(DISPATCH_WINDOW_SECONDS, _run_batch_dispatch)
+
+# keep the index in step with committed officer changes
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+def _track_officer_change(mapper, connection, target):
+    pending = object_session(target).info.setdefault("officer_index", {})
+    pending[target.id] = (target.role == 'officer' and bool(target.is_available), target.latitude, target.longitude)
+
+@event.listens_for(User, "after_delete")
+def _track_officer_delete(mapper, connection, target):
+    object_session(target).info.setdefault("officer_index", {})[target.id] = (False, None, None)
+
+@event.listens_for(Session, "after_commit")
+def _apply_officer_changes(session):
+    pending = session.info.pop("officer_index", None)
+    if not pending or not officer_index.loaded:
+        return
+    for oid, (available, lat, lon) in pending.items():
+        officer_index.update(oid, *current_position(oid, lat, lon), available)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_officer_changes(session):
+    session.info.pop("officer_index", None)
+
+@timed("reserve_nearest_officer")
+def reserve_nearest_officer(lat, lon, candidates=5, max_km=None):
+    """
+    Take the nearest available officer (within max_km) out of the pool inside the
+    current transaction. The conditional UPDATE only succeeds for one transaction, so
+    two complaints can never both get the same officer. Returns the User or None.
+    """
+    if lat is None or lon is None:
         return None
-    nearest = min(officers, key=lambda o: haversine(lat, lon, o.latitude, o.longitude) if o.latitude and o.longitude else float('inf'))
-    return nearest
+    ids = dispatch_order(lat, lon, candidates, max_km)
+    if not ids and max_km is None:
+        fallback = officer_index.nearest(lat, lon)
+        ids = [fallback] if fallback is not None else []
+    tried = set()
+    while ids:
+        for oid in ids:
+            tried.add(oid)
+            if _take_officer(oid):
+                return db.session.get(User, oid, populate_existing=True)
+        # every candidate went to a concurrent intake (and left the index): try the next ones in range
+        ids = [oid for oid in dispatch_order(lat, lon, candidates + len(tried), max_km) if oid not in tried]
+    return None
+
+def _take_officer(officer_id):
+    taken = db.session.execute(
+        update(User).where(User.id == officer_id, User.role == 'officer', User.is_available == True)
+        .values(is_available=False)
+    ).rowcount
+    if taken:
+        # Core updates skip the ORM events, tell the index ourselves on commit
+        db.session.info.setdefault("officer_index", {})[officer_id] = (False, None, None)
+    else:
+        # stale index entry: someone else already has this officer
+        officer_index.remove(officer_id)
+    return bool(taken)
+
+def _take_complaint(complaint_id, officer_id):
+    # same idea as _take_officer: only a complaint that is still waiting can be handed out
+    return bool(db.session.execute(
+        update(Complaint).where(Complaint.id == complaint_id, Complaint.status == "New",
+                                Complaint.assigned_officer_id.is_(None))
+        .values(assigned_officer_id=officer_id, status="Assigned")
+    ).rowcount)
+
+def _untake_complaint(complaint_id):
+    # undo our own _take_complaint when the officer turned out to be gone; nobody else can see it yet
+    db.session.execute(update(Complaint).where(Complaint.id == complaint_id)
+                       .values(assigned_officer_id=None, status="New"))
+
+# ---------------- DISPATCH QUEUE ----------------
+dispatch_queue = DispatchQueue(base_km=DISPATCH_BASE_KM, growth_km_per_min=DISPATCH_RADIUS_GROWTH_KM,
+                               max_km=DISPATCH_MAX_KM)
+
+def _utc_ts(dt):
+    return dt.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+def _ensure_dispatch_queue():
+    if not dispatch_queue.loaded:
+        rows = db.session.query(Complaint.id, Complaint.latitude, Complaint.longitude, Complaint.incident_type,
+                                Complaint.created_at).filter(
+            Complaint.status == "New", Complaint.assigned_officer_id.is_(None)).all()
+        dispatch_queue.load((cid, lat, lon, kind, _utc_ts(created)) for cid, lat, lon, kind, created in rows)
+        if len(dispatch_queue):
+            dispatch_ticker.start()
+
+def _enqueue_waiting(complaint):
+    _ensure_dispatch_queue()
+    if dispatch_queue.push(complaint.id, complaint.latitude, complaint.longitude, complaint.incident_type,
+                           _utc_ts(complaint.created_at)):
+        dispatch_ticker.start()
+
+def _assign_waiting(complaint_id, officer, changed_by):
+    """Give a waiting complaint to an officer already taken in this transaction. False if it's gone."""
+    if not _take_complaint(complaint_id, officer.id):
+        return False
+    db.session.add(ComplaintHistory(complaint_id=complaint_id, old_status="New", new_status="Assigned",
+                                    changed_by=changed_by))
+    return True
+
+def _notify_assigned(officer, complaint_id):
+    if officer.fcm_token:
+        c = db.session.get(Complaint, complaint_id)
+        send_fcm_notification(officer.fcm_token, "New Complaint Assigned", (c.description if c else "") or "")
+
+def run_dispatch_queue(now=None):
+    """
+    One escalation pass: retry every waiting complaint, highest priority first,
+    with the radius it has grown to. Returns [(complaint_id, officer_id)] assigned.
+    """
+    _ensure_dispatch_queue()
+    if DISPATCH_MODE == "batch":
+        if len(dispatch_queue):
+            batch_window.nudge()
+        return []
+    _ensure_officer_index()
+    done = []
+    for cid, lat, lon, radius in dispatch_queue.waiting(now):
+        if not len(officer_index):
+            break
+        officer = reserve_nearest_officer(lat, lon, max_km=radius)
+        if officer is None:
+            db.session.rollback()
+            continue
+        if not _assign_waiting(cid, officer, "scheduler"):
+            # assigned or closed behind our back, the officer goes back to the pool
+            db.session.rollback()
+            dispatch_queue.discard(cid)
+            continue
+        db.session.commit()
+        if radius is None or radius > DISPATCH_BASE_KM:
+            dispatch_queue.escalated += 1
+        _notify_assigned(officer, cid)
+        done.append((cid, officer.id))
+    return done
+
+def _run_dispatch_tick():
+    with app.app_context():
+        try:
+            # every worker keeps the queue, one of them works it
+            if leases is not None and not leases.acquire("dispatch-queue", DISPATCH_TICK_SECONDS * 3):
+                return
+            run_dispatch_queue()
+        except Exception as e:
+            db.session.rollback()
+            print("Dispatch Queue Error:", e)
+
+dispatch_ticker = Ticker(DISPATCH_TICK_SECONDS, _run_dispatch_tick)
+
+def register_complaint(complaint, changed_by):
+    """
+    Insert a complaint, its first history row and (in immediate mode) the
+    officer assignment as one transaction. Returns the assigned officer or None.
+    Notifications are the caller's job, after this returns.
+    """
+    db.session.add(complaint)
+    db.session.flush()
+    db.session.add(ComplaintHistory(complaint_id=complaint.id, old_status=None, new_status="New", changed_by=changed_by))
+    officer = None
+    if DISPATCH_MODE != "batch":
+        # a free officer anywhere in range beats waiting for the ticker; the growing radius is for the queue
+        officer = reserve_nearest_officer(complaint.latitude, complaint.longitude, max_km=DISPATCH_MAX_KM)
+        if officer:
+            complaint.assigned_officer_id = officer.id
+            complaint.status = "Assigned"
+            db.session.add(ComplaintHistory(complaint_id=complaint.id, old_status="New", new_status="Assigned",
+                                            changed_by="dispatch"))
+    if officer is None and feed is not None:
+        # for the other workers' queues, see _share_changes
+        db.session.info.setdefault("queued", []).append(
+            [complaint.id, complaint.latitude, complaint.longitude, complaint.incident_type,
+             _utc_ts(complaint.created_at)])
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    if officer is None:
+        _enqueue_waiting(complaint)
+    if DISPATCH_MODE == "batch":
+        batch_window.nudge()
+    return officer
+
+def change_status(complaint, new_status, changed_by):
+    """
+    Status change, history row and officer release in one transaction.
+    A released officer is handed the best waiting complaint in range straight
+    away, in the same transaction, and only goes back to the pool if there is none.
+    Returns the assigned officer (or None) so the caller can notify them.
+    Raises ArchivedComplaint if the complaint has been archived meanwhile.
+    """
+    # the status we read may be stale by now (a second tap, another worker): only move it from
+    # the one we saw, otherwise re-read and go from there, so an officer is released once
+    cid = complaint.id
+    while True:
+        try:
+            old_status = complaint.status
+        except ObjectDeletedError:
+            # the archive pass moved it out since it was loaded
+            db.session.rollback()
+            raise ArchivedComplaint(cid)
+        if db.session.execute(update(Complaint).where(Complaint.id == cid, Complaint.status == old_status)
+                              .values(status=new_status)).rowcount:
+            break
+        db.session.expire(complaint)
+    complaint.status = new_status
+    db.session.add(ComplaintHistory(
+        complaint_id=complaint.id, old_status=old_status, new_status=new_status, changed_by=changed_by
+    ))
+    officer = db.session.get(User, complaint.assigned_officer_id) if complaint.assigned_officer_id else None
+    handed = None
+    closed = ["resolved", "closed"]
+    if officer and new_status.lower() in closed and (old_status or "").lower() not in closed:
+        handed = _hand_off(officer)
+        if handed is None:
+            officer.is_available = True
+    db.session.commit()
+    if handed is not None:
+        dispatch_queue.handoffs += 1
+        _notify_assigned(officer, handed)
+    return officer
+
+def _hand_off(officer):
+    if DISPATCH_MODE == "batch":
+        return None
+    _ensure_dispatch_queue()
+    if not len(dispatch_queue):
+        return None
+    lat, lon = current_position(officer.id, officer.latitude, officer.longitude)
+    if lat is None or lon is None:
+        return None
+    for cid in dispatch_queue.candidates_for(lat, lon, haversine):
+        if _assign_waiting(cid, officer, "scheduler"):
+            return cid
+    return None
+
+# ---------------- INTAKE GUARD ----------------
+intake_guard = IntakeGuard(window=INTAKE_DUPLICATE_WINDOW, radius_km=INTAKE_DUPLICATE_KM,
+                           min_similarity=INTAKE_SIMILARITY) if INTAKE_DUPLICATE_WINDOW > 0 else None
+intake_limiter = RateLimiter(INTAKE_RATE_PER_MIN / 60, INTAKE_BURST) if INTAKE_RATE_PER_MIN > 0 else None
+
+def submit_complaint(complaint, changed_by, client, contacts=(), key=None):
+    """
+    register_complaint() behind the intake guard, for the intake routes. Returns (result, officer):
+    result is {"id", "ref_id", "status", "duplicate"}; a duplicate comes back with the original's
+    values as they were when it was filed, without a write, and officer None. Raises RateLimited
+    when `client` is over its intake rate.
+    """
+    ticket = None
+    if intake_guard is not None:
+        original, ticket = intake_guard.claim(contacts, complaint.latitude, complaint.longitude,
+                                              complaint.location, complaint.description, key)
+        if original is not None:
+            return dict(original, duplicate=True), None
+    try:
+        if intake_limiter is not None:
+            allowed, retry_after = intake_limiter.allow(client)
+            if not allowed:
+                raise RateLimited(retry_after)
+        if ticket is not None and feed is not None:
+            # for the other workers' guards, see _share_changes
+            db.session.info.setdefault("intake", []).append((complaint, sorted(contacts), key))
+        officer = register_complaint(complaint, changed_by)
+    except BaseException:
+        if ticket is not None:
+            intake_guard.abandon(ticket)
+        raise
+    result = {"id": complaint.id, "ref_id": complaint.ref_id, "status": complaint.status}
+    if ticket is not None:
+        intake_guard.complete(ticket, result)
+    return dict(result, duplicate=False), officer
+
+# ---------------- HOTSPOTS ----------------
+hotspot_index = HotspotIndex()
+
+def ensure_hotspots():
+    """Load the hotspot counts on first use, refresh the recent hours every HOTSPOT_REFRESH_SECONDS."""
+    q = db.select(ComplaintHotspot.hour, ComplaintHotspot.cell, ComplaintHotspot.incident_type, ComplaintHotspot.value)
+    if hotspot_index.loaded_at is None:
+        hotspot_index.load(db.session.execute(q).all())
+    elif time.time() - hotspot_index.refreshed_at > HOTSPOT_REFRESH_SECONDS:
+        # complaints are counted in the hour they're filed, older hours don't change (bulk imports aside)
+        since = hotspots.hour_of(datetime.datetime.utcnow()) - 1
+        hotspot_index.refresh(db.session.execute(q.where(ComplaintHotspot.hour >= since)).all(), since)
+    return hotspot_index
+
+# rendered dashboard pages / stats, dropped by tag when the complaints behind them change
+dashboard_cache = FragmentCache(maxsize=int(os.getenv("DASHBOARD_CACHE_SIZE", "2048")),
+                                ttl=float(os.getenv("DASHBOARD_CACHE_TTL", "30")))
+
+@event.listens_for(ComplaintHistory, "after_insert")
+def _count_history(mapper, connection, target):
+    row = connection.execute(
+        db.select(Complaint.ref_id, Complaint.assigned_officer_id, Complaint.incident_type, Complaint.created_at,
+                  Complaint.email, Complaint.latitude, Complaint.longitude)
+        .where(Complaint.id == target.complaint_id)
+    ).first()
+    if row is None:
+        return
+    stats.apply_deltas(connection, stats.history_deltas(
+        target.old_status, target.new_status, row.assigned_officer_id, row.incident_type, row.created_at
+    ))
+    info = object_session(target).info
+    spot = hotspots.complaint_row(row.latitude, row.longitude, row.incident_type, row.created_at) \
+        if target.old_status is None else None
+    if spot:
+        hotspots.apply_rows(connection, [spot + (1,)])
+        info.setdefault("hotspots", []).append(spot + (1,))
+    tags = info.setdefault("cache_tags", set())
+    tags.update(("admin", "stats", f"user:{row.email}"))
+    if row.assigned_officer_id:
+        tags.add(f"officer:{row.assigned_officer_id}")
+    info.setdefault("events", []).append(_history_event(target, row))
+    if target.new_status != "New":
+        info.setdefault("dispatched", {})[target.complaint_id] = target.new_status
+
+@event.listens_for(Session, "after_commit")
+def _drop_dispatched(session):
+    done = session.info.pop("dispatched", None)
+    if done:
+        now = time.time()
+        for cid, status in done.items():
+            dispatch_queue.discard(cid, assigned_at=now if status == "Assigned" else None)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_dispatched(session):
+    session.info.pop("dispatched", None)
+
+@event.listens_for(Session, "after_commit")
+def _count_hotspots(session):
+    rows = session.info.pop("hotspots", None)
+    if rows and hotspot_index.loaded_at is not None:
+        hotspot_index.add(rows)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_hotspots(session):
+    session.info.pop("hotspots", None)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_dashboards(session):
+    tags = session.info.pop("cache_tags", None)
+    if tags:
+        dashboard_cache.invalidate(*tags)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_cache_tags(session):
+    session.info.pop("cache_tags", None)
+
+# ---------------- LIVE EVENTS ----------------
+# every history row becomes an event: intake ("New"), assignment and status changes.
+# Published after commit only, so nobody is told about a change that was rolled back.
+events = Broker()
+
+def _history_event(history, row):
+    if history.old_status is None:
+        kind = "complaint.new"
+    elif history.new_status == "Assigned":
+        kind = "complaint.assigned"
+    else:
+        kind = "complaint.status"
+    return {
+        "type": kind, "complaint_id": history.complaint_id, "ref_id": row.ref_id,
+        "old_status": history.old_status, "new_status": history.new_status,
+        "officer_id": row.assigned_officer_id, "incident_type": row.incident_type,
+        "changed_by": history.changed_by,
+    }
+
+@event.listens_for(Session, "after_commit")
+def _publish_events(session):
+    pending = session.info.pop("events", None)
+    if not pending:
+        return
+    now = time.time()
+    for ev in pending:
+        ev["at"] = now
+        _publish(ev)
+
+def _publish(ev):
+    channels = ["admin"]
+    if ev["officer_id"]:
+        channels.append(f"officer:{ev['officer_id']}")
+    events.publish(channels, ev)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_events(session):
+    session.info.pop("events", None)
+
+def event_channels(user_id, role):
+    """Channels a user may listen on: officers their own complaints, admins everything."""
+    if role == "admin":
+        return ["admin"]
+    if role == "officer":
+        return [f"officer:{user_id}"]
+    return None
+
+def event_stream_response(channels):
+    return Response(sse_stream(events, channels, heartbeat=EVENTS_HEARTBEAT), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ---------------- ARCHIVE ----------------
+archiver = None     # needs the engine, set by create_app()
+
+def _archived(ids):
+    # archived complaints drop off every dashboard page, cheaper to start over than to work out which
+    dashboard_cache.clear()
+    if feed is not None:
+        feed.publish({"clear": True})
+
+def _run_archive_tick():
+    with app.app_context():
+        try:
+            # one pass per interval across all workers
+            if leases is not None and not leases.acquire("archive", ARCHIVE_INTERVAL_SECONDS):
+                return
+            archiver.run()
+        except Exception as e:
+            print("Archive Error:", e)
+
+archive_ticker = Ticker(ARCHIVE_INTERVAL_SECONDS, _run_archive_tick, name="archive")
+
+def find_complaint(cid):
+    """Complaint by id, from the live table or else the archive (read-only there). None if neither has it."""
+    return db.session.get(Complaint, cid) or db.session.get(ComplaintArchive, cid)
+
+# ---------------- COORDINATION ----------------
+# With MULTIPROCESS=1 every commit that the after_commit hooks above act on is also written to
+# sync_log, and the other workers replay it through _apply_remote. See utils/coordination.py.
+feed = None
+leases = None
+
+@event.listens_for(Session, "before_commit")
+def _share_changes(session):
+    if feed is None:
+        return
+    # the flush is what fills session.info, commit would only run it after this hook
+    session.flush()
+    info = session.info
+    body = {}
+    if info.get("officer_index"):
+        body["officers"] = [[oid, *state] for oid, state in info["officer_index"].items()]
+    if info.get("cache_tags"):
+        body["tags"] = sorted(info["cache_tags"])
+    if info.get("dispatched"):
+        body["dispatched"] = list(info["dispatched"])
+    for key in ("events", "hotspots", "queued"):
+        if info.get(key):
+            body[key] = info[key]
+    if info.get("intake"):
+        now = time.time()
+        body["intake"] = [[c.id, c.ref_id, c.status, contacts, key, c.latitude, c.longitude, c.location,
+                           c.description, now] for c, contacts, key in info["intake"]]
+    if body:
+        feed.write(session.connection(), body)
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _drop_queued(session):
+    # only the feed reads these, the committing worker queues / remembers the complaint itself
+    session.info.pop("queued", None)
+    session.info.pop("intake", None)
+
+def _apply_remote(body):
+    """Another worker's commit: what our own after_commit hooks would have done with it."""
+    if body.get("resync"):
+        # written by bulk.py after loading rows behind the ORM's back
+        _resync()
+        return
+    if officer_index.loaded:
+        for oid, available, lat, lon in body.get("officers", ()):
+            officer_index.update(oid, *current_position(oid, lat, lon), available)
+    for oid, lat, lon in body.get("positions", ()):
+        officer_index.move(oid, lat, lon)
+    if dispatch_queue.loaded:
+        for cid, lat, lon, kind, created in body.get("queued", ()):
+            if dispatch_queue.push(cid, lat, lon, kind, created):
+                dispatch_ticker.start()
+    for cid in body.get("dispatched", ()):
+        dispatch_queue.discard(cid)
+    if body.get("hotspots") and hotspot_index.loaded_at is not None:
+        hotspot_index.add(body["hotspots"])
+    if body.get("clear"):
+        dashboard_cache.clear()
+    elif body.get("tags"):
+        dashboard_cache.invalidate(*body["tags"])
+    for ev in body.get("events", ()):
+        _publish(ev)
+    if intake_guard is not None:
+        for cid, ref_id, status, contacts, key, lat, lon, location, description, at in body.get("intake", ()):
+            intake_guard.remember({"id": cid, "ref_id": ref_id, "status": status}, contacts, lat, lon, location,
+                                  description, key, age=time.time() - at)
+
+def _resync():
+    # missed changes that are no longer in sync_log: reload everything from the database on next use
+    officer_index.clear()
+    dispatch_queue.loaded = False
+    hotspot_index.loaded_at = None
+    dashboard_cache.clear()
+
+# ---------------- METRICS ----------------
+@REGISTRY.collector
+def _component_metrics():
+    queue = dispatch_queue.metrics()
+    cache = dashboard_cache.stats()
+    pings = officer_locations.stats()
+    out = [
+        ("dispatch_queue_depth", "gauge", "Complaints waiting for an officer.", queue["depth"]),
+        ("officers_available", "gauge", "Officers in the dispatch index.", len(officer_index)),
+        ("dashboard_cache_entries", "gauge", "Rendered pages in the dashboard cache.", cache["entries"]),
+        ("dashboard_cache_requests_total", "counter", "Dashboard cache lookups.",
+         {(("result", "hit"),): cache["hits"], (("result", "miss"),): cache["misses"]}),
+        ("location_pings_total", "counter", "Officer location pings received.", pings["pings"]),
+        ("location_pending", "gauge", "Officer positions not yet written to the DB.", pings["pending"]),
+        ("sse_subscribers", "gauge", "Open live-update streams.", events.subscriber_count()),
+    ]
+    if road_graph is not None:
+        route = road_graph.cache_stats()
+        out.append(("route_cache_requests_total", "counter", "Road travel-time cache lookups.",
+                    {(("result", "hit"),): route["hits"], (("result", "miss"),): route["misses"]}))
+    sent = {}
+    backlog = {}
+    for channel, m in notifications.metrics().items():
+        for key in ("sent", "retried", "failed"):
+            sent[(("channel", channel), ("outcome", key))] = m[key]
+        backlog[(("channel", channel), ("state", "pending"))] = m["pending"]
+        backlog[(("channel", channel), ("state", "dead"))] = m["dead"]
+    out.append(("notifications_total", "counter", "Notification delivery attempts by outcome.", sent))
+    out.append(("notifications_outbox", "gauge", "Notifications waiting in / dead in the outbox.", backlog))
+    out.append(("hotspot_rows", "gauge", "Hour x cell x type rows in the hotspot index.", len(hotspot_index)))
+    archived = archiver.stats() if archiver is not None else {"complaints_moved": 0, "history_moved": 0}
+    out.append(("archived_complaints_total", "counter", "Complaints moved to the archive by this process.",
+                archived["complaints_moved"]))
+    out.append(("archived_history_total", "counter", "History rows moved to the archive by this process.",
+                archived["history_moved"]))
+    if intake_guard is not None:
+        guard = intake_guard.stats()
+        out.append(("intake_recent", "gauge", "Recent submissions kept for duplicate checks.", guard["entries"]))
+        out.append(("intake_duplicates_total", "counter", "Resubmissions answered with the original complaint.",
+                    {(("match", "key"),): guard["key"], (("match", "similar"),): guard["similar"]}))
+    if intake_limiter is not None:
+        out.append(("intake_rate_limited_total", "counter", "Complaint submissions refused by the rate limiter.",
+                    intake_limiter.stats()["limited"]))
+    if feed is not None:
+        synced = feed.stats()
+        out.append(("sync_log_total", "counter", "Change feed rows written / applied from other workers.",
+                    {(("direction", "written"),): synced["written"], (("direction", "applied"),): synced["applied"]}))
+        out.append(("sync_log_resyncs_total", "counter", "Times this worker fell behind the change feed.",
+                    synced["resyncs"]))
+    return out
 
 def role_required(role):
     def decorator(f):
@@ -191,19 +893,6 @@ def complaint():
             except ValueError:
                 pass
 
-        photo_file = request.files.get('photo')
-        photo_path = None
-        if photo_file and photo_file.filename != "":
-            filename = secure_filename(photo_file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            photo_file.save(filepath)
-            img = Image.open(filepath)
-            img.thumbnail((800, 800))
-            compressed_path = os.path.join(app.config['UPLOAD_FOLDER'], f"compressed_{filename}")
-            img.save(compressed_path, optimize=True, quality=70)
-            os.remove(filepath)
-            photo_path = compressed_path
-
         new_complaint = Complaint(
             reporter_name=name,
             email=email,
@@ -213,24 +902,29 @@ def complaint():
             location=loc,
             latitude=lat,
             longitude=lng,
-            maps_link=maps_link,
-            photo_path=photo_path
+            maps_link=maps_link
         )
-        db.session.add(new_complaint)
-        db.session.commit()
+        key = request.form.get('idempotency_key')
+        try:
+            result, officer = submit_complaint(new_complaint, "system", client=f"ip:{request.remote_addr}",
+                                               contacts=contact_keys(email, phone),
+                                               key=f"form:{key}" if key else None)
+        except RateLimited as e:
+            flash(f"Too many complaints from this connection, please try again in {e.retry_after:.0f} seconds.",
+                  "danger")
+            return render_template('complaint.html', idempotency_key=uuid.uuid4().hex), 429, \
+                {"Retry-After": str(int(e.retry_after) + 1)}
+        if result["duplicate"]:
+            # a resubmission: the citizen already has their email, the officer their push
+            flash(f'Complaint already registered. Reference ID: {result["ref_id"]}', 'success')
+            return redirect(url_for('home'))
 
-        history = ComplaintHistory(complaint_id=new_complaint.id, old_status=None, new_status="New", changed_by="system")
-        db.session.add(history)
-        db.session.commit()
-
-        officer = assign_nearest_officer(lat, lng)
-        if officer:
-            new_complaint.assigned_officer_id = officer.id
-            officer.is_available = False
-            new_complaint.status = "Assigned"
-            db.session.commit()
-            if officer.fcm_token:
-                send_fcm_notification(officer.fcm_token, "New Complaint Assigned", desc)
+        # resized in the background, photo_path is filled in once it's done
+        photo_file = request.files.get('photo')
+        if photo_file and photo_file.filename != "":
+            photos.submit(photos.stage(photo_file), new_complaint.id)
+        if officer and officer.fcm_token:
+            send_fcm_notification(officer.fcm_token, "New Complaint Assigned", desc)
 
         send_email(
             to_email=email,
@@ -241,7 +935,7 @@ def complaint():
         flash(f'Complaint submitted successfully. Reference ID: {new_complaint.ref_id}', 'success')
         return redirect(url_for('home'))
 
-    return render_template('complaint.html')
+    return render_template('complaint.html', idempotency_key=uuid.uuid4().hex)
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -259,67 +953,115 @@ def login():
 
 
 
+# only the columns each dashboard template renders
+USER_DASHBOARD_COLUMNS = (Complaint.id, Complaint.ref_id, Complaint.description, Complaint.status, Complaint.created_at)
+OFFICER_DASHBOARD_COLUMNS = USER_DASHBOARD_COLUMNS
+ADMIN_DASHBOARD_COLUMNS = USER_DASHBOARD_COLUMNS + (Complaint.reporter_name, Complaint.assigned_officer_id)
+DASHBOARD_PAGE_SIZE = int(os.getenv("DASHBOARD_PAGE_SIZE", "50"))
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "2000"))  # newest matches ranked per search
+
 @app.route('/dashboard', methods=['GET', 'POST'])
 @login_required
 def dashboard():
     user = db.session.get(User, int(session['_user_id']))
-    search_ref = request.form.get('search_ref')
+    search_ref = request.form.get('search_ref') or request.args.get('search_ref')
+    try:
+        # only the user's listing goes on into the archive; elsewhere an archive cursor is a bad one
+        cursor, then = decode_then_cursor(request.args['cursor']) if request.args.get('cursor') else (None, False)
+        if then and user.role != 'user':
+            raise ValueError("invalid cursor")
+    except ValueError:
+        cursor, then = None, False
+
+    page = request.args.get('cursor') if cursor or then else None
 
     if user.role == 'user':
-        complaints = Complaint.query.filter_by(email=user.username).order_by(Complaint.created_at.desc()).all()
-        return render_template('user_dashboard.html', complaints=complaints)
+        key, tag = ('user', user.username, page), f"user:{user.username}"
+        html = dashboard_cache.get(key)
+        if html is None:
+            q = db.session.query(*USER_DASHBOARD_COLUMNS).filter(Complaint.email == user.username)
+            # their archived complaints follow the live ones
+            archived = db.session.query(*(getattr(ComplaintArchive, c.key) for c in USER_DASHBOARD_COLUMNS)) \
+                .filter(ComplaintArchive.email == user.username)
+            complaints, next_cursor = keyset_page_then((q, Complaint.created_at, Complaint.id),
+                                                       (archived, ComplaintArchive.created_at, ComplaintArchive.id),
+                                                       cursor, then, DASHBOARD_PAGE_SIZE)
+            html = render_template('user_dashboard.html', complaints=complaints, next_cursor=next_cursor)
+            dashboard_cache.set(key, html, tags=[tag])
+        return html
 
     elif user.role == 'officer':
-        complaints = Complaint.query.filter_by(assigned_officer_id=user.id).order_by(Complaint.created_at.desc()).all()
-        return render_template('officer_dashboard.html', complaints=complaints)
+        key, tag = ('officer', user.id, page), f"officer:{user.id}"
+        html = dashboard_cache.get(key)
+        if html is None:
+            q = db.session.query(*OFFICER_DASHBOARD_COLUMNS).filter(Complaint.assigned_officer_id == user.id)
+            complaints, next_cursor = keyset_page(q, Complaint.created_at, Complaint.id, cursor, DASHBOARD_PAGE_SIZE)
+            html = render_template('officer_dashboard.html', complaints=complaints, next_cursor=next_cursor)
+            dashboard_cache.set(key, html, tags=[tag])
+        return html
 
     elif user.role == 'admin':
-        if search_ref:
-            complaints = Complaint.query.filter(
-                Complaint.ref_id.like(f"%{search_ref}%")
-            ).order_by(Complaint.created_at.desc()).all()
-        else:
-            complaints = Complaint.query.order_by(Complaint.created_at.desc()).all()
-        return render_template('admin_dashboard.html', complaints=complaints)
+        key = ('admin', search_ref, page)
+        html = dashboard_cache.get(key)
+        if html is None:
+            q = db.session.query(*ADMIN_DASHBOARD_COLUMNS)
+            if search_ref:
+                q = q.filter(Complaint.ref_id.like(f"%{search_ref}%"))
+            complaints, next_cursor = keyset_page(q, Complaint.created_at, Complaint.id, cursor, DASHBOARD_PAGE_SIZE)
+            if search_ref and not complaints and cursor is None:
+                # nothing live, look in cold storage (one page, ref ids are nearly unique anyway)
+                complaints = db.session.query(*(getattr(ComplaintArchive, c.key) for c in ADMIN_DASHBOARD_COLUMNS)) \
+                    .filter(ComplaintArchive.ref_id.like(f"%{search_ref}%")) \
+                    .order_by(ComplaintArchive.created_at.desc(), ComplaintArchive.id.desc()) \
+                    .limit(DASHBOARD_PAGE_SIZE).all()
+            html = render_template('admin_dashboard.html', complaints=complaints, next_cursor=next_cursor,
+                                   search_ref=search_ref)
+            dashboard_cache.set(key, html, tags=["admin"])
+        return html
 
     else:
         flash("Invalid role", "danger")
         return redirect(url_for('home'))
 
+@app.route('/events')
+@login_required
+def dashboard_events():
+    channels = event_channels(current_user.id, current_user.role)
+    if channels is None:
+        return jsonify({"msg": "forbidden"}), 403
+    return event_stream_response(channels)
+
 @app.route('/update_status/<int:complaint_id>', methods=['POST'])
 @login_required
 @role_required("officer")
 def update_status(complaint_id):
     new_status = request.form.get('status')
     complaint = Complaint.query.get_or_404(complaint_id)
-    old_status = complaint.status
-    complaint.status = new_status
-    db.session.commit()
-
-    history = ComplaintHistory(
-        complaint_id=complaint.id,
-        old_status=old_status,
-        new_status=new_status,
-        changed_by=db.session.get(User, int(session['_user_id'])).username
-    )
-    db.session.add(history)
-    db.session.commit()
-
-    officer = db.session.get(User, complaint.assigned_officer_id)
-    if officer:
-        if new_status.lower() in ["resolved", "closed"]:
-            officer.is_available = True
-        if officer.fcm_token:
-            send_fcm_notification(officer.fcm_token, "Complaint Status Updated", f"Ref ID: {complaint.ref_id} → {new_status}")
-        db.session.commit()
+    ref_id = complaint.ref_id
+    changed_by = db.session.get(User, int(session['_user_id'])).username
+    try:
+        officer = change_status(complaint, new_status, changed_by)
+    except ArchivedComplaint:
+        flash(f"Complaint {ref_id} has been archived and can't be changed any more", "warning")
+        return redirect(url_for('dashboard'))
+    if officer and officer.fcm_token:
+        send_fcm_notification(officer.fcm_token, "Complaint Status Updated", f"Ref ID: {complaint.ref_id} → {new_status}")
 
     flash(f"Status updated to {new_status} for complaint {complaint.ref_id}", "success")
     return redirect(url_for('dashboard'))
 
+@app.route('/metrics')
+def metrics():
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return Response("unauthorized\n", status=401, mimetype="text/plain")
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
 # ---------------- REST API ROUTES ----------------
 @app.route('/api/complaints/<int:cid>', methods=['GET'])
 def api_get_complaint(cid):
-    c = Complaint.query.get_or_404(cid)
+    c = find_complaint(cid)
+    if c is None:
+        abort(404)
     return jsonify({
         "id": c.id,
         "ref_id": c.ref_id,
@@ -330,11 +1072,86 @@ def api_get_complaint(cid):
 
 @app.route('/api/officers/<int:oid>/complaints', methods=['GET'])
 def api_officer_complaints(oid):
-    complaints = Complaint.query.filter_by(assigned_officer_id=oid).all()
-    return jsonify([{"id": c.id, "ref_id": c.ref_id, "status": c.status} for c in complaints])
+    try:
+        cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    q = db.session.query(Complaint.id, Complaint.ref_id, Complaint.status, Complaint.created_at).filter(
+        Complaint.assigned_officer_id == oid)
+    complaints, next_cursor = keyset_page(q, Complaint.created_at, Complaint.id, cursor, limit)
+    resp = jsonify([{"id": c.id, "ref_id": c.ref_id, "status": c.status} for c in complaints])
+    if next_cursor:
+        resp.headers["X-Next-Cursor"] = next_cursor
+    return resp
+
+# ---------------- APP FACTORY ----------------
+_ready = False
+_running = False
+_factory_lock = threading.Lock()
+
+def create_app(background=True):
+    """
+    Set the app up against its database: engine pragmas and writer lock, schema and
+    migrations, the api blueprint and /metrics profiling. With background it also
+    starts what a serving process runs: the change feed (MULTIPROCESS=1) and the
+    waiting-complaint queue and archive pass. Importing this module does none of it.
+    Returns the app; calling it again only starts what an earlier call left out.
+    """
+    global db_writer, archiver, feed, leases, _ready, _running
+    with _factory_lock:
+        if not _ready:
+            with app.app_context():
+                engine = db.engine
+                lock_path = None
+                if MULTIPROCESS:
+                    coordination.install(engine)
+                    origin = coordination.process_id()
+                    leases = coordination.Leases(engine, origin)
+                    feed = coordination.ChangeFeed(engine, origin, _apply_remote, _resync,
+                                                   poll=SYNC_POLL_SECONDS, retention=SYNC_RETENTION_SECONDS)
+                    if engine.url.database not in (None, "", ":memory:"):
+                        lock_path = engine.url.database + "-writer.lock"
+                db_writer = configure_engine(engine, DB_PROFILE, lock_path)
+                # workers starting together would all try to create the same tables
+                with leases.hold("schema", ttl=3600) if leases is not None else contextlib.nullcontext():
+                    db.create_all()
+                    if AUTO_MIGRATE:
+                        apply_migrations(engine)
+                # read once: routes mustn't touch schema_version per request (migrate.py runs need a restart)
+                full_text_search, archive_search = has_migration(engine, 2), has_migration(engine, 4)
+                if METRICS_ENABLED:
+                    profiler.init_app(app, engine)
+                archiver = Archiver(
+                    engine, [c.name for c in Complaint.__table__.columns],
+                    [c.name for c in ComplaintHistory.__table__.columns],
+                    days=ARCHIVE_AFTER_DAYS, batch=ARCHIVE_BATCH, on_moved=_archived,
+                )
+            # what the api blueprint uses from here, so api.py doesn't have to import this module
+            app.extensions["rapid_rescue"] = SimpleNamespace(
+                register_complaint=register_complaint, submit_complaint=submit_complaint, change_status=change_status,
+                dispatch_pending=dispatch_pending, send_fcm_notification=send_fcm_notification,
+                officer_locations=officer_locations, dispatch_queue=dispatch_queue, notifications=notifications,
+                profiler=profiler, ensure_hotspots=ensure_hotspots, dashboard_cache=dashboard_cache,
+                event_channels=event_channels, event_stream_response=event_stream_response,
+                search_candidates=SEARCH_CANDIDATES, full_text_search=full_text_search, archive_search=archive_search,
+            )
+            from api import api
+            app.register_blueprint(api)
+            _ready = True
+        if background and not _running:
+            # start reading the feed before loading anything it would have to correct
+            if feed is not None:
+                feed.start()
+            # complaints left waiting by the last run get picked up without waiting for new intake
+            with app.app_context():
+                _ensure_dispatch_queue()
+            if ARCHIVE_AFTER_DAYS > 0 and ARCHIVE_INTERVAL_SECONDS > 0:
+                archive_ticker.start()
+            _running = True
+    return app
 
 # ---------------- MAIN ----------------
 if __name__ == "__main__":
-    from api import api
-    app.register_blueprint(api)
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    # development server; serve.py (or gunicorn wsgi:app) for production
+    create_app().run(debug=True, host="0.0.0.0", port=5000)
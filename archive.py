@@ -0,0 +1,54 @@
+# archive.py
+# Move resolved / closed complaints into the archive tables now, instead of waiting for the app's hourly pass.
+#
+#   python archive.py [--days 90] [--batch 500] [--max-batches N]
+#   python archive.py status     live / archived row counts and how many are due
+#
+# Safe to run next to the app: each batch is its own short transaction, and
+# batches that find nothing left to move end the run.
+import argparse
+
+from sqlalchemy import func
+
+import app as appmod
+from app import create_app, db, Complaint, ComplaintHistory, ComplaintArchive, ComplaintHistoryArchive
+from utils.archive import DONE_STATUSES
+
+
+def status(archiver):
+    due = db.session.query(func.count(Complaint.id)).filter(
+        Complaint.status.in_(DONE_STATUSES), Complaint.created_at < archiver.cutoff()).scalar()
+    for name, model in (("complaints", Complaint), ("history", ComplaintHistory),
+                        ("archived complaints", ComplaintArchive), ("archived history", ComplaintHistoryArchive)):
+        print(f"{name:<28} {db.session.query(func.count(model.id)).scalar():>12,}")
+    # filed before the cutoff; the archiver also waits for the last status change to be that old
+    label = f"done, filed before {archiver.cutoff():%Y-%m-%d}"
+    print(f"{label:<28} {due:>12,}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Archive old resolved / closed complaints")
+    ap.add_argument("command", nargs="?", choices=["run", "status"], default="run")
+    ap.add_argument("--days", type=int, help=f"archive after this many days (default {appmod.ARCHIVE_AFTER_DAYS})")
+    ap.add_argument("--batch", type=int, help=f"complaints per transaction (default {appmod.ARCHIVE_BATCH})")
+    ap.add_argument("--max-batches", type=int)
+    args = ap.parse_args(argv)
+    # no background pass in this process, the loop below does the work
+    app = create_app(background=False)
+    archiver = appmod.archiver
+    if args.days is not None:
+        archiver.days = args.days
+    if args.batch is not None:
+        archiver.batch = args.batch
+    with app.app_context():
+        if args.command == "status":
+            status(archiver)
+            return
+        if archiver.days <= 0:
+            ap.error("archiving is off (ARCHIVE_AFTER_DAYS=0), pass --days")
+        moved = archiver.run(args.max_batches, log=print)
+        print(f"{moved:,} complaints archived, {archiver.history_moved:,} history rows")
+
+
+if __name__ == "__main__":
+    main()
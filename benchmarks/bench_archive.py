@@ -0,0 +1,167 @@
+# benchmarks/bench_archive.py
+# Active-set query latency before and after moving old resolved complaints to the archive.
+#
+# Seeds a temp DB where most complaints are long resolved / closed (what a few
+# years of use looks like), times the queries the dashboards, dispatch and admin
+# search run, archives with utils/archive.py and times them again, plus the
+# archive's own throughput and the cost of a lookup that falls back to it.
+#
+#   python benchmarks/bench_archive.py [--complaints 200000] [--old 0.9] [--repeat 50]
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+WORDS = ("theft robbery chain snatching accident fight harassment fraud noise parking fire bike car phone "
+         "wallet market school hospital bus stand temple highway night morning woman man child shop").split()
+TYPES = ["Theft", "Accident", "Assault", "Fraud", "Harassment", "Other"]
+OFFICERS = 200
+REPORTERS = 5000
+
+
+def seed(db, n, old_share, rng):
+    """n complaints, old_share of them resolved / closed a year ago, the rest from the last two weeks."""
+    now = datetime.datetime.utcnow()
+    conn = db.session.connection().connection.driver_connection
+    conn.executemany("INSERT INTO user (id, username, password, role, is_available) VALUES (?, ?, 'x', 'officer', 1)",
+                     ((i, f"officer{i}") for i in range(1, OFFICERS + 1)))
+    complaints, history = [], []
+    for i in range(1, n + 1):
+        old = rng.random() < old_share
+        created = now - (datetime.timedelta(days=rng.uniform(200, 900)) if old
+                         else datetime.timedelta(minutes=rng.uniform(0, 14 * 24 * 60)))
+        status = rng.choice(["Resolved", "Closed"]) if old else rng.choice(["New", "Assigned", "Assigned", "Resolved"])
+        officer = None if status == "New" else rng.randint(1, OFFICERS)
+        complaints.append((i, f"{i:012X}", f"citizen {i % REPORTERS}", f"citizen{i % REPORTERS}@example.com",
+                           rng.choice(TYPES), " ".join(rng.choices(WORDS, k=rng.randint(6, 30))),
+                           f"Sector {rng.randint(1, 60)}", rng.uniform(28, 31), rng.uniform(74, 78),
+                           status, officer, created.isoformat(sep=" ")))
+        history.append((i, None, "New", "intake", created.isoformat(sep=" ")))
+        if status != "New":
+            history.append((i, "New", status, "seed", (created + datetime.timedelta(hours=2)).isoformat(sep=" ")))
+    conn.executemany(
+        "INSERT INTO complaint (id, ref_id, reporter_name, email, incident_type, description, location, latitude, "
+        "longitude, status, assigned_officer_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", complaints)
+    conn.executemany("INSERT INTO complaint_history (complaint_id, old_status, new_status, changed_by, timestamp) "
+                     "VALUES (?, ?, ?, ?, ?)", history)
+    conn.execute("INSERT INTO complaint_fts (complaint_fts) VALUES ('optimize')")
+    db.session.commit()
+
+
+def queries(appmod, rng):
+    """(name, fn) pairs shaped like the routes' queries; each fn runs one with fresh parameters."""
+    from app import db, Complaint, USER_DASHBOARD_COLUMNS, OFFICER_DASHBOARD_COLUMNS, ADMIN_DASHBOARD_COLUMNS
+    from utils.pagination import keyset_page
+    from utils import search
+
+    def officer_page():
+        q = db.session.query(*OFFICER_DASHBOARD_COLUMNS).filter(Complaint.assigned_officer_id == rng.randint(1, OFFICERS))
+        return keyset_page(q, Complaint.created_at, Complaint.id, None, 50)[0]
+
+    def user_page():
+        q = db.session.query(*USER_DASHBOARD_COLUMNS).filter(
+            Complaint.email == f"citizen{rng.randrange(REPORTERS)}@example.com")
+        return keyset_page(q, Complaint.created_at, Complaint.id, None, 50)[0]
+
+    def admin_page():
+        return keyset_page(db.session.query(*ADMIN_DASHBOARD_COLUMNS), Complaint.created_at, Complaint.id, None, 50)[0]
+
+    def admin_ref_search():
+        # the dashboard's "search by reference" box is a LIKE '%...%', a scan whatever the indexes
+        return db.session.query(*ADMIN_DASHBOARD_COLUMNS).filter(
+            Complaint.ref_id.like(f"%{rng.randrange(16 ** 4):04X}%")).limit(50).all()
+
+    def dispatch_pending():
+        return db.session.query(Complaint.id, Complaint.latitude, Complaint.longitude).filter(
+            Complaint.status == "New", Complaint.assigned_officer_id.is_(None)).order_by(Complaint.created_at).all()
+
+    def open_per_officer():
+        return db.session.query(Complaint.assigned_officer_id, db.func.count()).filter(
+            Complaint.status == "Assigned").group_by(Complaint.assigned_officer_id).all()
+
+    def fts_search():
+        return search.search_complaints(db.session, " ".join(rng.sample(WORDS, 2)), limit=50,
+                                        candidates=appmod.SEARCH_CANDIDATES)[0]
+
+    return [("dashboard(officer) first page", officer_page), ("dashboard(user) first page", user_page),
+            ("dashboard(admin) first page", admin_page), ("admin ref_id search (LIKE)", admin_ref_search),
+            ("dispatch_pending", dispatch_pending), ("open complaints per officer", open_per_officer),
+            ("admin full-text search", fts_search)]
+
+
+def measure(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    samples.sort()
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.95) - 1] * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--complaints", type=int, default=200000)
+    ap.add_argument("--old", type=float, default=0.9, help="share of complaints due for the archive")
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--batch", type=int, default=2000)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["NOTIFY_QUEUE_PATH"] = os.path.join(tmp, "notify.db")
+    os.environ["ARCHIVE_INTERVAL_SECONDS"] = "0"
+    import app as appmod
+    from app import db, Complaint, ComplaintArchive
+    app = appmod.create_app()
+
+    with app.app_context():
+        t = time.perf_counter()
+        seed(db, args.complaints, args.old, random.Random(7))
+        print(f"seeded {args.complaints:,} complaints in {time.perf_counter() - t:.1f}s\n")
+
+        before = {name: measure(fn, args.repeat) for name, fn in queries(appmod, random.Random(1))}
+
+        appmod.archiver.batch = args.batch
+        t = time.perf_counter()
+        moved = appmod.archiver.run()
+        took = time.perf_counter() - t
+        db.session.expire_all()
+        live = db.session.query(Complaint.id).count()
+
+        after = {name: measure(fn, args.repeat) for name, fn in queries(appmod, random.Random(1))}
+
+        rng = random.Random(3)
+        archived = [r[0] for r in db.session.query(ComplaintArchive.id).limit(5000)]
+        live_ids = [r[0] for r in db.session.query(Complaint.id).limit(5000)]
+
+        def lookup(ids):
+            def fn():
+                db.session.expunge_all()
+                appmod.find_complaint(rng.choice(ids))
+            return fn
+        fallback = {"find_complaint (live)": measure(lookup(live_ids), args.repeat * 10),
+                    "find_complaint (archived)": measure(lookup(archived), args.repeat * 10)}
+
+    print(f"archived {moved:,} complaints + {appmod.archiver.history_moved:,} history rows in {took:.1f}s "
+          f"({moved / took:,.0f} complaints/s, batch {args.batch}); {live:,} left live\n")
+    print(f"{'query':<32} | {'before p50':>10} | {'p95':>8} | {'after p50':>10} | {'p95':>8} | {'speedup':>7}")
+    for name in before:
+        (b50, b95), (a50, a95) = before[name], after[name]
+        print(f"{name:<32} | {b50:8.2f}ms | {b95:6.2f}ms | {a50:8.2f}ms | {a95:6.2f}ms | {b50 / a50:6.1f}x")
+    print()
+    for name, (p50, p95) in fallback.items():
+        print(f"{name:<32} | {p50:8.3f}ms | {p95:6.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
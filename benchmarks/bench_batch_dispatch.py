@@ -0,0 +1,88 @@
+# benchmarks/bench_batch_dispatch.py
+# Per-request greedy dispatch vs one batch matching for a burst of complaints.
+#
+#   python benchmarks/bench_batch_dispatch.py [--officers 2000] [--complaints 300]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+LAT = (28.3, 28.9)   # around Gurugram / Delhi NCR
+LON = (76.8, 77.4)
+
+
+def seed(db, User, Complaint, officers, complaints, rng):
+    db.session.query(Complaint).delete()
+    db.session.query(User).delete()
+    db.session.bulk_save_objects([
+        User(username=f"officer{i}", password="x", role="officer",
+             latitude=rng.uniform(*LAT), longitude=rng.uniform(*LON), is_available=True)
+        for i in range(officers)
+    ])
+    db.session.bulk_save_objects([
+        Complaint(reporter_name="bench", description="bench", status="New",
+                  latitude=rng.uniform(*LAT), longitude=rng.uniform(*LON))
+        for _ in range(complaints)
+    ])
+    db.session.commit()
+
+
+def total_km(db, User, Complaint, haversine):
+    rows = db.session.query(Complaint.latitude, Complaint.longitude, User.latitude, User.longitude).join(
+        User, User.id == Complaint.assigned_officer_id).all()
+    return len(rows), sum(haversine(*r) for r in rows)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--officers", type=int, default=2000)
+    p.add_argument("--complaints", type=int, default=300)
+    p.add_argument("--max-km", type=float, default=50)
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["FCM_SERVER_KEY"] = ""
+    import app as appmod
+    from app import db, User, Complaint, haversine
+    app = appmod.create_app()
+
+    with app.app_context():
+        # greedy, one complaint at a time (what complaint() / create_complaint() do)
+        seed(db, User, Complaint, args.officers, args.complaints, random.Random(args.seed))
+        appmod.officer_index.clear()
+        t0 = time.perf_counter()
+        for c in Complaint.query.order_by(Complaint.id).all():
+            officer = appmod.assign_nearest_officer(c.latitude, c.longitude)
+            if officer:
+                c.assigned_officer_id = officer.id
+                c.status = "Assigned"
+                officer.is_available = False
+                db.session.commit()
+        greedy_s = time.perf_counter() - t0
+        greedy_n, greedy_km = total_km(db, User, Complaint, haversine)
+
+        # same data, one batch
+        seed(db, User, Complaint, args.officers, args.complaints, random.Random(args.seed))
+        appmod.officer_index.clear()
+        t0 = time.perf_counter()
+        appmod.dispatch_pending(max_km=args.max_km, limit=args.complaints)
+        batch_s = time.perf_counter() - t0
+        batch_n, batch_km = total_km(db, User, Complaint, haversine)
+
+    print(f"{args.complaints} complaints, {args.officers} officers")
+    print(f"greedy : {greedy_s:7.3f} s  {args.complaints / greedy_s:8.1f} complaints/s  "
+          f"assigned {greedy_n}  total {greedy_km:9.1f} km")
+    print(f"batch  : {batch_s:7.3f} s  {args.complaints / batch_s:8.1f} complaints/s  "
+          f"assigned {batch_n}  total {batch_km:9.1f} km")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/bench_bulk.py
+# bulk.py import / export throughput against the ORM way of loading the same files.
+#
+#   orm     csv.DictReader -> Complaint(**row) / User(...) with a serial password hash,
+#           session.add per row, commit every --chunk rows
+#   bulk    utils.bulk.import_rows: executemany per chunk, passwords hashed in a process pool
+#
+# Also times a keyset export of the imported complaints and reports peak Python
+# memory (tracemalloc, main process only) to show it stays flat with file size.
+#
+#   python benchmarks/bench_bulk.py [--complaints 200000] [--users 200] [--workers N]
+import argparse
+import csv
+import datetime
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+def write_files(tmp, complaints, users):
+    rng = random.Random(5)
+    words = ["chain", "snatching", "theft", "accident", "fight", "noise", "sector", "market", "bike", "phone"]
+    base = datetime.datetime(2025, 1, 1)
+    cpath = os.path.join(tmp, "complaints.csv")
+    with open(cpath, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["ref_id", "reporter_name", "email", "phone_number", "incident_type", "description",
+                    "location", "latitude", "longitude", "status", "created_at"])
+        for i in range(complaints):
+            w.writerow([f"B{i:011d}", "bench", f"user{i % 500}@x", "9999999999",
+                        rng.choice(["Theft", "Accident", "Violence", "Other"]),
+                        " ".join(rng.choice(words) for _ in range(12)), "sector 17",
+                        28.4 + rng.random() * 0.2, 77.0 + rng.random() * 0.2,
+                        rng.choice(["New", "Resolved", "Closed"]),
+                        (base + datetime.timedelta(minutes=i)).isoformat()])
+    upath = os.path.join(tmp, "users.csv")
+    with open(upath, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["username", "password", "role", "latitude", "longitude"])
+        for i in range(users):
+            w.writerow([f"officer{i}", f"pw-{i}", "officer", 28.4 + rng.random() * 0.2, 77.0 + rng.random() * 0.2])
+    return cpath, upath
+
+
+def orm_import(appmod, kind, path, chunk):
+    from werkzeug.security import generate_password_hash
+    from utils import bulk
+    db, model = appmod.db, (appmod.Complaint if kind == "complaints" else appmod.User)
+    n = 0
+    with open(path, newline="") as f:
+        for raw in csv.DictReader(f):
+            row = bulk.clean(kind, raw)
+            if kind == "users":
+                row["password"] = generate_password_hash(row["password"], method=bulk.HASH_METHOD)
+            db.session.add(model(**row))
+            n += 1
+            if n % chunk == 0:
+                db.session.commit()
+    db.session.commit()
+    return n
+
+
+def bulk_import(appmod, kind, path, chunk, workers):
+    from utils import bulk
+    table = (appmod.Complaint if kind == "complaints" else appmod.User).__table__
+    inserted, _ = bulk.import_rows(appmod.db.engine, table, kind, bulk.read_rows(path, "csv"), chunk=chunk,
+                               workers=workers)
+    return inserted
+
+
+def clear(appmod, kind):
+    from sqlalchemy import text
+    with appmod.db.engine.begin() as conn:
+        if kind == "complaints":
+            conn.execute(text("DELETE FROM complaint"))
+        else:
+            conn.execute(text("DELETE FROM user WHERE username LIKE 'officer%'"))
+
+
+def timed(fn):
+    tracemalloc.start()
+    t = time.perf_counter()
+    n = fn()
+    elapsed = time.perf_counter() - t
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return n, elapsed, peak / 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--complaints", type=int, default=200000)
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--chunk", type=int, default=5000)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--skip-orm", action="store_true", help="only run the bulk path")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["NOTIFY_QUEUE_PATH"] = os.path.join(tmp, "notify.db")
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-long-enough-for-hs256")
+    import app as appmod
+    from utils import bulk
+    appmod.create_app()
+
+    cpath, upath = write_files(tmp, args.complaints, args.users)
+    print(f"{args.complaints} complaints, {args.users} users (pbkdf2), chunk {args.chunk}, "
+          f"{args.workers or os.cpu_count()} hash workers\n")
+    print(f"{'table':<11} | {'path':<6} | {'rows':>8} | {'seconds':>8} | {'rows/min':>11} | {'peak MB':>7}")
+    with appmod.app.app_context():
+        for kind, path in (("complaints", cpath), ("users", upath)):
+            paths = (("bulk", lambda: bulk_import(appmod, kind, path, args.chunk, args.workers)),)
+            if not args.skip_orm:
+                paths = (("orm", lambda: orm_import(appmod, kind, path, args.chunk)),) + paths
+            for label, run in paths:
+                clear(appmod, kind)
+                n, secs, peak = timed(run)
+                print(f"{kind:<11} | {label:<6} | {n:>8} | {secs:8.2f} | {n / secs * 60:>11,.0f} | {peak:7.1f}")
+
+        writer = bulk.Writer(os.path.join(tmp, "export.jsonl"), "jsonl",
+                             [c.name for c in appmod.Complaint.__table__.columns])
+        progress = bulk.Progress("export", out=io.StringIO())
+        _, secs, peak = timed(lambda: bulk.export_rows(appmod.db.engine, appmod.Complaint.__table__, writer,
+                                                       batch=args.chunk, progress=progress))
+        writer.close()
+        n = progress.rows
+        print(f"{'complaints':<11} | {'export':<6} | {n:>8} | {secs:8.2f} | {n / secs * 60:>11,.0f} | {peak:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
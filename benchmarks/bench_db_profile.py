@@ -0,0 +1,140 @@
+# benchmarks/bench_db_profile.py
+# Mixed read/write load against SQLite under each DB_PROFILE.
+# Writers run register_complaint(); readers fetch officer dashboard pages.
+#
+#   python benchmarks/bench_db_profile.py [--writers 4] [--readers 4] [--seconds 5]
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+def pct(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def worker(args):
+    """Runs in a child process so every profile gets a fresh engine."""
+    import app as appmod
+    from app import db, User, Complaint, OFFICER_DASHBOARD_COLUMNS
+    app = appmod.create_app()
+    from utils.pagination import keyset_page
+
+    rng = random.Random(7)
+    with app.app_context():
+        db.session.bulk_save_objects([
+            User(username=f"officer{i}", password="x", role="officer",
+                 latitude=rng.uniform(28.4, 28.6), longitude=rng.uniform(77.0, 77.2))
+            for i in range(args.officers)
+        ])
+        db.session.bulk_save_objects([
+            Complaint(description="seed " * 20, assigned_officer_id=rng.randint(1, args.officers))
+            for _ in range(args.seed_rows)
+        ])
+        db.session.commit()
+
+    stop = time.perf_counter() + args.seconds
+    results = {"read": [], "write": [], "errors": 0}
+    lock = threading.Lock()
+
+    def writer(n):
+        r = random.Random(n)
+        with app.app_context():
+            while time.perf_counter() < stop:
+                t0 = time.perf_counter()
+                try:
+                    c = Complaint(description="bench", latitude=r.uniform(28.4, 28.6), longitude=r.uniform(77.0, 77.2))
+                    appmod.register_complaint(c, changed_by="bench")
+                    # free the officer again so the pool doesn't run dry
+                    if c.assigned_officer_id:
+                        appmod.change_status(c, "Resolved", "bench")
+                    ok = True
+                except Exception:
+                    db.session.rollback()
+                    ok = False
+                dt = time.perf_counter() - t0
+                with lock:
+                    results["write"].append(dt) if ok else None
+                    results["errors"] += 0 if ok else 1
+
+    def reader(n):
+        r = random.Random(100 + n)
+        with app.app_context():
+            while time.perf_counter() < stop:
+                t0 = time.perf_counter()
+                try:
+                    q = db.session.query(*OFFICER_DASHBOARD_COLUMNS).filter(
+                        Complaint.assigned_officer_id == r.randint(1, args.officers))
+                    keyset_page(q, Complaint.created_at, Complaint.id, None, 50)
+                    db.session.rollback()
+                    ok = True
+                except Exception:
+                    db.session.rollback()
+                    ok = False
+                dt = time.perf_counter() - t0
+                with lock:
+                    results["read"].append(dt) if ok else None
+                    results["errors"] += 0 if ok else 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(json.dumps({
+        "writes_per_s": len(results["write"]) / args.seconds,
+        "reads_per_s": len(results["read"]) / args.seconds,
+        "write_p99_ms": pct(results["write"], 99) * 1000,
+        "read_p99_ms": pct(results["read"], 99) * 1000,
+        "errors": results["errors"],
+    }))
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--writers", type=int, default=4)
+    p.add_argument("--readers", type=int, default=4)
+    p.add_argument("--seconds", type=float, default=5)
+    p.add_argument("--officers", type=int, default=200)
+    p.add_argument("--seed-rows", type=int, default=20000)
+    p.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:.0f}s")
+    for profile in ("default", "production"):
+        tmp = tempfile.mkdtemp()
+        env = dict(os.environ, DB_PROFILE=profile,
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   NOTIFY_QUEUE_PATH=os.path.join(tmp, "notify.db"),
+                   FCM_URL="http://127.0.0.1:9/", SMTP_HOST="127.0.0.1", SMTP_PORT="9")
+        out = subprocess.run([sys.executable, __file__, "--worker"] + sys.argv[1:], env=env,
+                             capture_output=True, text=True)
+        lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+        if not lines:
+            print(profile, "failed:", out.stderr[-2000:])
+            continue
+        r = json.loads(lines[-1])
+        print(f"{profile:<11} | writes {r['writes_per_s']:7.1f}/s p99 {r['write_p99_ms']:7.1f} ms | "
+              f"reads {r['reads_per_s']:8.1f}/s p99 {r['read_p99_ms']:7.1f} ms | errors {r['errors']}")
+
+
+if __name__ == "__main__":
+    main()
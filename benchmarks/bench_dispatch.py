@@ -0,0 +1,66 @@
+# benchmarks/bench_dispatch.py
+# Brute force haversine scan vs OfficerIndex for nearest-officer dispatch.
+#
+#   python benchmarks/bench_dispatch.py [--queries 500]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.spatial import OfficerIndex, haversine, has_position
+
+# rough Haryana bounding box
+LAT = (27.6, 30.9)
+LON = (74.4, 77.6)
+
+
+def brute_force(officers, lat, lon):
+    # the old assign_nearest_officer, minus the DB query
+    return min(officers, key=lambda o: haversine(lat, lon, o[1], o[2]) if has_position(o[1], o[2]) else float('inf'))[0]
+
+
+def run(n, queries, rng):
+    officers = [(i + 1, rng.uniform(*LAT), rng.uniform(*LON)) for i in range(n)]
+    points = [(rng.uniform(*LAT), rng.uniform(*LON)) for _ in range(queries)]
+
+    t0 = time.perf_counter()
+    index = OfficerIndex()
+    index.load(officers)
+    build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    expected = [brute_force(officers, lat, lon) for lat, lon in points]
+    brute = (time.perf_counter() - t0) / queries
+
+    t0 = time.perf_counter()
+    got = [index.nearest(lat, lon) for lat, lon in points]
+    indexed = (time.perf_counter() - t0) / queries
+
+    # incremental updates: move / toggle availability
+    t0 = time.perf_counter()
+    for oid, _, _ in officers[:min(n, 1000)]:
+        index.update(oid, rng.uniform(*LAT), rng.uniform(*LON))
+    update = (time.perf_counter() - t0) / min(n, 1000)
+
+    mismatches = sum(1 for a, b in zip(expected, got) if a != b)
+    print(f"{n:>8} officers | build {build * 1e3:8.1f} ms | brute {brute * 1e3:9.3f} ms/q | "
+          f"index {indexed * 1e3:7.3f} ms/q | x{brute / indexed:7.1f} | update {update * 1e6:5.1f} us | "
+          f"mismatches {mismatches}")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--sizes", default="100,10000,100000")
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+    rng = random.Random(args.seed)
+    for n in [int(x) for x in args.sizes.split(",")]:
+        # brute force at 100k is slow, keep the query count sane
+        run(n, args.queries if n <= 10000 else max(20, args.queries // 10), rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# benchmarks/bench_events.py
+# Load test for the live event stream (/api/events, Server-Sent Events).
+#
+# Opens N idle admin streams, then files complaints through the API and measures
+# how long each event takes from commit to every connected client. By default it
+# starts the app on a local threaded server against a temp DB; --url/--token
+# point it at a running deployment instead (e.g. gunicorn -k gevent).
+#
+#   python benchmarks/bench_events.py [--clients 500] [--complaints 50]
+#   python benchmarks/bench_events.py --url http://127.0.0.1:8000 --token <admin jwt> --clients 5000
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def start_local(officers):
+    tmp = tempfile.mkdtemp(prefix="bench_events_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ["NOTIFY_QUEUE_PATH"] = f"{tmp}/notifications.db"
+    os.environ.setdefault("EVENTS_HEARTBEAT", "5")
+    # one user posting the same "bench" complaint over and over, which the intake guard exists to stop
+    os.environ.setdefault("INTAKE_DUPLICATE_WINDOW", "0")
+    os.environ.setdefault("INTAKE_RATE_PER_MIN", "0")
+    import app as appmod
+    from flask_jwt_extended import create_access_token
+    from werkzeug.serving import make_server
+
+    appmod.create_app()
+    rng = random.Random(1)
+    with appmod.app.app_context():
+        admin = appmod.User(username="bench-admin", password="x", role="admin")
+        appmod.db.session.add(admin)
+        appmod.db.session.add_all([
+            appmod.User(username=f"officer{i}", password="x", role="officer",
+                        latitude=rng.uniform(28.4, 28.6), longitude=rng.uniform(77.0, 77.2), is_available=True)
+            for i in range(officers)
+        ])
+        appmod.db.session.commit()
+        token = create_access_token(identity=str(admin.id), additional_claims={"role": "admin", "username": "bench-admin"})
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, appmod.app, threaded=True)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", token, appmod
+
+
+async def client(url, token, ready, latencies, counts, idx, stop):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    writer.write(f"GET /api/events?jwt={token} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                 f"Accept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    status = await reader.readline()
+    if b" 200 " not in status:
+        raise RuntimeError(f"client {idx}: {status!r}")
+    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+        pass
+    ready.release()
+    try:
+        while not stop.is_set():
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b"data:"):
+                event = json.loads(line[5:])
+                latencies.append(time.time() - event["at"])
+                counts[idx] += 1
+    finally:
+        writer.close()
+
+
+def post_complaints(url, token, n):
+    rng = random.Random(2)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        body = json.dumps({"reporter_name": "bench", "description": "bench", "incident_type": "theft",
+                           "latitude": rng.uniform(28.4, 28.6), "longitude": rng.uniform(77.0, 77.2)}).encode()
+        req = urllib.request.Request(f"{url}/api/complaints", data=body, method="POST",
+                                     headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"})
+        urllib.request.urlopen(req).read()
+    return time.perf_counter() - t0
+
+
+async def main_async(args, url, token, appmod):
+    ready = asyncio.Semaphore(0)
+    stop = asyncio.Event()
+    latencies, counts = [], [0] * args.clients
+
+    rss0 = rss_kb()
+    t0 = time.perf_counter()
+    tasks = [asyncio.create_task(client(url, token, ready, latencies, counts, i, stop)) for i in range(args.clients)]
+    for _ in range(args.clients):
+        await ready.acquire()
+    connect_s = time.perf_counter() - t0
+    await asyncio.sleep(args.idle)
+    rss1 = rss_kb()
+
+    post_s = await asyncio.get_running_loop().run_in_executor(None, post_complaints, url, token, args.complaints)
+    await asyncio.sleep(args.drain)
+    stop.set()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(f"clients:            {args.clients} (connected in {connect_s:.2f}s)")
+    if appmod is not None:
+        # client sockets and server threads share this process, so this is the whole cost per stream
+        print(f"memory per stream:  {(rss1 - rss0) / args.clients:.1f} KB (server + client, after {args.idle}s idle)")
+        print(f"subscribers:        {appmod.events.subscriber_count()} at peak")
+    print(f"complaints posted:  {args.complaints} in {post_s:.2f}s")
+    print(f"events per client:  min {min(counts)}  max {max(counts)}")
+    print(f"delivered:          {len(latencies)}")
+    print(f"fan-out latency:    p50 {percentile(latencies, 50) * 1000:.1f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:.1f} ms  max {max(latencies or [0]) * 1000:.1f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=500)
+    ap.add_argument("--complaints", type=int, default=50)
+    ap.add_argument("--officers", type=int, default=100)
+    ap.add_argument("--idle", type=float, default=2.0, help="seconds to sit idle before publishing")
+    ap.add_argument("--drain", type=float, default=2.0, help="seconds to wait for the last events")
+    ap.add_argument("--url", help="running server to test instead of a local one")
+    ap.add_argument("--token", help="admin access token (required with --url)")
+    args = ap.parse_args()
+
+    # one socket per stream, on both ends when local
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    threading.stack_size(256 * 1024)
+
+    if args.url:
+        if not args.token:
+            ap.error("--token is required with --url")
+        url, token, appmod = args.url.rstrip("/"), args.token, None
+    else:
+        url, token, appmod = start_local(args.officers)
+    asyncio.run(main_async(args, url, token, appmod))
+
+
+if __name__ == "__main__":
+    main()
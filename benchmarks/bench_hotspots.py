@@ -0,0 +1,159 @@
+# benchmarks/bench_hotspots.py
+# /api/admin/hotspots: top-N cells from the hour x cell x type index vs recomputing from raw complaints.
+#
+# Synthetic city: complaints clustered around a few dozen hot spots over two
+# years. "recompute" is the best case of pulling raw lat/lon and binning it per
+# request (already in NumPy arrays, no DB read); "index" is HotspotIndex.top().
+# Also times incremental adds and, on a seeded SQLite DB, the backfill and the
+# per-complaint upsert the intake path pays.
+#
+#   python benchmarks/bench_hotspots.py [--complaints 1000000,5000000] [--db-rows 200000]
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from utils import hotspots
+
+TYPES = np.array(["Theft", "Accident", "Assault", "Fraud", "Harassment", "Other"])
+END = datetime.datetime(2025, 6, 1)
+DAYS = 730
+
+
+def synth(n, seed=7):
+    rng = np.random.default_rng(seed)
+    spots = np.column_stack([rng.uniform(30.60, 30.80, 40), rng.uniform(76.65, 76.90, 40)])
+    pick = rng.integers(0, len(spots), n)
+    lat = spots[pick, 0] + rng.normal(0, 0.01, n)
+    lon = spots[pick, 1] + rng.normal(0, 0.01, n)
+    hours = hotspots.hour_of(END) - rng.integers(0, DAYS * 24, n)
+    return lat, lon, hours, TYPES[rng.integers(0, len(TYPES), n)]
+
+
+def recompute(raw, since, until, bbox, types, hours_of_day, precision, limit):
+    lat, lon, hours, kinds = raw
+    mask = (hours >= hotspots.hour_of(since)) & (hours < hotspots.hour_of(until))
+    if bbox:
+        mask &= (lat >= bbox[0]) & (lat <= bbox[2]) & (lon >= bbox[1]) & (lon <= bbox[3])
+    if types:
+        mask &= np.isin(kinds, types)
+    if hours_of_day:
+        mask &= np.isin(hours % 24, list(hours_of_day))
+    cells = hotspots.encode(lat[mask], lon[mask], precision)
+    uniq, counts = np.unique(cells, return_counts=True)
+    return uniq[np.argsort(-counts)[:limit]]
+
+
+QUERIES = [
+    ("last 24h", dict(days=1)),
+    ("last 7 days", dict(days=7)),
+    ("last 30 days", dict(days=30)),
+    ("last 365 days", dict(days=365)),
+    ("30 days, bbox", dict(days=30, bbox=(30.68, 76.70, 30.74, 76.80))),
+    ("30 days, Theft, 22-4h", dict(days=30, types=["Theft"], hours_of_day={22, 23, 0, 1, 2, 3, 4})),
+    ("365 days, precision 5", dict(days=365, precision=5)),
+]
+
+
+def args_for(spec):
+    return (END - datetime.timedelta(days=spec["days"]), END, spec.get("bbox"), spec.get("types"),
+            spec.get("hours_of_day"), spec.get("precision", hotspots.PRECISION), 20)
+
+
+def timed(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    samples.sort()
+    return statistics.median(samples) * 1000, samples[max(0, int(len(samples) * 0.95) - 1)] * 1000
+
+
+def in_memory(n, repeat):
+    raw = synth(n)
+    t = time.perf_counter()
+    rows = hotspots.aggregate(raw[2], hotspots.encode(raw[0], raw[1]), raw[3])
+    agg_s = time.perf_counter() - t
+    index = hotspots.HotspotIndex()
+    t = time.perf_counter()
+    index.load(rows)
+    load_s = time.perf_counter() - t
+    nbytes = sum(a.nbytes for a in (index._hour, index._cid, index._kind, index._count, index._cells))
+    print(f"\n{n:,} complaints -> {len(rows):,} hour x cell x type rows "
+          f"(aggregate {agg_s:.1f}s, load {load_s:.2f}s, {nbytes / 2 ** 20:.0f} MiB)")
+    print(f"{'query':<26} | {'recompute p50':>13} | {'index p50':>9} | {'p95':>8} | {'speedup':>7}")
+    for name, spec in QUERIES:
+        a = args_for(spec)
+        slow, _ = timed(lambda: recompute(raw, *a), max(3, repeat // 10))
+        fast, fast95 = timed(lambda: index.top(*a), repeat)
+        print(f"{name:<26} | {slow:11.1f}ms | {fast:7.2f}ms | {fast95:6.2f}ms | {slow / fast:6.0f}x")
+
+    # new complaints arriving between reloads
+    rng = random.Random(1)
+    adds = [[(hotspots.hour_of(END) + rng.randrange(24), int(hotspots.encode([30.7], [76.8])[0]), "Theft", 1)]
+            for _ in range(10000)]
+    t = time.perf_counter()
+    for row in adds:
+        index.add(row)
+    per_add = (time.perf_counter() - t) / len(adds) * 1e6
+    pending, _ = timed(lambda: index.top(*args_for(QUERIES[2][1])), repeat)
+    print(f"add(): {per_add:.1f} µs per complaint (compaction every {index.compact_at} included); "
+          f"30-day query with {len(index._pending):,} uncompacted: {pending:.2f}ms")
+
+
+def in_db(n):
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["NOTIFY_QUEUE_PATH"] = os.path.join(tmp, "notify.db")
+    os.environ["ARCHIVE_INTERVAL_SECONDS"] = "0"
+    from app import create_app, db, ComplaintHotspot
+    app = create_app()
+    lat, lon, hours, kinds = synth(n)
+    with app.app_context():
+        conn = db.session.connection().connection.driver_connection
+        conn.executemany(
+            "INSERT INTO complaint (ref_id, description, incident_type, latitude, longitude, status, created_at) "
+            "VALUES (?, 'bench', ?, ?, ?, 'New', ?)",
+            ((f"{i:012X}", str(kinds[i]), float(lat[i]), float(lon[i]),
+              (hotspots.EPOCH + datetime.timedelta(hours=int(hours[i]), minutes=i % 60)).isoformat(sep=" "))
+             for i in range(n)))
+        db.session.commit()
+        t = time.perf_counter()
+        with db.engine.begin() as c:
+            hotspots.backfill(c)
+        took = time.perf_counter() - t
+        rows = db.session.query(ComplaintHotspot).count()
+        print(f"\nSQLite backfill: {n:,} complaints -> {rows:,} rows in {took:.1f}s ({n / took:,.0f} complaints/s)")
+
+        spot = hotspots.complaint_row(30.7, 76.8, "Theft", END)
+        with db.engine.begin() as c:
+            best = min(timed(lambda: hotspots.apply_rows(c, [spot + (1,)]), 2000))
+        print(f"intake upsert: {best * 1000:.0f} µs per complaint (inside the intake transaction)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--complaints", default="1000000,5000000")
+    ap.add_argument("--repeat", type=int, default=100)
+    ap.add_argument("--db-rows", type=int, default=200000, help="0 skips the SQLite part")
+    args = ap.parse_args()
+    for n in (int(x) for x in args.complaints.split(",")):
+        in_memory(n, args.repeat)
+    if args.db_rows:
+        in_db(args.db_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_intake.py
+# Concurrent complaint intake: the old multi-commit path vs register_complaint().
+# Reports inserts/s and how many officers ended up with more than one complaint
+# (every complaint has a free officer, so any such officer was double-assigned).
+# Exits non-zero unless the atomic path assigned every complaint exactly once.
+#
+#   python benchmarks/bench_intake.py [--threads 8] [--complaints 400]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+LAT = (28.4, 28.6)
+LON = (77.0, 77.2)
+
+
+def legacy_intake(appmod, db, c):
+    """What complaint() / create_complaint() did before: three commits, read-then-write reservation."""
+    User, Complaint, ComplaintHistory = appmod.User, appmod.Complaint, appmod.ComplaintHistory
+    db.session.add(c)
+    db.session.commit()
+    db.session.add(ComplaintHistory(complaint_id=c.id, old_status=None, new_status="New", changed_by="system"))
+    db.session.commit()
+    officers = User.query.filter_by(role='officer', is_available=True).all()
+    if officers:
+        officer = min(officers, key=lambda o: appmod.haversine(c.latitude, c.longitude, o.latitude, o.longitude))
+        c.assigned_officer_id = officer.id
+        officer.is_available = False
+        c.status = "Assigned"
+        db.session.commit()
+
+
+def run(appmod, mode, threads, complaints, officers, seed):
+    app, db, User, Complaint = appmod.app, appmod.db, appmod.User, appmod.Complaint
+    rng = random.Random(seed)
+    with app.app_context():
+        db.session.query(appmod.ComplaintHistory).delete()
+        db.session.query(Complaint).delete()
+        db.session.query(User).delete()
+        db.session.bulk_save_objects([
+            User(username=f"officer{i}", password="x", role="officer",
+                 latitude=rng.uniform(*LAT), longitude=rng.uniform(*LON), is_available=True)
+            for i in range(officers)
+        ])
+        db.session.commit()
+    appmod.officer_index.clear()
+
+    points = [(rng.uniform(*LAT), rng.uniform(*LON)) for _ in range(complaints)]
+    chunks = [points[i::threads] for i in range(threads)]
+    errors = []
+
+    def worker(chunk):
+        with app.app_context():
+            for lat, lon in chunk:
+                c = Complaint(reporter_name="bench", description="bench", latitude=lat, longitude=lon)
+                try:
+                    if mode == "legacy":
+                        legacy_intake(appmod, db, c)
+                    else:
+                        appmod.register_complaint(c, changed_by="bench")
+                except Exception as e:
+                    db.session.rollback()
+                    errors.append(e)
+
+    ts = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    with app.app_context():
+        rows = db.session.query(Complaint.assigned_officer_id, db.func.count()).filter(
+            Complaint.assigned_officer_id.isnot(None)).group_by(Complaint.assigned_officer_id).all()
+        doubled = sum(1 for _, n in rows if n > 1)
+        assigned = sum(n for _, n in rows)
+    print(f"{mode:<8} {threads:>2} threads | {complaints / elapsed:8.1f} inserts/s | assigned {assigned:>5} | "
+          f"double-assigned officers {doubled:>4} | errors {len(errors)}")
+    return assigned, doubled, len(errors)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--complaints", type=int, default=400)
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["NOTIFY_QUEUE_PATH"] = os.path.join(tmp, "notify.db")
+    import app as appmod
+    appmod.create_app()
+
+    for mode in ("legacy", "atomic"):
+        assigned, doubled, errors = run(appmod, mode, args.threads, args.complaints, args.complaints, args.seed)
+    # there's an officer for every complaint, so none of them should be left waiting for the ticker
+    if (assigned, doubled, errors) != (args.complaints, 0, 0):
+        sys.exit(f"atomic intake assigned {assigned}/{args.complaints}, {doubled} doubled, {errors} errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,523 @@
+# benchmarks/bench_lifecycle.py
+# End-to-end load test of the complaint lifecycle, for comparing runs over time.
+#
+# Seeds a temp DB (officers, citizens, complaints in every state), starts local
+# stand-ins for SMTP and FCM, then drives the real app with concurrent workers
+# through a weighted mix of:
+#
+#   intake_form        POST /complaint (web form, anonymous)
+#   intake_api         POST /api/complaints (citizen JWT)
+#   status_update      POST /api/complaints/<id>/status by the assigned officer (In Progress / Resolved)
+#   dashboard_user     GET /dashboard as a logged-in citizen
+#   dashboard_officer  GET /dashboard as a logged-in officer
+#   dashboard_admin    GET /dashboard as admin
+#   admin_search       GET /api/admin/search?q=...
+#   officer_assigned   GET /api/officer/assigned
+#   complaint_get      GET /api/complaints/<id>
+#
+# Requests go through the WSGI test client (default) or a local threaded server
+# (--server). Results are JSON: throughput and p50/p95/p99 per operation, plus
+# the run's config, so runs can be diffed with --compare.
+#
+#   python benchmarks/bench_lifecycle.py [--officers 200] [--complaints 20000] [--workers 8] [--duration 30]
+#   python benchmarks/bench_lifecycle.py --server --out after.json --compare before.json
+import argparse
+import datetime
+import http.server
+import json
+import logging
+import os
+import platform
+import random
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+MIX = {
+    "intake_form": 10, "intake_api": 15, "status_update": 10, "dashboard_user": 15, "dashboard_officer": 15,
+    "dashboard_admin": 10, "admin_search": 10, "officer_assigned": 10, "complaint_get": 5,
+}
+TYPES = ["Theft", "Accident", "Violence", "Other"]
+WORDS = ["chain", "snatching", "theft", "accident", "fight", "noise", "sector", "market", "bike", "phone",
+         "car", "robbery", "bus", "stand", "park", "gate", "night", "shop"]
+LAT, LON = (28.4, 28.6), (77.0, 77.2)
+PASSWORD = "bench"
+
+
+# ---------------- SMTP / FCM stand-ins ----------------
+class FakeSmtp(socketserver.ThreadingTCPServer):
+    """Accepts everything, counts messages. Just enough SMTP for smtplib without STARTTLS/AUTH."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.messages = 0
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.wfile.write(b"220 bench ESMTP\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line[:4].upper()
+            if cmd in (b"EHLO", b"HELO"):
+                self.wfile.write(b"250-bench\r\n250 8BITMIME\r\n")
+            elif cmd == b"DATA":
+                self.wfile.write(b"354 go ahead\r\n")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                time.sleep(self.server.latency)
+                with self.server.lock:
+                    self.server.messages += 1
+                self.wfile.write(b"250 queued\r\n")
+            elif cmd == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 ok\r\n")
+
+
+class FakeFcm(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), _FcmHandler)
+
+
+class _FcmHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive, like the real endpoint
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        n = len(body.get("registration_ids") or [body.get("to")])
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.messages += n
+        out = json.dumps({"success": n, "failure": 0,
+                          "results": [{"message_id": f"bench-{i}"} for i in range(n)]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+# ---------------- seeding ----------------
+def seed(officers, citizens, complaints, rng_seed):
+    """Runs in its own process against DATABASE_URL, so the app under test starts from a cold, seeded DB."""
+    import app as appmod
+    from werkzeug.security import generate_password_hash
+    from app import db, User, Complaint, ComplaintHistory
+    appmod.create_app(background=False)
+    from utils import stats
+
+    rng = random.Random(rng_seed)
+    # one pbkdf2 round: logins are part of setup, not what's measured
+    pw = generate_password_hash(PASSWORD, method="pbkdf2:sha256:1")
+    now = datetime.datetime.utcnow()
+    users = [{"id": 1, "username": "admin", "password": pw, "role": "admin", "is_available": False}]
+    users += [{"id": 2 + i, "username": f"officer{i}", "password": pw, "role": "officer", "fcm_token": f"tok-{i}",
+               "latitude": rng.uniform(*LAT), "longitude": rng.uniform(*LON), "is_available": True}
+              for i in range(officers)]
+    users += [{"id": 2 + officers + i, "username": f"citizen{i}@bench.local", "password": pw, "role": "user",
+               "is_available": True} for i in range(citizens)]
+
+    busy = list(range(2, 2 + officers))
+    rng.shuffle(busy)
+    # half the force is out on a call: every other one of the newest complaints
+    on_call = {complaints - 2 * i: oid for i, oid in enumerate(busy[:min(officers // 2, complaints // 2)])}
+    rows, history = [], []
+    for cid in range(1, complaints + 1):
+        created = now - datetime.timedelta(minutes=(complaints - cid) * 2)
+        if cid in on_call:
+            status, officer = "Assigned", on_call[cid]
+        else:
+            status = rng.choices(["Resolved", "Closed", "New"], [70, 28, 2])[0]
+            officer = rng.randrange(2, 2 + officers) if status != "New" and officers else None
+        rows.append({
+            "id": cid, "ref_id": f"S{cid:011d}", "reporter_name": "bench", "email": f"citizen{rng.randrange(citizens)}@bench.local",
+            "phone_number": "9999999999", "incident_type": rng.choice(TYPES),
+            "description": " ".join(rng.choice(WORDS) for _ in range(10)), "location": f"sector {rng.randrange(1, 60)}",
+            "latitude": rng.uniform(*LAT), "longitude": rng.uniform(*LON), "status": status,
+            "assigned_officer_id": officer, "created_at": created,
+        })
+        history.append({"complaint_id": cid, "old_status": None, "new_status": "New", "changed_by": "seed",
+                        "timestamp": created})
+        if status != "New":
+            history.append({"complaint_id": cid, "old_status": "New", "new_status": status, "changed_by": "seed",
+                            "timestamp": created})
+    busy_ids = set(on_call.values())
+    # executemany takes its columns from the first row, so every row gets every key
+    users = [{"fcm_token": None, "latitude": None, "longitude": None, **u,
+              "is_available": u["is_available"] and u["id"] not in busy_ids} for u in users]
+
+    with appmod.app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(User.__table__.insert(), users)
+            for i in range(0, len(rows), 5000):
+                conn.execute(Complaint.__table__.insert(), rows[i:i + 5000])
+            for i in range(0, len(history), 5000):
+                conn.execute(ComplaintHistory.__table__.insert(), history[i:i + 5000])
+            stats.backfill(conn)
+
+
+# ---------------- clients ----------------
+class Result:
+    __slots__ = ("status", "body")
+
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class TestClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, json=None, data=None, headers=None):
+        resp = self.client.open(path, method=method, json=json, data=data, headers=headers)
+        return Result(resp.status_code, resp.get_data())
+
+
+class HttpClient:
+    def __init__(self, base):
+        import requests
+        self.base = base
+        self.session = requests.Session()
+
+    def request(self, method, path, json=None, data=None, headers=None):
+        resp = self.session.request(method, self.base + path, json=json, data=data, headers=headers,
+                                    allow_redirects=False, timeout=60)
+        return Result(resp.status_code, resp.content)
+
+
+# ---------------- workload ----------------
+class Workload:
+    def __init__(self, app, new_client, officers, citizens, complaints, engine, mix, seed):
+        self.app = app
+        self.new_client = new_client
+        self.officers = officers
+        self.citizens = citizens
+        self.complaints = complaints
+        self.engine = engine
+        self.mix = mix
+        self.seed = seed
+        self.tokens = {}            # username -> JWT
+        self.assigned = []          # [(complaint_id, officer_username)] waiting for a status update
+        self.refill_after = 0.0
+        self.lock = threading.Lock()
+
+    def token(self, username):
+        # minted like api.api_login does; app.py's own /api/login shadows that route and returns no token
+        with self.lock:
+            tok = self.tokens.get(username)
+        if tok is None:
+            from sqlalchemy import text
+            from flask_jwt_extended import create_access_token
+            with self.engine.connect() as conn:
+                uid, role = conn.execute(text("SELECT id, role FROM user WHERE username = :u"), {"u": username}).one()
+            with self.app.app_context():
+                tok = create_access_token(identity=str(uid), additional_claims={"role": role, "username": username},
+                                          expires_delta=datetime.timedelta(days=1))
+            with self.lock:
+                self.tokens[username] = tok
+        return tok
+
+    def login_web(self, username):
+        c = self.new_client()
+        r = c.request("POST", "/login", data={"username": username, "password": PASSWORD})
+        assert r.status == 302, (username, r.status)
+        return c
+
+    def next_assigned(self):
+        with self.lock:
+            if not self.assigned and time.perf_counter() >= self.refill_after:
+                self._refill()
+            return self.assigned.pop() if self.assigned else None
+
+    def _refill(self):
+        from sqlalchemy import text
+        # nothing assigned right now: don't hit the DB again for a moment
+        self.refill_after = time.perf_counter() + 0.5
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT c.id, u.username FROM complaint c JOIN user u ON u.id = c.assigned_officer_id "
+                "WHERE c.status IN ('Assigned', 'In Progress') ORDER BY random() LIMIT 200")).all()
+        self.assigned = [tuple(r) for r in rows]
+
+    def worker(self, idx, deadline, warmup_until, results):
+        samples, errors = {op: [] for op in self.mix}, {}
+        results.append((samples, errors))
+        rng = random.Random(self.seed * 1000 + idx)
+        ops, weights = zip(*self.mix.items())
+        api = self.new_client()
+        citizen = f"citizen{rng.randrange(self.citizens)}@bench.local"
+        officer = f"officer{rng.randrange(self.officers)}"
+        web = {"user": self.login_web(citizen), "officer": self.login_web(officer), "admin": self.login_web("admin")}
+        citizen_auth = {"Authorization": f"Bearer {self.token(citizen)}"}
+        officer_auth = {"Authorization": f"Bearer {self.token(officer)}"}
+        admin_auth = {"Authorization": f"Bearer {self.token('admin')}"}
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                return
+            op = rng.choices(ops, weights)[0]
+            client, method, path, kw, ok = api, "GET", None, {}, (200,)
+            lat, lon = rng.uniform(*LAT), rng.uniform(*LON)
+            desc = " ".join(rng.choice(WORDS) for _ in range(10))
+            if op == "intake_form":
+                method, path, ok = "POST", "/complaint", (302,)
+                kw = {"data": {"reporter_name": "load", "email": citizen, "phone_number": "9999999999",
+                               "incident_type": rng.choice(TYPES), "description": desc, "location": "sector 9",
+                               "latitude": str(lat), "longitude": str(lon)}}
+            elif op == "intake_api":
+                method, path = "POST", "/api/complaints"
+                kw = {"headers": citizen_auth, "json": {
+                    "reporter_name": "load", "email": citizen, "phone_number": "9999999999",
+                    "incident_type": rng.choice(TYPES), "description": desc, "latitude": lat, "longitude": lon}}
+            elif op == "status_update":
+                picked = self.next_assigned()
+                if picked is None:
+                    continue
+                cid, owner = picked
+                status = rng.choice(["In Progress", "Resolved", "Resolved"])
+                method, path = "POST", f"/api/complaints/{cid}/status"
+                kw = {"headers": {"Authorization": f"Bearer {self.token(owner)}"}, "json": {"status": status}}
+                if status == "In Progress":
+                    with self.lock:
+                        self.assigned.insert(0, picked)
+            elif op.startswith("dashboard_"):
+                client, path = web[op.split("_", 1)[1]], "/dashboard"
+            elif op == "admin_search":
+                path = f"/api/admin/search?q={rng.choice(WORDS)}+{rng.choice(WORDS)}&limit=20"
+                kw = {"headers": admin_auth}
+            elif op == "officer_assigned":
+                path, kw = "/api/officer/assigned", {"headers": officer_auth}
+            elif op == "complaint_get":
+                path = f"/api/complaints/{rng.randrange(1, self.complaints + 1)}"
+
+            t0 = time.perf_counter()
+            try:
+                r = client.request(method, path, **kw)
+                status = r.status
+            except Exception as e:
+                status = f"{type(e).__name__}: {e}"
+            elapsed = time.perf_counter() - t0
+            if t0 < warmup_until:
+                continue
+            samples[op].append(elapsed)
+            if status not in ok:
+                errors[op] = errors.get(op, 0) + 1
+                if errors[op] <= 3:
+                    print(f"{op}: {method} {path} -> {status}", file=sys.stderr)
+
+
+# ---------------- results ----------------
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def summarize(samples, errors, seconds):
+    def block(values, errs):
+        ms = [v * 1000 for v in values]
+        return {
+            "count": len(values), "errors": errs, "throughput_rps": round(len(values) / seconds, 2),
+            "mean_ms": round(sum(ms) / len(ms), 3) if ms else None,
+            "p50_ms": _r(percentile(ms, 50)), "p95_ms": _r(percentile(ms, 95)), "p99_ms": _r(percentile(ms, 99)),
+            "max_ms": _r(max(ms) if ms else None),
+        }
+    ops = {op: block(v, errors.get(op, 0)) for op, v in samples.items() if v or errors.get(op)}
+    everything = [v for values in samples.values() for v in values]
+    return ops, block(everything, sum(errors.values()))
+
+
+def _r(v):
+    return round(v, 3) if v is not None else None
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=ROOT, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_table(report, out=sys.stderr):
+    print(f"\n{'operation':<18} | {'count':>7} | {'err':>4} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | "
+          f"{'p99 ms':>8}", file=out)
+    rows = list(report["operations"].items()) + [("TOTAL", report["total"])]
+    for op, m in rows:
+        print(f"{op:<18} | {m['count']:>7} | {m['errors']:>4} | {m['throughput_rps']:>8.1f} | "
+              f"{_fmt(m['p50_ms'])} | {_fmt(m['p95_ms'])} | {_fmt(m['p99_ms'])}", file=out)
+
+
+def _fmt(v):
+    return f"{v:8.2f}" if v is not None else f"{'-':>8}"
+
+
+def print_compare(old, new, out=sys.stderr):
+    print(f"\nvs {old['meta'].get('commit')} ({old['meta'].get('started')}):", file=out)
+    print(f"{'operation':<18} | {'req/s old → new':>21} | {'p95 ms old → new':>24}", file=out)
+    ops = list(new["operations"]) + ["TOTAL"]
+    for op in ops:
+        a = old["total"] if op == "TOTAL" else old["operations"].get(op)
+        b = new["total"] if op == "TOTAL" else new["operations"][op]
+        if not a or a["p95_ms"] is None or b["p95_ms"] is None:
+            continue
+        rps = (b["throughput_rps"] / a["throughput_rps"] - 1) * 100 if a["throughput_rps"] else 0
+        p95 = (b["p95_ms"] / a["p95_ms"] - 1) * 100 if a["p95_ms"] else 0
+        print(f"{op:<18} | {a['throughput_rps']:7.1f} → {b['throughput_rps']:7.1f} {rps:+4.0f}% | "
+              f"{a['p95_ms']:8.2f} → {b['p95_ms']:8.2f} {p95:+4.0f}%", file=out)
+
+
+def parse_mix(text):
+    mix = dict(MIX)
+    for part in filter(None, (text or "").split(",")):
+        op, _, weight = part.partition("=")
+        if op not in MIX:
+            raise SystemExit(f"unknown operation {op!r}, expected one of {', '.join(MIX)}")
+        mix[op] = float(weight)
+    return {op: w for op, w in mix.items() if w > 0}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--officers", type=int, default=200)
+    ap.add_argument("--citizens", type=int, default=2000)
+    ap.add_argument("--complaints", type=int, default=20000, help="seeded before the run")
+    ap.add_argument("--workers", type=int, default=8, help="concurrent clients")
+    ap.add_argument("--duration", type=float, default=30, help="seconds measured, after --warmup")
+    ap.add_argument("--warmup", type=float, default=3)
+    ap.add_argument("--mix", help="weights, e.g. intake_api=30,admin_search=0 (see MIX)")
+    ap.add_argument("--server", action="store_true", help="local threaded HTTP server instead of the test client")
+    ap.add_argument("--smtp-latency", type=float, default=0.0, help="seconds the fake SMTP server takes per mail")
+    ap.add_argument("--fcm-latency", type=float, default=0.0, help="seconds the fake FCM endpoint takes per call")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", help="write the JSON report here (default: stdout)")
+    ap.add_argument("--compare", help="earlier JSON report to diff against")
+    ap.add_argument("--seed-only", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.seed_only:
+        seed(args.officers, args.citizens, args.complaints, args.seed)
+        return
+
+    smtp, fcm = FakeSmtp(args.smtp_latency), FakeFcm(args.fcm_latency)
+    tmp = tempfile.mkdtemp(prefix="bench_lifecycle_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        "NOTIFY_QUEUE_PATH": os.path.join(tmp, "notify.db"),
+        "UPLOAD_FOLDER": os.path.join(tmp, "uploads"),
+        "SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(serve(smtp)), "SMTP_STARTTLS": "0",
+        "EMAIL_ADDRESS": "bench@bench.local", "EMAIL_PASSWORD": "",
+        "FCM_URL": f"http://127.0.0.1:{serve(fcm)}/fcm/send", "FCM_SERVER_KEY": "bench",
+    })
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-long-enough-for-hs256")
+    os.environ.setdefault("SLOW_REQUEST_SECONDS", "60")
+    os.environ.setdefault("INTAKE_RATE_PER_MIN", "0")     # every form post comes from 127.0.0.1
+
+    t = time.perf_counter()
+    subprocess.run([sys.executable, __file__, "--seed-only", "1", "--officers", str(args.officers),
+                    "--citizens", str(args.citizens), "--complaints", str(args.complaints), "--seed", str(args.seed)],
+                   check=True, stdout=subprocess.DEVNULL)
+    print(f"seeded {args.officers} officers, {args.citizens} citizens, {args.complaints} complaints "
+          f"in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+
+    import app as appmod
+    appmod.create_app()
+    if args.server:
+        from werkzeug.serving import make_server, WSGIRequestHandler
+
+        class KeepAlive(WSGIRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        server = make_server("127.0.0.1", 0, appmod.app, threaded=True, request_handler=KeepAlive)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        new_client = lambda: HttpClient(base)   # noqa: E731
+    else:
+        new_client = lambda: TestClient(appmod.app)     # noqa: E731
+
+    with appmod.app.app_context():
+        engine = appmod.db.engine
+    mix = parse_mix(args.mix)
+    load = Workload(appmod.app, new_client, args.officers, args.citizens, args.complaints, engine, mix, args.seed)
+    results = []
+    started = datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    warmup_until = time.perf_counter() + args.warmup
+    deadline = warmup_until + args.duration
+    threads = [threading.Thread(target=load.worker, args=(i, deadline, warmup_until, results))
+               for i in range(args.workers)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    appmod.notifications.stop()
+    samples, errors = {op: [] for op in mix}, {}
+    for s, e in results:
+        for op, values in s.items():
+            samples[op].extend(values)
+        for op, n in e.items():
+            errors[op] = errors.get(op, 0) + n
+    ops, total = summarize(samples, errors, args.duration)
+    report = {
+        "meta": {"started": started, "commit": git_commit(), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "transport": "http" if args.server else "test_client"},
+        "config": {k: getattr(args, k) for k in ("officers", "citizens", "complaints", "workers", "duration",
+                                                   "warmup", "seed", "smtp_latency", "fcm_latency")} | {"mix": mix},
+        "operations": ops,
+        "total": total,
+        "notifications": {"smtp_messages": smtp.messages, "fcm_requests": fcm.requests,
+                          "fcm_messages": fcm.messages},
+    }
+    print_table(report)
+    if args.compare:
+        with open(args.compare) as f:
+            print_compare(json.load(f), report)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/bench_locations.py
+# Officer location ingestion: one UPDATE + commit per ping vs the coalescing
+# buffer behind /api/officer/location. Reports pings/min and how many UPDATE
+# statements reached the database.
+#
+#   python benchmarks/bench_locations.py [--officers 500] [--pings 30000] [--threads 8] [--batch 10]
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+LAT = (28.4, 28.6)
+LON = (77.0, 77.2)
+
+
+def make_pings(officer_ids, n, seed):
+    rng = random.Random(seed)
+    now = time.time()
+    return [(rng.choice(officer_ids), rng.uniform(*LAT), rng.uniform(*LON), now + i * 0.001) for i in range(n)]
+
+
+def run_threads(pings, threads, fn, key=None):
+    if key is None:
+        chunks = [pings[i::threads] for i in range(threads)]
+    else:
+        chunks = [[p for p in pings if key(p) % threads == i] for i in range(threads)]
+    ts = [threading.Thread(target=fn, args=(chunk,)) for chunk in chunks]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--officers", type=int, default=500)
+    ap.add_argument("--pings", type=int, default=30000)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--batch", type=int, default=10, help="pings per API request")
+    ap.add_argument("--naive-pings", type=int, default=3000, help="the per-ping path is slow, run fewer")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["NOTIFY_QUEUE_PATH"] = os.path.join(tmp, "notify.db")
+    os.environ.setdefault("LOCATION_FLUSH_SECONDS", "1")
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-long-enough-for-hs256")
+    import app as appmod
+    from app import db, User
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import event
+
+    app = appmod.create_app()
+    with app.app_context():
+        db.session.bulk_save_objects([
+            User(username=f"officer{i}", password="x", role="officer",
+                 latitude=LAT[0], longitude=LON[0], is_available=True)
+            for i in range(args.officers)
+        ])
+        db.session.commit()
+        ids = [oid for (oid,) in db.session.query(User.id)]
+        tokens = {oid: create_access_token(identity=str(oid), additional_claims={"role": "officer"}) for oid in ids}
+        appmod._ensure_officer_index()
+
+        updates = [0]
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def _count(conn, cursor, statement, params, context, executemany):
+            if statement.lstrip().upper().startswith("UPDATE USER"):
+                updates[0] += 1
+
+    # --- one UPDATE + commit per ping ---
+    pings = make_pings(ids, args.naive_pings, 1)
+
+    def naive(chunk):
+        with app.app_context():
+            for oid, lat, lon, _ in chunk:
+                db.session.query(User).filter_by(id=oid).update({"latitude": lat, "longitude": lon})
+                db.session.commit()
+
+    elapsed = run_threads(pings, args.threads, naive)
+    print(f"per-ping commit  | {len(pings) / elapsed * 60:>10,.0f} pings/min | "
+          f"UPDATE statements {updates[0]:>6} for {len(pings)} pings")
+
+    # --- buffered, through the endpoint ---
+    updates[0] = 0
+    pings = make_pings(ids, args.pings, 2)
+    by_officer = {}
+    for oid, lat, lon, ts in pings:
+        by_officer.setdefault(oid, []).append({"latitude": lat, "longitude": lon, "ts": ts})
+    requests = [(oid, ps[i:i + args.batch]) for oid, ps in by_officer.items() for i in range(0, len(ps), args.batch)]
+    # officers interleaved at random, but each device sends its own batches in order, from one thread:
+    # across requests the buffer goes by arrival, so that's what makes its newest ping the one that sticks
+    random.Random(3).shuffle(requests)
+    queues = {oid: iter(sorted((r for r in requests if r[0] == oid), key=lambda r: r[1][0]["ts"]))
+              for oid in by_officer}
+    requests = [next(queues[oid]) for oid, _ in requests]
+
+    def buffered(chunk):
+        client = app.test_client()
+        for oid, batch in chunk:
+            resp = client.post("/api/officer/location", data=json.dumps({"pings": batch}),
+                               headers={"Authorization": f"Bearer {tokens[oid]}", "Content-Type": "application/json"})
+            assert resp.status_code == 202, resp.get_data(as_text=True)
+
+    elapsed = run_threads(requests, args.threads, buffered, key=lambda r: r[0])
+    appmod.officer_locations.flush()
+    s = appmod.officer_locations.stats()
+    print(f"buffered API     | {len(pings) / elapsed * 60:>10,.0f} pings/min | "
+          f"UPDATE statements {updates[0]:>6} ({s['flushes']} flushes, {s['rows_written']} rows) "
+          f"for {len(pings)} pings in {len(requests)} requests of <= {args.batch}")
+
+    # the dispatcher sees the newest fix even before it is flushed
+    last = {oid: (lat, lon) for oid, lat, lon, _ in sorted(pings, key=lambda p: p[3])}
+    with app.app_context():
+        rows = dict((oid, (lat, lon)) for oid, lat, lon in db.session.query(User.id, User.latitude, User.longitude))
+    stale = sum(1 for oid, fix in last.items() if rows[oid] != fix or appmod.officer_locations.latest(oid) != fix)
+    print(f"officers with a stale position after the final flush: {stale}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# benchmarks/bench_metrics.py
+# Cost of the request / SQL instrumentation (utils/metrics.py).
+#
+# Runs the same request mix in fresh processes with METRICS_ENABLED=0 and =1,
+# alternating, and reports the best round's per-request time of each route through
+# the test client (the best round is the least disturbed by other load on the box),
+# plus the cost of one /metrics scrape. Cheap routes are the worst case: the
+# overhead is a fixed few microseconds per request and per SQL statement.
+#
+#   python benchmarks/bench_metrics.py [--requests 3000] [--rounds 5] [--processes 3]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+ROUTES = [
+    ("home (no SQL)", "/"),
+    ("complaint by id (1 query)", "/api/complaints/{cid}"),
+    ("officer page (1 query, 50 rows)", "/api/officers/{oid}/complaints?limit=50"),
+]
+
+
+def worker(requests, rounds):
+    import app as appmod
+    from app import db, Complaint, User
+    import datetime
+    appmod.create_app()
+    with appmod.app.app_context():
+        officer = User(username="bench-officer", password="x", role="officer")
+        db.session.add(officer)
+        db.session.flush()
+        db.session.execute(Complaint.__table__.insert(), [{
+            "ref_id": f"M{i:011d}", "description": "bench", "status": "Assigned", "assigned_officer_id": officer.id,
+            "created_at": datetime.datetime(2025, 1, 1) + datetime.timedelta(minutes=i),
+        } for i in range(500)])
+        db.session.commit()
+        oid = officer.id
+    client = appmod.app.test_client()
+    out = {}
+    for name, url in ROUTES:
+        url = url.format(cid=1, oid=oid)
+        for _ in range(200):
+            client.get(url)
+        per_round = []
+        for _ in range(rounds):
+            t = time.perf_counter()
+            for _ in range(requests):
+                client.get(url)
+            per_round.append((time.perf_counter() - t) / requests * 1e6)
+        out[name] = min(per_round)
+    t = time.perf_counter()
+    for _ in range(50):
+        client.get("/metrics")
+    out["/metrics scrape"] = (time.perf_counter() - t) / 50 * 1e6
+    if appmod.METRICS_ENABLED:
+        out.update(hook_costs(appmod, requests * rounds))
+    print(json.dumps(out))
+
+
+def hook_costs(appmod, n):
+    """The hooks alone, same process, so box noise doesn't swamp a few microseconds."""
+    from sqlalchemy import create_engine
+    app, profiler = appmod.app, appmod.profiler
+    with app.test_request_context("/api/complaints/1"):
+        response = app.response_class("x")
+        best = float("inf")
+        for _ in range(5):
+            t = time.perf_counter()
+            for _ in range(n // 5):
+                profiler._begin()
+                profiler._end(response)
+            best = min(best, (time.perf_counter() - t) / (n // 5))
+    per_request = best * 1e6
+
+    from utils.db_profile import configure_engine
+    # same pragmas / writer lock as the app's engine, only the profiler hooks missing
+    plain = create_engine(appmod.app.config["SQLALCHEMY_DATABASE_URI"], **appmod.app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+    configure_engine(plain, appmod.DB_PROFILE)
+    with app.app_context():
+        hooked = appmod.db.engine
+    timings = {}
+    with plain.connect() as a, hooked.connect() as b:
+        for _ in range(5):
+            for name, conn in (("plain", a), ("hooked", b)):
+                t = time.perf_counter()
+                for _ in range(n // 5):
+                    conn.exec_driver_sql("SELECT 1")
+                timings[name] = min(timings.get(name, float("inf")), (time.perf_counter() - t) / (n // 5))
+    return {"hooks per request": per_request, "hooks per query": (timings["hooked"] - timings["plain"]) * 1e6,
+            "query": timings["plain"] * 1e6}
+
+
+def run(enabled, requests, rounds):
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, METRICS_ENABLED="1" if enabled else "0",
+               DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+               NOTIFY_QUEUE_PATH=os.path.join(tmp, "notify.db"),
+               JWT_SECRET_KEY="bench-secret-key-long-enough-for-hs256", SLOW_REQUEST_SECONDS="60")
+    res = subprocess.run([sys.executable, __file__, "--worker", "--requests", str(requests), "--rounds", str(rounds)],
+                         env=env, capture_output=True, text=True, check=True)
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--processes", type=int, default=3, help="processes per setting, alternating")
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.worker:
+        worker(args.requests, args.rounds)
+        return
+
+    results = {False: [], True: []}
+    for _ in range(args.processes):
+        for enabled in (False, True):
+            results[enabled].append(run(enabled, args.requests, args.rounds))
+    off, on = ({k: min(r[k] for r in results[enabled]) for k in results[enabled][0]} for enabled in (False, True))
+    print(f"{args.requests} requests x {args.rounds} rounds x {args.processes} processes per route, "
+          f"best round per request\n")
+    print(f"{'route':<34} | {'off µs':>8} | {'on µs':>8} | {'overhead':>14}")
+    for name, _ in ROUTES:
+        d = on[name] - off[name]
+        print(f"{name:<34} | {off[name]:8.1f} | {on[name]:8.1f} | {d:+6.1f} µs {d / off[name] * 100:+5.1f}%")
+    print(f"{'/metrics scrape':<34} | {'':>8} | {on['/metrics scrape']:8.1f} |")
+    print(f"\nhooks alone: {on['hooks per request']:.1f} µs per request (before/after_request), "
+          f"{on['hooks per query']:.1f} µs per SQL statement (SELECT 1 takes {on['query']:.1f} µs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_pagination.py
+# Full-table admin listing (old) vs keyset pages with projected columns.
+#
+#   python benchmarks/bench_pagination.py [--sizes 10000,100000,1000000]
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+def seed(db, n, rng):
+    db.session.execute(db.text("DELETE FROM complaint"))
+    base = datetime.datetime(2024, 1, 1)
+    conn = db.session.connection().connection.driver_connection
+    conn.executemany(
+        "INSERT INTO complaint (ref_id, reporter_name, email, description, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"{i:012X}", "bench", f"user{i % 500}@example.com", "x" * rng.randint(50, 400), "New",
+          (base + datetime.timedelta(seconds=i * 7)).isoformat(sep=" ")) for i in range(n))
+    )
+    db.session.commit()
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--sizes", default="10000,100000,500000")
+    p.add_argument("--page", type=int, default=50)
+    args = p.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["NOTIFY_QUEUE_PATH"] = os.path.join(tmp, "notify.db")
+    from app import create_app, db, Complaint, ADMIN_DASHBOARD_COLUMNS
+    app = create_app()
+    from utils.pagination import keyset_page
+
+    rng = random.Random(7)
+    print(f"{'rows':>9} | {'old .all()':>11} | {'first page':>10} | {'middle page':>11} | {'last page':>9}")
+    with app.app_context():
+        for n in [int(x) for x in args.sizes.split(",")]:
+            seed(db, n, rng)
+            q = db.session.query(*ADMIN_DASHBOARD_COLUMNS)
+
+            def page_at(fraction):
+                # cursor of the row `fraction` of the way down the listing
+                row = db.session.query(Complaint.created_at, Complaint.id).order_by(
+                    Complaint.created_at.desc(), Complaint.id.desc()).offset(int(n * fraction)).first()
+                cursor = (row.created_at, row.id)
+                return lambda: keyset_page(q, Complaint.created_at, Complaint.id, cursor, args.page)
+
+            old = timed(lambda: Complaint.query.order_by(Complaint.created_at.desc()).all(), repeat=1 if n > 100000 else 3)
+            first = timed(lambda: keyset_page(q, Complaint.created_at, Complaint.id, None, args.page))
+            middle = timed(page_at(0.5))
+            last = timed(page_at(0.999))
+            db.session.expunge_all()
+            print(f"{n:>9} | {old:>8.1f} ms | {first:>7.2f} ms | {middle:>8.2f} ms | {last:>6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
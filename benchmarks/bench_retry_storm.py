@@ -0,0 +1,161 @@
+# benchmarks/bench_retry_storm.py
+# Complaint intake under resubmission storms, with the intake guard off and on.
+#
+# Every citizen files one complaint through POST /api/complaints and then sends it
+# again --repeats times, from --threads threads at once so the copies race each
+# other: half are client retries with the same Idempotency-Key, half are the
+# citizen re-typing it (no key, different case and punctuation, a few metres away).
+# One more citizen floods --flood distinct complaints as fast as it can.
+#
+# Each setting runs in a fresh process and reports what the storm cost: complaint
+# rows written, officers taken out of the pool, push notifications queued, plus
+# latency of first submissions vs repeats and how much of the flood got through.
+#
+#   python benchmarks/bench_retry_storm.py [--citizens 200] [--repeats 4] [--threads 8] [--flood 100]
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+LAT, LON = (28.4, 28.6), (77.0, 77.2)
+WORDS = ["bike", "stolen", "near", "market", "gate", "car", "broken", "window", "noise", "night", "fight",
+         "street", "shop", "phone", "snatched", "accident", "bus", "stop", "house", "locked"]
+SETTINGS = {
+    "off": {"INTAKE_DUPLICATE_WINDOW": "0", "INTAKE_RATE_PER_MIN": "0"},
+    "on": {},
+}
+
+
+def worker(args):
+    from flask_jwt_extended import create_access_token
+    import app as appmod
+    from app import db, User
+    app = appmod.create_app()
+    rng = random.Random(11)
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {"username": f"officer{i}", "password": "x", "role": "officer", "is_available": True,
+             "fcm_token": f"device-{i}", "latitude": rng.uniform(*LAT), "longitude": rng.uniform(*LON)}
+            for i in range(args.citizens * 2)])
+        db.session.execute(User.__table__.insert(), [
+            {"username": f"citizen{i}@example.com", "password": "x", "role": "user"} for i in range(args.citizens + 1)])
+        db.session.commit()
+        citizens = {u.username: u.id for u in User.query.filter_by(role="user")}
+        tokens = {name: create_access_token(identity=str(uid), additional_claims={"role": "user", "username": name})
+                  for name, uid in citizens.items()}
+    appmod.officer_index.clear()
+
+    # (token, body, idempotency key, first?) for every attempt, copies shuffled in among the originals
+    attempts = []
+    for i in range(args.citizens):
+        name = f"citizen{i}@example.com"
+        lat, lon = rng.uniform(*LAT), rng.uniform(*LON)
+        desc = " ".join(rng.choice(WORDS) for _ in range(8))
+        body = {"description": desc, "incident_type": "Theft", "email": name, "phone_number": f"98{i:08d}",
+                "latitude": lat, "longitude": lon}
+        key = f"k{i}"
+        attempts.append((tokens[name], body, key, True))
+        for r in range(args.repeats):
+            if r % 2 == 0:
+                attempts.append((tokens[name], body, key, False))
+            else:
+                retyped = dict(body, description=desc.capitalize() + "!!", latitude=lat + 0.0002)
+                attempts.append((tokens[name], retyped, None, False))
+    # originals first in each thread's share, so most repeats find theirs filed or in flight
+    rng.shuffle(attempts)
+    attempts.sort(key=lambda a: not a[3])
+    flooder = tokens[f"citizen{args.citizens}@example.com"]
+    flood = [(flooder, {"description": f"flood {n} " + " ".join(rng.choice(WORDS) for _ in range(6)),
+                        "incident_type": "Other", "latitude": rng.uniform(*LAT), "longitude": rng.uniform(*LON)},
+              None, True) for n in range(args.flood)]
+
+    lat_first, lat_repeat, statuses = [], [], []
+    lock = threading.Lock()
+
+    def run(share):
+        client = app.test_client()
+        local = []
+        for token, body, key, first in share:
+            headers = {"Authorization": f"Bearer {token}"}
+            if key:
+                headers["Idempotency-Key"] = key
+            t = time.perf_counter()
+            resp = client.post("/api/complaints", json=body, headers=headers)
+            local.append((first, time.perf_counter() - t, resp.status_code))
+        with lock:
+            for first, took, status in local:
+                (lat_first if first else lat_repeat).append(took)
+                statuses.append(status)
+
+    t = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(attempts[i::args.threads],)) for i in range(args.threads)]
+    threads.append(threading.Thread(target=run, args=(flood,)))
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    took = time.perf_counter() - t
+
+    with app.app_context():
+        flooded = db.session.execute(db.text("SELECT COUNT(*) FROM complaint WHERE description LIKE 'flood %'")).scalar()
+        written = db.session.execute(db.text("SELECT COUNT(*) FROM complaint")).scalar()
+        busy = db.session.execute(db.text("SELECT COUNT(*) FROM user WHERE role = 'officer' AND NOT is_available")).scalar()
+    conn = sqlite3.connect(os.environ["NOTIFY_QUEUE_PATH"])
+    pushes = conn.execute("SELECT COUNT(*) FROM outbox WHERE channel = 'fcm'").fetchone()[0]
+    conn.close()
+    print(json.dumps({
+        "requests": len(statuses), "rps": len(statuses) / took, "written": written - flooded,
+        "officers_taken": busy, "pushes": pushes, "flood_written": flooded,
+        "limited": sum(1 for s in statuses if s == 429), "errors": sum(1 for s in statuses if s >= 500),
+        "p50_first_ms": statistics.median(lat_first) * 1000, "p50_repeat_ms": statistics.median(lat_repeat) * 1000,
+    }))
+
+
+def run(setting, args):
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+               NOTIFY_QUEUE_PATH=os.path.join(tmp, "notify.db"), NOTIFY_WORKERS="0",   # keep the outbox to count it
+               JWT_SECRET_KEY="bench-secret-key-long-enough-for-hs256", SLOW_REQUEST_SECONDS="60",
+               ARCHIVE_INTERVAL_SECONDS="0", **SETTINGS[setting])
+    res = subprocess.run([sys.executable, __file__, "--worker", "--citizens", str(args.citizens), "--repeats",
+                          str(args.repeats), "--threads", str(args.threads), "--flood", str(args.flood)],
+                         env=env, capture_output=True, text=True, check=True)
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--citizens", type=int, default=200)
+    ap.add_argument("--repeats", type=int, default=4, help="copies of each complaint after the first")
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--flood", type=int, default=100, help="distinct complaints from one citizen")
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.worker:
+        worker(args)
+        return
+
+    print(f"{args.citizens} complaints x {1 + args.repeats} submissions each over {args.threads} threads, "
+          f"plus {args.flood} from one citizen\n")
+    print(f"{'guard':>5} | {'req/s':>6} | {'rows':>5} | {'officers':>8} | {'pushes':>6} | {'first p50':>9} | "
+          f"{'repeat p50':>10} | {'flood rows':>10} | {'429':>4} | {'5xx':>4}")
+    for setting in SETTINGS:
+        r = run(setting, args)
+        print(f"{setting:>5} | {r['rps']:6.0f} | {r['written']:>5} | {r['officers_taken']:>8} | {r['pushes']:>6} | "
+              f"{r['p50_first_ms']:7.1f}ms | {r['p50_repeat_ms']:8.1f}ms | {r['flood_written']:>10} | "
+              f"{r['limited']:>4} | {r['errors']:>4}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# benchmarks/bench_scaling.py
+# Throughput of serve.py with 1, 2, 4 and 8 worker processes, and a check that
+# no officer was ever holding two complaints at once.
+#
+# Every run starts from the same seeded DB (officers, citizens, one admin) and
+# drives the server over HTTP from client processes with a mix of:
+#
+#   intake          POST /api/complaints (citizen JWT), immediate dispatch
+#   resolve         GET /api/officer/assigned, then POST .../status Resolved on one of them;
+#                   the freed officer is handed a waiting complaint or goes back to the pool
+#   batch_dispatch  POST /api/admin/dispatch/batch
+#   read            GET /api/complaints/<id>
+#
+# with the escalation pass ticking every second on whichever worker holds its lease.
+# Afterwards complaint_history is replayed in commit order (history ids) and any
+# assignment to an officer who still had an open complaint counts as a double
+# assignment, as does a complaint assigned twice.
+#
+#   python benchmarks/bench_scaling.py [--workers 1,2,4,8] [--duration 20] [--clients 32] [--officers 200]
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+LAT, LON = (28.4, 28.6), (77.0, 77.2)
+MIX = {"intake": 45, "resolve": 30, "read": 23, "batch_dispatch": 2}
+CITIZENS = 1000
+SECRET = "bench-secret-key-long-enough-for-hs256"
+
+
+# ---------------- seeding ----------------
+def seed(path, officers):
+    """Seeded template DB plus JWTs for everybody in it."""
+    tmp = os.path.dirname(path)
+    os.environ.update(DATABASE_URL=f"sqlite:///{path}", NOTIFY_QUEUE_PATH=os.path.join(tmp, "seed-notify.db"),
+                      JWT_SECRET_KEY=SECRET)
+    from flask_jwt_extended import create_access_token
+    from app import create_app, db, User
+    app = create_app(background=False)
+    rng = random.Random(5)
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {"id": i, "username": f"officer{i}", "password": "x", "role": "officer", "is_available": True,
+             "latitude": rng.uniform(*LAT), "longitude": rng.uniform(*LON)} for i in range(1, officers + 1)])
+        db.session.execute(User.__table__.insert(), [
+            {"id": officers + i, "username": f"citizen{i}@example.com", "password": "x", "role": "user"}
+            for i in range(1, CITIZENS + 1)])
+        admin_id = officers + CITIZENS + 1
+        db.session.execute(User.__table__.insert(), [{"id": admin_id, "username": "admin", "password": "x",
+                                                       "role": "admin"}])
+        db.session.commit()
+
+        def token(uid, role, name):
+            return create_access_token(identity=str(uid), additional_claims={"role": role, "username": name})
+        tokens = {
+            "officers": [token(i, "officer", f"officer{i}") for i in range(1, officers + 1)],
+            "citizens": [token(officers + i, "user", f"citizen{i}@example.com") for i in range(1, CITIZENS + 1)],
+            "admin": token(admin_id, "admin", "admin"),
+        }
+        db.session.execute(db.text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        db.session.remove()
+        db.engine.dispose()
+    return tokens
+
+
+# ---------------- load ----------------
+def client(port, tokens, duration, threads, seed_, out):
+    """One client process: `threads` threads issuing requests until the deadline, latencies to `out`."""
+    deadline = time.time() + duration
+    ops, weights = list(MIX), list(MIX.values())
+    results = []
+    lock = threading.Lock()
+
+    def call(method, path, token, body=None):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        headers = {"Authorization": f"Bearer {token}"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        resp = conn.getresponse()
+        data = resp.read()
+        conn.close()
+        return resp.status, data
+
+    def run(rng):
+        local = []
+        ids = []
+        while time.time() < deadline:
+            op = rng.choices(ops, weights)[0]
+            t = time.perf_counter()
+            if op == "intake":
+                status, data = call("POST", "/api/complaints", rng.choice(tokens["citizens"]), {
+                    "description": "bench complaint", "incident_type": rng.choice(["Theft", "Accident", "Other"]),
+                    "latitude": rng.uniform(*LAT), "longitude": rng.uniform(*LON)})
+                if status == 200:
+                    ids.append(json.loads(data)["id"])
+            elif op == "resolve":
+                token = rng.choice(tokens["officers"])
+                status, data = call("GET", "/api/officer/assigned?limit=5", token)
+                mine = [c["id"] for c in json.loads(data) if c["status"] == "Assigned"] if status == 200 else []
+                if mine:
+                    status, _ = call("POST", f"/api/complaints/{mine[0]}/status", token, {"status": "Resolved"})
+            elif op == "batch_dispatch":
+                status, _ = call("POST", "/api/admin/dispatch/batch", tokens["admin"], {})
+            else:
+                status, _ = call("GET", f"/api/complaints/{rng.choice(ids) if ids else 1}", tokens["admin"])
+            local.append((op, time.perf_counter() - t, status))
+        with lock:
+            results.extend(local)
+
+    workers = [threading.Thread(target=run, args=(random.Random(seed_ * 1000 + i),)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    out.put(results)
+
+
+# ---------------- checks ----------------
+def double_assignments(path):
+    """(officers given a complaint while still holding one, complaints assigned more than once, open mismatches)"""
+    conn = sqlite3.connect(path)
+    officer_of = dict(conn.execute("SELECT id, assigned_officer_id FROM complaint"))
+    busy = {}
+    overlaps = 0
+    assigned = set()
+    twice = 0
+    for cid, new in conn.execute("SELECT complaint_id, new_status FROM complaint_history ORDER BY id"):
+        oid = officer_of.get(cid)
+        if new == "Assigned":
+            if cid in assigned:
+                twice += 1
+            assigned.add(cid)
+            if busy.get(oid) is not None:
+                overlaps += 1
+            busy[oid] = cid
+        elif new in ("Resolved", "Closed") and oid is not None and busy.get(oid) == cid:
+            busy[oid] = None
+    # officers marked available while they still have an open complaint, or busy with none
+    mismatched = conn.execute(
+        "SELECT COUNT(*) FROM user u WHERE u.role = 'officer' AND u.is_available = "
+        "(SELECT COUNT(*) > 0 FROM complaint c WHERE c.assigned_officer_id = u.id AND c.status = 'Assigned')"
+    ).fetchone()[0]
+    counts = dict(conn.execute("SELECT status, COUNT(*) FROM complaint GROUP BY status"))
+    conn.close()
+    return overlaps, twice, mismatched, counts
+
+
+# ---------------- driver ----------------
+def run(template, tokens, workers, args):
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "bench.db")
+    shutil.copy(template, path)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}", NOTIFY_QUEUE_PATH=os.path.join(tmp, "notify.db"),
+               JWT_SECRET_KEY=SECRET, ARCHIVE_INTERVAL_SECONDS="0", DISPATCH_TICK_SECONDS="1",
+               AUTO_MIGRATE="0", SLOW_REQUEST_SECONDS="60", PYTHONUNBUFFERED="1")
+    server = subprocess.Popen([sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1",
+                               "--port", "0", "--no-access-log"], env=env, stdout=subprocess.PIPE, text=True)
+    port, ready = None, 0
+    while ready < workers:
+        line = server.stdout.readline()
+        if not line:
+            raise SystemExit("serve.py exited during startup")
+        if line.startswith("listening on"):
+            port = int(line.split()[2].rsplit(":", 1)[1])
+        elif line.startswith("worker") and line.strip().endswith("ready"):
+            ready += 1
+
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    procs = [ctx.Process(target=client, args=(port, tokens, args.duration, args.clients // args.client_procs, i, out))
+             for i in range(args.client_procs)]
+    t = time.perf_counter()
+    for p in procs:
+        p.start()
+    results = [r for _ in procs for r in out.get()]
+    for p in procs:
+        p.join()
+    took = time.perf_counter() - t
+    time.sleep(1)   # let the last escalation tick finish
+    server.terminate()
+    server.wait(30)
+
+    overlaps, twice, mismatched, counts = double_assignments(path)
+    lat = sorted(r[1] for r in results)
+    errors = sum(1 for r in results if r[2] >= 500)
+    shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        "workers": workers, "requests": len(results), "rps": len(results) / took, "errors": errors,
+        "p50_ms": statistics.median(lat) * 1000, "p95_ms": lat[int(len(lat) * 0.95)] * 1000,
+        "complaints": sum(counts.values()), "assigned_open": counts.get("Assigned", 0),
+        "resolved": counts.get("Resolved", 0), "waiting": counts.get("New", 0),
+        "double_assigned": overlaps + twice, "availability_mismatch": mismatched,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", default="1,2,4,8")
+    ap.add_argument("--duration", type=float, default=20)
+    ap.add_argument("--clients", type=int, default=32, help="concurrent client threads in total")
+    ap.add_argument("--client-procs", type=int, default=4)
+    ap.add_argument("--officers", type=int, default=200)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    template = os.path.join(tmp, "template.db")
+    tokens = seed(template, args.officers)
+    print(f"{os.cpu_count()} CPU(s); {args.officers} officers, {args.clients} client threads, "
+          f"{args.duration:.0f}s per run\n")
+    print(f"{'workers':>7} | {'req/s':>7} | {'p50':>7} | {'p95':>8} | {'5xx':>4} | {'complaints':>10} | "
+          f"{'open':>5} | {'resolved':>8} | {'waiting':>7} | {'double':>6} | {'avail mismatch':>14}")
+    failed = False
+    for n in (int(x) for x in args.workers.split(",")):
+        r = run(template, tokens, n, args)
+        print(f"{r['workers']:>7} | {r['rps']:7.0f} | {r['p50_ms']:5.1f}ms | {r['p95_ms']:6.1f}ms | {r['errors']:>4} | "
+              f"{r['complaints']:>10,} | {r['assigned_open']:>5} | {r['resolved']:>8,} | {r['waiting']:>7,} | "
+              f"{r['double_assigned']:>6} | {r['availability_mismatch']:>14}", flush=True)
+        failed = failed or r["double_assigned"] or r["availability_mismatch"]
+    shutil.rmtree(tmp, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
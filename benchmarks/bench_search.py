@@ -0,0 +1,77 @@
+# benchmarks/bench_search.py
+# Latency of /api/admin/search style queries (FTS5 + BM25) as the table grows.
+#
+#   python benchmarks/bench_search.py [--sizes 100000,1000000]
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+WORDS = ("theft robbery chain snatching accident fight harassment fraud noise parking fire bike car phone "
+         "wallet market school hospital bus stand temple highway night morning woman man child shop").split()
+TYPES = ["Theft", "Accident", "Assault", "Fraud", "Harassment", "Other"]
+QUERIES = ["chain snatching sector 17", "bike theft", "accident highway", "phone", "fraud market sector 4",
+           "harass*"]
+
+
+def seed(db, start, n, rng):
+    base = datetime.datetime(2023, 1, 1)
+    conn = db.session.connection().connection.driver_connection
+    conn.executemany(
+        "INSERT INTO complaint (ref_id, reporter_name, description, location, incident_type, latitude, longitude, "
+        "status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((f"{i:012X}", f"citizen {i % 997}", " ".join(rng.choices(WORDS, k=rng.randint(6, 30))),
+          f"Sector {rng.randint(1, 60)}", rng.choice(TYPES), rng.uniform(28, 31), rng.uniform(74, 78),
+          rng.choice(["New", "Assigned", "Resolved", "Closed"]),
+          (base + datetime.timedelta(seconds=i * 30)).isoformat(sep=" ")) for i in range(start, start + n))
+    )
+    # a bulk load leaves many small FTS segments, merge them like an import would
+    conn.execute("INSERT INTO complaint_fts (complaint_fts) VALUES ('optimize')")
+    db.session.commit()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--sizes", default="100000,500000")
+    p.add_argument("--limit", type=int, default=50)
+    args = p.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["NOTIFY_QUEUE_PATH"] = os.path.join(tmp, "notify.db")
+    from app import create_app, db
+    app = create_app()
+    from utils.search import search_complaints
+
+    rng = random.Random(7)
+    have = 0
+    with app.app_context():
+        for n in sorted(int(x) for x in args.sizes.split(",")):
+            seed(db, have, n - have, rng)
+            have = n
+            for label, kwargs in [
+                ("text only", {}),
+                ("+ status", {"statuses": ["New"]}),
+                ("+ time + bbox", {"since": datetime.datetime(2023, 3, 1), "bbox": (29.0, 75.0, 30.0, 76.0)}),
+            ]:
+                times = []
+                for q in QUERIES:
+                    for _ in range(3):
+                        t0 = time.perf_counter()
+                        search_complaints(db.session, q, limit=args.limit, **kwargs)
+                        times.append((time.perf_counter() - t0) * 1000)
+                times.sort()
+                print(f"{n:>9} rows | {label:<14} | p50 {statistics.median(times):7.1f} ms | "
+                      f"max {times[-1]:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
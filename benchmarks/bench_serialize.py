@@ -0,0 +1,150 @@
+# benchmarks/bench_serialize.py
+# API serialization: the previous code paths vs utils/serialize.py, per endpoint.
+#
+#   legacy  ORM Query rows -> dicts -> Flask's stdlib jsonify (whole table: Complaint.query.all())
+#   new     Core select of the projection -> dicts -> orjson (whole table: streamed NDJSON)
+#
+# Reports median latency and peak Python memory (tracemalloc) of one full request
+# through the test client, body included.
+#
+#   python benchmarks/bench_serialize.py [--rows 20000] [--repeat 5]
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+def seed(appmod, rows):
+    from app import db, Complaint
+    rng = random.Random(3)
+    words = ["chain", "snatching", "theft", "accident", "fight", "noise", "sector", "market", "bike", "phone"]
+    base = time.time() - rows * 60
+    import datetime
+    with appmod.app.app_context():
+        db.session.execute(Complaint.__table__.insert(), [{
+            "ref_id": f"R{i:011d}", "reporter_name": "bench", "email": f"user{i % 500}@x", "phone_number": "9999999999",
+            "incident_type": rng.choice(["Theft", "Accident", "Violence", "Other"]),
+            "description": " ".join(rng.choice(words) for _ in range(12)), "location": "sector 17",
+            "latitude": 28.4 + rng.random() * 0.2, "longitude": 77.0 + rng.random() * 0.2, "status": "New",
+            "created_at": datetime.datetime.utcfromtimestamp(base + i * 60),
+        } for i in range(rows)])
+        db.session.commit()
+
+
+def legacy_routes(appmod):
+    """The endpoints as they were before the serialization layer."""
+    from flask import Blueprint, Response, request
+    from flask.json.provider import DefaultJSONProvider
+    from app import app, db, Complaint
+    from utils.pagination import keyset_page, iter_keyset
+
+    std = DefaultJSONProvider(app)
+    std.compact = True
+    bp = Blueprint("legacy", __name__, url_prefix="/legacy")
+    cols = (Complaint.id, Complaint.ref_id, Complaint.status, Complaint.assigned_officer_id, Complaint.created_at)
+
+    def item(c):
+        return {"id": c.id, "ref_id": c.ref_id, "status": c.status,
+                "assigned_officer": c.assigned_officer_id, "created_at": c.created_at}
+
+    @bp.get("/page")
+    def page():
+        rows, _ = keyset_page(db.session.query(*cols), Complaint.created_at, Complaint.id, None,
+                              int(request.args["limit"]))
+        return std.response([item(r) for r in rows])
+
+    @bp.get("/all")
+    def everything():
+        return std.response([item(c) for c in Complaint.query.all()])
+
+    @bp.get("/export")
+    def export():
+        q = db.session.query(*(cols + (
+            Complaint.reporter_name, Complaint.email, Complaint.phone_number, Complaint.incident_type,
+            Complaint.description, Complaint.location, Complaint.latitude, Complaint.longitude)))
+
+        def generate():
+            for r in iter_keyset(q, Complaint.created_at, Complaint.id):
+                yield std.dumps(r._asdict()) + "\n"
+        from flask import stream_with_context
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    @bp.get("/search")
+    def search_():
+        from utils import search
+        rows, _, _ = search.search_complaints(db.session, request.args["q"], limit=int(request.args["limit"]))
+        return std.response([{
+            "id": r.id, "ref_id": r.ref_id, "status": r.status, "incident_type": r.incident_type,
+            "location": r.location, "latitude": r.latitude, "longitude": r.longitude,
+            "assigned_officer": r.assigned_officer_id, "created_at": r.created_at, "score": r.score
+        } for r in rows])
+
+    app.register_blueprint(bp)
+
+
+def measure(client, url, headers, repeat):
+    def once():
+        resp = client.get(url, headers=headers)
+        body = resp.get_data()
+        assert resp.status_code == 200, (url, resp.status_code, body[:200])
+        return len(body)
+
+    once()
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        size = once()
+        times.append((time.perf_counter() - t) * 1000)
+    tracemalloc.start()
+    once()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak / 1e6, size / 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["NOTIFY_QUEUE_PATH"] = os.path.join(tmp, "notify.db")
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-long-enough-for-hs256")
+    import app as appmod
+    from flask_jwt_extended import create_access_token
+    from utils import serialize
+
+    appmod.create_app()
+    legacy_routes(appmod)
+    seed(appmod, args.rows)
+    with appmod.app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "admin", "username": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+    client = appmod.app.test_client()
+
+    cases = [
+        ("list page (limit=1000)", "/legacy/page?limit=1000", "/api/admin/complaints?limit=1000"),
+        ("whole table", "/legacy/all", "/api/admin/complaints?format=ndjson"),
+        ("export ndjson", "/legacy/export", "/api/admin/complaints/export"),
+        ("search (limit=500)", "/legacy/search?q=theft&limit=500", "/api/admin/search?q=theft&limit=500"),
+    ]
+    print(f"{args.rows} complaints, encoder: {'orjson' if serialize.orjson else 'json (orjson not installed)'}\n")
+    print(f"{'endpoint':<24} | {'code':<6} | {'median ms':>9} | {'peak MB':>8} | {'body MB':>7}")
+    for name, old, new in cases:
+        for label, url in (("legacy", old), ("new", new)):
+            ms, peak, size = measure(client, url, headers, args.repeat)
+            print(f"{name:<24} | {label:<6} | {ms:9.1f} | {peak:8.1f} | {size:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
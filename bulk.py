@@ -0,0 +1,84 @@
+# bulk.py
+# Bulk import / export of users, complaints and complaint history as CSV or JSONL.
+#
+#   python bulk.py import users|complaints|history FILE [--format csv|jsonl] [--chunk 5000]
+#                  [--workers N] [--on-conflict skip|fail]
+#   python bulk.py export users|complaints|history FILE|- [--format csv|jsonl] [--chunk 5000]
+#
+# Column names are the model's. Users need `password` (hashed here, in a process
+# pool) or an already hashed `password_hash`, which is what exports write. Rows
+# whose id / username / ref_id already exist are skipped unless --on-conflict fail. Files are streamed, so memory stays
+# flat for any size; progress and rows/s go to stderr.
+#
+# Imports bypass the ORM, so the complaint counters and hotspot cells are rebuilt afterwards.
+# Restart the app after importing officers or open complaints so the officer
+# index and the dispatch queue pick them up (with MULTIPROCESS=1 the running
+# workers are told to reload instead).
+import argparse
+import sys
+
+from sqlalchemy.exc import IntegrityError
+
+import app as appmod
+from app import create_app, db, User, Complaint, ComplaintHistory
+from utils import bulk, hotspots, stats
+
+TABLES = {"users": User, "complaints": Complaint, "history": ComplaintHistory}
+
+
+def do_import(args):
+    table = TABLES[args.table].__table__
+    fmt = bulk.detect_format(args.file, args.format)
+    progress = bulk.Progress(f"import {args.table}")
+    try:
+        inserted, bad = bulk.import_rows(db.engine, table, args.table, bulk.read_rows(args.file, fmt),
+                                         chunk=args.chunk, workers=args.workers,
+                                         skip_existing=args.on_conflict == "skip", progress=progress)
+    except IntegrityError as e:
+        # earlier chunks are committed, the failing one is rolled back
+        progress.done()
+        sys.exit(f"stopped: {e.orig}")
+    progress.done()
+    if bad:
+        print(f"{bad} bad rows skipped", file=sys.stderr)
+    if args.table in ("complaints", "history") and inserted:
+        with db.engine.begin() as conn:
+            stats.backfill(conn)
+            if args.table == "complaints":
+                hotspots.backfill(conn)
+        print("complaint_stats rebuilt" + (", complaint_hotspots rebuilt" if args.table == "complaints" else ""),
+              file=sys.stderr)
+    if inserted and appmod.feed is not None:
+        appmod.feed.publish({"resync": True})
+
+
+def do_export(args):
+    table = TABLES[args.table].__table__
+    fmt = bulk.detect_format(args.file, args.format)
+    writer = bulk.Writer(args.file, fmt, bulk.export_columns(table, args.table))
+    progress = bulk.Progress(f"export {args.table}")
+    try:
+        bulk.export_rows(db.engine, table, writer, batch=args.chunk, progress=progress)
+    finally:
+        writer.close()
+    progress.done()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bulk import / export of users, complaints and history")
+    ap.add_argument("command", choices=["import", "export"])
+    ap.add_argument("table", choices=list(TABLES))
+    ap.add_argument("file", help="path, or - for stdin / stdout")
+    ap.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    ap.add_argument("--chunk", type=int, default=5000, help="rows per INSERT batch / export page")
+    ap.add_argument("--workers", type=int, help="password hashing processes (default: CPU count)")
+    ap.add_argument("--on-conflict", choices=["skip", "fail"], default="skip",
+                    help="rows whose id / username / ref_id already exist")
+    args = ap.parse_args(argv)
+    app = create_app(background=False)
+    with app.app_context():
+        (do_import if args.command == "import" else do_export)(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
-from app import app, db, User
+from app import create_app, db, User
 from werkzeug.security import generate_password_hash
 
+app = create_app(background=False)
+
 with app.app_context():
     username = input("Enter username: ")
     password = input("Enter password: ")
@@ -0,0 +1,127 @@
+# migrate.py
+# Apply pending schema migrations and check that the hot queries use indexes.
+#
+#   python migrate.py            apply pending migrations
+#   python migrate.py status     show applied / pending versions
+#   python migrate.py plans      EXPLAIN every route query, exit 1 if one scans a table
+import os
+import re
+import sys
+
+# run migrations explicitly below, not on import
+os.environ.setdefault("AUTO_MIGRATE", "0")
+
+from sqlalchemy import text
+from app import create_app, db, User, Complaint, ComplaintHistory, ComplaintArchive, ComplaintHistoryArchive, \
+    USER_DASHBOARD_COLUMNS, OFFICER_DASHBOARD_COLUMNS, ADMIN_DASHBOARD_COLUMNS
+from utils.migrations import MIGRATIONS, apply_migrations, pending
+from utils.pagination import after
+from api import LIST, ARCHIVE_LIST, OFFICER_LIST
+import datetime
+
+
+def route_queries():
+    """(description, query or select()) pairs shaped exactly like the ones the routes run."""
+    cursor = (datetime.datetime(2025, 1, 1), 1000)
+
+    def page(q, cur=None, table=Complaint):
+        return after(q, table.created_at, table.id, cur).order_by(
+            table.created_at.desc(), table.id.desc()).limit(51)
+
+    user_q = db.session.query(*USER_DASHBOARD_COLUMNS).filter(Complaint.email == "a@b.c")
+    officer_q = db.session.query(*OFFICER_DASHBOARD_COLUMNS).filter(Complaint.assigned_officer_id == 1)
+    admin_q = db.session.query(*ADMIN_DASHBOARD_COLUMNS)
+    # the api blueprint's listings, Core selects through _paged()
+    api_user = LIST.select().where(Complaint.email == "a@b.c")
+    # ...and their continuation into the archive
+    archived_user_q = db.session.query(*(getattr(ComplaintArchive, c.key) for c in USER_DASHBOARD_COLUMNS)) \
+        .filter(ComplaintArchive.email == "a@b.c")
+    api_archived_user = ARCHIVE_LIST.select().where(ComplaintArchive.email == "a@b.c")
+    api_officer = OFFICER_LIST.select().where(Complaint.assigned_officer_id == 1)
+    officer_list = db.session.query(Complaint.id, Complaint.ref_id, Complaint.status, Complaint.created_at).filter(
+        Complaint.assigned_officer_id == 1)
+    return [
+        ("dashboard(user) / my_complaints", page(user_q)),
+        ("dashboard(user) next page", page(user_q, cursor)),
+        ("dashboard(officer) / officer_assigned", page(officer_q)),
+        ("dashboard(officer) next page", page(officer_q, cursor)),
+        ("dashboard(admin) / admin_search", page(admin_q)),
+        ("dashboard(admin) next page", page(admin_q, cursor)),
+        ("api my-complaints", page(api_user)),
+        ("api my-complaints next page", page(api_user, cursor)),
+        ("dashboard(user) / my_complaints archived", page(archived_user_q, table=ComplaintArchive)),
+        ("dashboard(user) archived next page", page(archived_user_q, cursor, ComplaintArchive)),
+        ("api my-complaints archived", page(api_archived_user, table=ComplaintArchive)),
+        ("api my-complaints archived next page", page(api_archived_user, cursor, ComplaintArchive)),
+        ("api officer/assigned", page(api_officer)),
+        ("api officer/assigned next page", page(api_officer, cursor)),
+        ("api admin/complaints", page(LIST.select())),
+        ("api admin/complaints next page", page(LIST.select(), cursor)),
+        ("api officers/<id>/complaints", page(officer_list)),
+        ("api officers/<id>/complaints next page", page(officer_list, cursor)),
+        ("api_get_complaint", db.session.query(Complaint).filter(Complaint.id == 1)),
+        ("ref_id lookup", db.session.query(Complaint.id).filter(Complaint.ref_id == "ABC")),
+        ("assign_nearest_officer index load",
+         db.session.query(User.id, User.latitude, User.longitude).filter_by(role='officer', is_available=True)),
+        ("dispatch_pending", db.session.query(Complaint.id, Complaint.latitude, Complaint.longitude).filter(
+            Complaint.status == "New", Complaint.assigned_officer_id.is_(None),
+            Complaint.latitude.isnot(None), Complaint.longitude.isnot(None),
+        ).order_by(Complaint.created_at).limit(500)),
+        ("waiting complaints load", db.session.query(Complaint.id, Complaint.latitude, Complaint.longitude).filter(
+            Complaint.status == "New", Complaint.assigned_officer_id.is_(None))),
+        ("login", db.session.query(User).filter_by(username="admin")),
+        ("complaint history", db.session.query(ComplaintHistory).filter(ComplaintHistory.complaint_id == 1)),
+        ("api_get_complaint archive fallback", db.session.query(ComplaintArchive).filter(ComplaintArchive.id == 1)),
+        ("archived ref_id lookup", db.session.query(ComplaintArchive.id).filter(ComplaintArchive.ref_id == "ABC")),
+        ("archived history", db.session.query(ComplaintHistoryArchive).filter(
+            ComplaintHistoryArchive.complaint_id == 1)),
+    ]
+
+
+# newest-first walks of the created_at index, which stop at LIMIT: what a listing with nothing to
+# seek on (admin, ref LIKE '%...%') should do, a wasted walk anywhere else
+ORDERED_WALKS = {"SCAN complaint USING INDEX ix_complaint_created_at",
+                 "SCAN complaint_archive USING INDEX ix_complaint_archive_created"}
+HOT_TABLES = {"complaint", "user", "complaint_history", "complaint_archive", "complaint_history_archive"}
+
+
+def table_scans(sql, plan):
+    """
+    Steps of `plan` (EXPLAIN QUERY PLAN details for `sql`) that scan a hot table: "SCAN complaint"
+    outright, or a walk of some index when the query has an equality filter it should SEARCH on.
+    """
+    filtered = re.search(r"\bWHERE\b.*[^<>!]=", sql, re.S) is not None
+    return [p for p in plan if p.split(" ")[:2] in (["SCAN", t] for t in HOT_TABLES)
+            and (p not in ORDERED_WALKS or filtered)]
+
+
+def check_plans():
+    if db.engine.dialect.name != "sqlite":
+        print("query plan check only supports SQLite")
+        return True
+    ok = True
+    for name, q in route_queries():
+        sql = str(getattr(q, "statement", q).compile(db.engine, compile_kwargs={"literal_binds": True}))
+        plan = [row[-1] for row in db.session.execute(text("EXPLAIN QUERY PLAN " + sql))]
+        full_scan = table_scans(sql, plan)
+        print(f"{'FAIL' if full_scan else 'ok  '} {name}: {' | '.join(plan)}")
+        ok = ok and not full_scan
+    return ok
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "apply"
+    app = create_app(background=False)
+    with app.app_context():
+        if cmd == "apply":
+            if not apply_migrations(db.engine):
+                print("database is up to date")
+        elif cmd == "status":
+            todo = {m[0] for m in pending(db.engine)}
+            for version, name, _, _ in MIGRATIONS:
+                print(f"{version:>4} {'pending' if version in todo else 'applied'}  {name}")
+        elif cmd == "plans":
+            sys.exit(0 if check_plans() else 1)
+        else:
+            print(__doc__ if __doc__ else "usage: python migrate.py [apply|status|plans]")
+            sys.exit(2)
@@ -1,35 +1,113 @@
-from datetime import datetime
+import datetime
+import uuid
+
 from flask_sqlalchemy import SQLAlchemy
+from flask_login import UserMixin
 
+# bound to the app in app.py; api.py and the scripts import the models from here
 db = SQLAlchemy()
 
-# Officer (police staff / admin bhi yahi table use karega)
-class Officer(db.Model):
+# ---------------- MODELS ----------------
+class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(120), nullable=False)
-    phone = db.Column(db.String(30), unique=True, nullable=False)
-    latitude = db.Column(db.Float, nullable=True)      # officer location
-    longitude = db.Column(db.Float, nullable=True)
-    is_available = db.Column(db.Boolean, default=True) # free/busy
-    role = db.Column(db.String(20), default='officer') # user/officer/admin
-    device_token = db.Column(db.String(255), nullable=True)  # for FCM push
+    username = db.Column(db.String(100), unique=True, nullable=False)
+    password = db.Column(db.String(200), nullable=False)
+    role = db.Column(db.String(20), default='user')  # 'user', 'officer', 'admin'
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    fcm_token = db.Column(db.String(255))
+    is_available = db.Column(db.Boolean, default=True)  # ✅ Added column to fix error
+
+    # existing databases get these through utils/migrations.py
+    __table_args__ = (
+        db.Index("ix_user_role_available", "role", "is_available"),
+    )
 
 class Complaint(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    description = db.Column(db.Text, nullable=False)
-    latitude = db.Column(db.Float, nullable=True)      # complaint location
-    longitude = db.Column(db.Float, nullable=True)
-    status = db.Column(db.String(50), default='new')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    ref_id = db.Column(db.String(12), unique=True, default=lambda: uuid.uuid4().hex[:12].upper())
+    reporter_name = db.Column(db.String(100))
+    email = db.Column(db.String(100))
+    phone_number = db.Column(db.String(15))
+    incident_type = db.Column(db.String(100))
+    description = db.Column(db.Text)
+    location = db.Column(db.String(200))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    maps_link = db.Column(db.String(300))
+    photo_path = db.Column(db.String(300))
+    status = db.Column(db.String(50), default="New")
+    assigned_officer_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, index=True)
 
-    # Auto-assignment field
-    assigned_officer_id = db.Column(db.Integer, db.ForeignKey('officer.id'), nullable=True)
-    assigned_officer = db.relationship('Officer', backref='complaints')
+    __table_args__ = (
+        db.Index("ix_complaint_email_created", "email", "created_at", "id"),
+        db.Index("ix_complaint_officer_created", "assigned_officer_id", "created_at", "id"),
+        db.Index("ix_complaint_status_created", "status", "created_at", "id"),
+    )
 
 class ComplaintHistory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     complaint_id = db.Column(db.Integer, db.ForeignKey('complaint.id'))
-    changed_by = db.Column(db.String(120))  # kisne change kiya (officer/admin/system)
     old_status = db.Column(db.String(50))
     new_status = db.Column(db.String(50))
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    changed_by = db.Column(db.String(100))
+    timestamp = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_complaint_history_complaint", "complaint_id", "timestamp"),
+    )
+
+# cold storage: complaints resolved / closed for ARCHIVE_AFTER_DAYS, moved here with their history by
+# utils/archive.py. Same columns (ids kept), no defaults or foreign keys, rows are only ever inserted and read.
+class ComplaintArchive(db.Model):
+    __tablename__ = "complaint_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    ref_id = db.Column(db.String(12), index=True)
+    reporter_name = db.Column(db.String(100))
+    email = db.Column(db.String(100))
+    phone_number = db.Column(db.String(15))
+    incident_type = db.Column(db.String(100))
+    description = db.Column(db.Text)
+    location = db.Column(db.String(200))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    maps_link = db.Column(db.String(300))
+    photo_path = db.Column(db.String(300))
+    status = db.Column(db.String(50))
+    assigned_officer_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("ix_complaint_archive_created", "created_at", "id"),
+        db.Index("ix_complaint_archive_email_created", "email", "created_at", "id"),
+    )
+
+class ComplaintHistoryArchive(db.Model):
+    __tablename__ = "complaint_history_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    complaint_id = db.Column(db.Integer)
+    old_status = db.Column(db.String(50))
+    new_status = db.Column(db.String(50))
+    changed_by = db.Column(db.String(100))
+    timestamp = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("ix_complaint_history_archive_complaint", "complaint_id", "timestamp"),
+    )
+
+class ComplaintStat(db.Model):
+    # counters kept up to date from ComplaintHistory inserts, see utils/stats.py
+    __tablename__ = "complaint_stats"
+    dimension = db.Column(db.String(20), primary_key=True)   # status, incident_type, hour, officer_open...
+    bucket = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class ComplaintHotspot(db.Model):
+    # complaints per hour x geohash cell x incident type, see utils/hotspots.py
+    __tablename__ = "complaint_hotspots"
+    hour = db.Column(db.Integer, primary_key=True, autoincrement=False)     # hours since the epoch, UTC
+    cell = db.Column(db.BigInteger, primary_key=True, autoincrement=False)  # geohash bits
+    incident_type = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,85 @@
+# serve.py
+# Production entry point: several worker processes behind one listening socket.
+#
+#   python serve.py [--workers 4] [--host 0.0.0.0] [--port 5000] [--no-access-log]
+#
+# Each worker is a fresh interpreter running create_app() behind werkzeug's
+# threaded WSGI server, accepting on the socket this process opened; the
+# kernel spreads connections across them. Workers share state through the
+# database (MULTIPROCESS=1, see utils/coordination.py) and one that dies is
+# restarted. Where gunicorn is installed, `gunicorn -w 4 --threads 8 wsgi:app`
+# does the same job.
+import argparse
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+
+def worker(host, port, fd, access_log):
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    if not access_log:
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server(host, port, create_app(), threaded=True, fd=fd)
+    # SystemExit out of serve_forever, so atexit still flushes buffered officer positions
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    # one write, so lines from workers starting together don't interleave on the shared stdout
+    sys.stdout.write(f"worker {os.getpid()} ready\n")
+    sys.stdout.flush()
+    server.serve_forever()
+
+
+def spawn(args, fd):
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--host", args.host, "--port", str(args.port),
+                             "--worker-fd", str(fd)] + ([] if args.access_log else ["--no-access-log"]),
+                            pass_fds=[fd], env=dict(os.environ, MULTIPROCESS="1"))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run the app with several worker processes")
+    ap.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS", os.cpu_count() or 1)))
+    ap.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("PORT", "5000")))
+    ap.add_argument("--no-access-log", dest="access_log", action="store_false", help="don't log every request")
+    ap.add_argument("--worker-fd", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.worker_fd is not None:
+        worker(args.host, args.port, args.worker_fd, args.access_log)
+        return
+
+    sock = socket.create_server((args.host, args.port), backlog=1024)
+    fd = sock.fileno()
+    args.port = sock.getsockname()[1]     # --port 0 picks a free one
+    print(f"listening on {args.host}:{args.port} with {args.workers} workers", flush=True)
+    procs = [spawn(args, fd) for _ in range(args.workers)]
+
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while not stopping:
+        time.sleep(0.5)
+        for i, p in enumerate(procs):
+            if p.poll() is not None and not stopping:
+                print(f"worker {p.pid} exited with {p.returncode}, restarting", flush=True)
+                procs[i] = spawn(args, fd)
+    for p in procs:
+        p.terminate()
+    for p in procs:
+        try:
+            p.wait(10)
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+# tests/conftest.py
+# Lets the tests import the app's modules the same way the benchmarks do, and points
+# everything app.py reads at import time at a temp dir, never instance/police.db.
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp(prefix="rapid-rescue-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_tmp, 'police.db')}",
+    NOTIFY_QUEUE_PATH=os.path.join(_tmp, "notifications.db"),
+    NOTIFY_WORKERS="0",
+    UPLOAD_FOLDER=os.path.join(_tmp, "uploads"),
+    JWT_SECRET_KEY="test-secret-key-long-enough-for-hs256",
+    ARCHIVE_INTERVAL_SECONDS="0",
+    MULTIPROCESS="0",
+)
@@ -0,0 +1,133 @@
+# tests/test_archive.py
+# Archiving against complaints that change under it: a complaint reopened after it was
+# picked stays live with its history, and a status change on a complaint archived since
+# it was loaded is refused rather than failing. Archived complaints stay listed for their reporter.
+import datetime
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm.attributes import set_committed_value
+from flask_jwt_extended import create_access_token
+from werkzeug.security import generate_password_hash
+
+import app as appmod
+from app import db, Complaint, User
+from models import ComplaintHistory, ComplaintArchive
+from utils.archive import Archiver, ArchivedComplaint
+
+OLD = datetime.datetime.utcnow() - datetime.timedelta(days=200)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Complaint.__table__.insert(), [
+            {"id": i, "ref_id": f"ARC{i:05d}", "status": "Resolved", "created_at": OLD} for i in range(1, 6)])
+        conn.execute(ComplaintHistory.__table__.insert(), [
+            {"complaint_id": i, "old_status": "Assigned", "new_status": "Resolved", "timestamp": OLD}
+            for i in range(1, 6)])
+    yield engine
+    engine.dispose()
+
+
+def archiver(engine):
+    return Archiver(engine, [c.name for c in Complaint.__table__.columns],
+                    [c.name for c in ComplaintHistory.__table__.columns], days=90)
+
+
+def ids(engine, table, column="id"):
+    with engine.connect() as conn:
+        return sorted(r[0] for r in conn.execute(text(f"SELECT {column} FROM {table}")))
+
+
+def test_archives_done_complaints_with_history(engine):
+    # 5 is the newest complaint and stays so ids aren't handed out again
+    assert archiver(engine).archive_batch() == 4
+    assert ids(engine, "complaint") == [5]
+    assert ids(engine, "complaint_archive") == [1, 2, 3, 4]
+    assert ids(engine, "complaint_history_archive", "complaint_id") == [1, 2, 3, 4]
+    assert ids(engine, "complaint_history", "complaint_id") == [5]
+
+
+def test_complaint_reopened_after_it_was_picked_stays_live(engine):
+    path = engine.url.database
+    done = []
+
+    def reopen(conn, cursor, sql, params, context, executemany):
+        # an officer reopens #2 between the candidate SELECT and the copy
+        if sql.startswith("INSERT INTO complaint_archive ") and not done:
+            done.append(True)
+            other = sqlite3.connect(path)
+            other.execute("UPDATE complaint SET status = 'Assigned' WHERE id = 2")
+            other.execute("INSERT INTO complaint_history (complaint_id, old_status, new_status, timestamp) "
+                          "VALUES (2, 'Resolved', 'Assigned', ?)", (datetime.datetime.utcnow().isoformat(" "),))
+            other.commit()
+            other.close()
+
+    event.listen(engine, "before_cursor_execute", reopen)
+    moved = []
+    arch = archiver(engine)
+    arch.on_moved = moved.extend
+    assert arch.archive_batch() == 3
+
+    assert moved == [1, 3, 4]
+    assert ids(engine, "complaint") == [2, 5]
+    assert ids(engine, "complaint_archive") == [1, 3, 4]
+    # #2 keeps both history rows, none of them went to the archive
+    assert ids(engine, "complaint_history", "complaint_id") == [2, 2, 5]
+    assert ids(engine, "complaint_history_archive", "complaint_id") == [1, 3, 4]
+    assert arch.stats()["complaints_moved"] == 3 and arch.stats()["history_moved"] == 3
+
+
+def test_status_change_on_a_complaint_archived_meanwhile():
+    appmod.create_app(background=False)
+    with appmod.app.app_context():
+        c = Complaint(ref_id="GONE00000001", status="Resolved")
+        db.session.add(c)
+        db.session.commit()
+        cid = c.id
+        c = db.session.get(Complaint, cid)
+        # the archive pass moves it out on another connection, and the status we hold is stale
+        with db.engine.begin() as conn:
+            conn.execute(text("DELETE FROM complaint WHERE id = :id"), {"id": cid})
+        set_committed_value(c, "status", "Assigned")
+
+        with pytest.raises(ArchivedComplaint):
+            appmod.change_status(c, "Closed", "officer")
+        # the session is still usable afterwards
+        assert db.session.get(Complaint, cid) is None
+        assert ComplaintHistory.query.filter_by(complaint_id=cid).count() == 0
+
+
+def test_archived_complaints_stay_listed_for_their_reporter():
+    app = appmod.create_app(background=False)
+    email = "reporter@example.com"
+    with app.app_context():
+        db.session.add(User(username=email, password=generate_password_hash("pw"), role="user"))
+        db.session.add(Complaint(ref_id="OLDREF000001", email=email, status="Closed", created_at=OLD))
+        db.session.commit()
+        db.session.add(Complaint(ref_id="NEWREF000001", email=email, status="New"))
+        db.session.commit()
+        assert archiver(db.engine).archive_batch() >= 1
+        assert db.session.query(ComplaintArchive.id).filter_by(ref_id="OLDREF000001").one()
+        token = create_access_token(identity="1", additional_claims={"role": "user", "username": email})
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    resp = client.get("/api/my-complaints", headers=headers)
+    assert [c["ref_id"] for c in resp.json] == ["NEWREF000001", "OLDREF000001"]
+    # one per page: the live one, then the cursor carries on into the archive
+    first = client.get("/api/my-complaints?limit=1", headers=headers)
+    assert [c["ref_id"] for c in first.json] == ["NEWREF000001"]
+    second = client.get(f"/api/my-complaints?limit=1&cursor={first.headers['X-Next-Cursor']}", headers=headers)
+    assert [c["ref_id"] for c in second.json] == ["OLDREF000001"]
+    assert "X-Next-Cursor" not in second.headers
+    streamed = client.get("/api/my-complaints?format=ndjson", headers=headers).data
+    assert streamed.count(b"\n") == 2 and b"OLDREF000001" in streamed
+
+    assert client.post("/login", data={"username": email, "password": "pw"}).status_code == 302
+    page = client.get("/dashboard").data
+    assert b"NEWREF000001" in page and b"OLDREF000001" in page
@@ -0,0 +1,331 @@
+# tests/test_notify.py
+# Delivery, retry and dead-lettering in utils/notify.py against local stand-ins:
+# a socketserver speaking just enough SMTP for email and an http.server playing FCM.
+import json
+import socketserver
+import sqlite3
+import threading
+import time
+from email import message_from_string
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.notify import FcmSender, NotificationQueue, PermanentError, SmtpSender
+
+
+# ---------------- STAND-INS ----------------
+class FakeSmtp(socketserver.ThreadingTCPServer):
+    """
+    Accepts mail on localhost; `replies` are SMTP error lines handed out before it starts accepting.
+    Just enough SMTP for smtplib without STARTTLS/AUTH, like benchmarks/bench_lifecycle.py's.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+        self.port = self.server_address[1]
+        self.received = []
+        self.replies = []
+        self.attempts = []
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.02}, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.wfile.write(b"220 test ESMTP\r\n")
+        rcpttos = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line[:4].upper()
+            if cmd in (b"EHLO", b"HELO"):
+                self.wfile.write(b"250-test\r\n250 8BITMIME\r\n")
+            elif cmd == b"MAIL":
+                rcpttos = []
+                self.wfile.write(b"250 ok\r\n")
+            elif cmd == b"RCPT":
+                rcpttos.append(line.decode().split(":", 1)[1].strip().strip("<>"))
+                self.wfile.write(b"250 ok\r\n")
+            elif cmd == b"DATA":
+                self.wfile.write(b"354 go ahead\r\n")
+                data = []
+                while (line := self.rfile.readline()) not in (b".\r\n", b".\n", b""):
+                    data.append(line[1:] if line.startswith(b"..") else line)
+                self.server.attempts.append(time.monotonic())
+                if self.server.replies:
+                    self.wfile.write(self.server.replies.pop(0).encode() + b"\r\n")
+                    continue
+                self.server.received.append((rcpttos, message_from_string(b"".join(data).decode())))
+                self.wfile.write(b"250 queued\r\n")
+            elif cmd == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 ok\r\n")
+
+
+class FakeFcm(ThreadingHTTPServer):
+    """
+    Answers every POST with the next scripted (status, json body) reply, then with the last one.
+    A reply of ("sleep", seconds) stalls that request past the client's timeout.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, replies):
+        super().__init__(("127.0.0.1", 0), _FcmHandler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/fcm/send"
+        self.replies = list(replies)
+        self.requests = []      # (monotonic time, headers, json body)
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.02}, daemon=True)
+        self._thread.start()
+
+    def next_reply(self):
+        return self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _FcmHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((time.monotonic(), dict(self.headers), body))
+        status, reply = self.server.next_reply()
+        if status == "sleep":
+            time.sleep(reply)
+            status, reply = 200, {"success": 1, "failure": 0, "results": [{"message_id": "late"}]}
+        data = json.dumps(reply).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+OK = (200, {"success": 1, "failure": 0, "results": [{"message_id": "1"}]})
+PUSH = {"token": "device-1", "title": "New complaint", "body": "Complaint #1 assigned to you"}
+MAIL = {"to": "citizen@example.com", "subject": "Complaint received", "body": "We're on it.", "from": "desk@example.com"}
+
+
+@pytest.fixture
+def smtp():
+    server = FakeSmtp()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fcm_server():
+    servers = []
+
+    def make(*replies):
+        servers.append(FakeFcm(replies or [OK]))
+        return servers[-1]
+
+    yield make
+    for s in servers:
+        s.stop()
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+
+    def make(senders, **kwargs):
+        kwargs = {"workers": 1, "max_attempts": 3, "backoff": 0.1, "poll": 0.02, **kwargs}
+        queues.append(NotificationQueue(str(tmp_path / "notify.db"), senders, **kwargs))
+        return queues[-1]
+
+    yield make
+    for q in queues:
+        q.stop()
+
+
+def wait_for(cond, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for the notification queue")
+        time.sleep(0.02)
+
+
+def outbox(queue):
+    conn = sqlite3.connect(queue.path)
+    try:
+        return conn.execute("SELECT channel, status, attempts, last_error FROM outbox").fetchall()
+    finally:
+        conn.close()
+
+
+# ---------------- SENDERS ----------------
+def test_smtp_sender_delivers_and_reuses_the_session(smtp):
+    sender = SmtpSender("127.0.0.1", smtp.port, None, None, starttls=False, timeout=5)
+    sender.send(MAIL)
+    sender.send(dict(MAIL, subject="Complaint resolved"))
+    sender.close()
+
+    assert [r for r, _ in smtp.received] == [["citizen@example.com"]] * 2
+    msg = smtp.received[0][1]
+    assert (msg["From"], msg["To"], msg["Subject"]) == ("desk@example.com", "citizen@example.com", "Complaint received")
+    assert "We're on it." in msg.get_payload()[0].get_payload()
+    assert smtp.received[1][1]["Subject"] == "Complaint resolved"
+
+
+def test_fcm_sender_posts_the_notification(fcm_server):
+    server = fcm_server()
+    sender = FcmSender(server.url, "server-key", timeout=5)
+    sender.send(PUSH)
+    sender.close()
+
+    (_, headers, body), = server.requests
+    assert headers["Authorization"] == "key=server-key"
+    assert body == {"to": "device-1", "notification": {"title": "New complaint", "body": "Complaint #1 assigned to you"}}
+    assert sender.stats()["http_calls"] == 1
+
+
+def test_fcm_sender_raises_permanent_on_4xx(fcm_server):
+    server = fcm_server((400, {"error": "bad request"}))
+    with pytest.raises(PermanentError):
+        FcmSender(server.url, "server-key", timeout=5).send(PUSH)
+
+
+def fcm_error(error):
+    return 200, {"success": 0, "failure": 1, "results": [{"error": error}]}
+
+
+def test_fcm_sender_prunes_rejected_tokens_one_by_one(fcm_server):
+    # FCM answers HTTP 200 for a dead token; the error is in results[]
+    server = fcm_server(fcm_error("NotRegistered"), fcm_error("InvalidRegistration"), fcm_error("Unavailable"))
+    pruned = []
+    sender = FcmSender(server.url, "server-key", timeout=5, on_invalid=pruned.extend)
+    with pytest.raises(PermanentError, match="NotRegistered"):
+        sender.send(PUSH)
+    with pytest.raises(PermanentError, match="InvalidRegistration"):
+        sender.send(dict(PUSH, token="device-2"))
+    with pytest.raises(RuntimeError, match="Unavailable"):
+        sender.send(dict(PUSH, token="device-3"))
+    assert pruned == ["device-1", "device-2"]
+    assert sender.stats()["invalid_tokens"] == 2
+
+
+def test_fcm_sender_prunes_rejected_tokens_in_batches(fcm_server):
+    server = fcm_server((200, {"success": 1, "failure": 1, "results": [{"message_id": "1"}, {"error": "NotRegistered"}]}))
+    pruned = []
+    sender = FcmSender(server.url, "server-key", timeout=5, batch_window=0.05, on_invalid=pruned.extend)
+    errors = sender.send_batch([PUSH, dict(PUSH, token="device-2")])
+    assert errors[0] is None and isinstance(errors[1], PermanentError)
+    assert pruned == ["device-2"]
+    assert server.requests[0][2]["registration_ids"] == ["device-1", "device-2"]
+
+
+def test_fcm_digest_of_a_long_backlog_stays_under_the_payload_limit(fcm_server):
+    server = fcm_server((200, {"success": 1, "failure": 0, "results": [{"message_id": "1"}]}))
+    sender = FcmSender(server.url, "server-key", timeout=5, batch_window=0.05)
+    backlog = [dict(PUSH, body=f"Complaint #{i} assigned to you: " + "chain snatching near the bus stop " * 6)
+               for i in range(500)]
+    assert sender.send_batch(backlog) == [None] * 500
+
+    (_, _, body), = server.requests
+    assert body["registration_ids"] == ["device-1"]
+    assert len(json.dumps(body).encode()) < 4096
+    lines = body["notification"]["body"].split("\n")
+    assert body["notification"]["title"] == "New complaint (500)"
+    assert lines[0].startswith("Complaint #0 ")
+    assert lines[-1] == f"… and {500 - (len(lines) - 1)} more"
+
+
+# ---------------- QUEUE ----------------
+def test_queue_delivers_email_and_push(smtp, fcm_server, make_queue):
+    server = fcm_server()
+    queue = make_queue({"email": SmtpSender("127.0.0.1", smtp.port, None, None, starttls=False, timeout=5),
+                        "fcm": FcmSender(server.url, "server-key", timeout=5)})
+    queue.enqueue("email", MAIL)
+    queue.enqueue("fcm", PUSH)
+
+    wait_for(lambda: all(m["sent"] == 1 for m in queue.metrics().values()))
+    assert len(smtp.received) == 1 and len(server.requests) == 1
+    assert outbox(queue) == []
+
+
+def test_queue_retries_fcm_5xx_with_backoff(fcm_server, make_queue):
+    server = fcm_server((503, {}), (500, {}), OK)
+    queue = make_queue({"fcm": FcmSender(server.url, "server-key", timeout=5)}, backoff=0.2)
+    queue.enqueue("fcm", PUSH)
+
+    wait_for(lambda: queue.metrics()["fcm"]["sent"] == 1)
+    t = [r[0] for r in server.requests]
+    assert len(t) == 3
+    # backoff doubles: 0.2s before the second try, 0.4s before the third
+    assert t[1] - t[0] >= 0.2 and t[2] - t[1] >= 0.4
+    assert queue.metrics()["fcm"]["retried"] == 2
+    assert outbox(queue) == []
+
+
+def test_queue_retries_fcm_timeout(fcm_server, make_queue):
+    server = fcm_server(("sleep", 1.0), OK)
+    queue = make_queue({"fcm": FcmSender(server.url, "server-key", timeout=0.3)})
+    queue.enqueue("fcm", PUSH)
+
+    wait_for(lambda: queue.metrics()["fcm"]["sent"] == 1)
+    assert len(server.requests) == 2
+    assert queue.metrics()["fcm"]["retried"] == 1
+
+
+def test_queue_retries_smtp_transient_error(smtp, make_queue):
+    smtp.replies = ["451 Requested action aborted: try again later"]
+    queue = make_queue({"email": SmtpSender("127.0.0.1", smtp.port, None, None, starttls=False, timeout=5)})
+    queue.enqueue("email", MAIL)
+
+    wait_for(lambda: queue.metrics()["email"]["sent"] == 1)
+    assert len(smtp.attempts) == 2 and smtp.attempts[1] - smtp.attempts[0] >= 0.1
+    assert len(smtp.received) == 1
+
+
+def test_queue_dead_letters_after_max_attempts(fcm_server, make_queue):
+    server = fcm_server((503, {}))
+    queue = make_queue({"fcm": FcmSender(server.url, "server-key", timeout=5)}, max_attempts=3, backoff=0.05)
+    queue.enqueue("fcm", PUSH)
+
+    wait_for(lambda: queue.metrics()["fcm"]["dead"] == 1)
+    assert len(server.requests) == 3
+    assert outbox(queue) == [("fcm", "failed", 3, "FCM HTTP 503")]
+    m = queue.metrics()["fcm"]
+    assert (m["retried"], m["failed"], m["sent"], m["pending"]) == (2, 1, 0, 0)
+    # nothing more goes out once it's dead
+    time.sleep(0.3)
+    assert len(server.requests) == 3
+
+
+def test_queue_dead_letters_permanent_errors_at_once(fcm_server, make_queue):
+    server = fcm_server((401, {"error": "unauthorized"}))
+    queue = make_queue({"fcm": FcmSender(server.url, "wrong-key", timeout=5)})
+    queue.enqueue("fcm", PUSH)
+
+    wait_for(lambda: queue.metrics()["fcm"]["dead"] == 1)
+    assert len(server.requests) == 1
+    assert outbox(queue)[0][:3] == ("fcm", "failed", 1)
+
+
+def test_queue_dead_letters_rejected_token_without_retrying(fcm_server, make_queue):
+    server = fcm_server(fcm_error("NotRegistered"))
+    pruned = []
+    queue = make_queue({"fcm": FcmSender(server.url, "server-key", timeout=5, on_invalid=pruned.extend)})
+    queue.enqueue("fcm", PUSH)
+
+    wait_for(lambda: queue.metrics()["fcm"]["dead"] == 1)
+    assert len(server.requests) == 1
+    assert pruned == ["device-1"]
+    assert outbox(queue) == [("fcm", "failed", 1, "NotRegistered")]
@@ -0,0 +1,156 @@
+# tests/test_query_plans.py
+# The hot listings must stay on indexes. Drives the real routes (api blueprint listings
+# through _paged(), the dashboards, the officer and waiting-complaint listings) against a
+# migrated SQLite database, records every SELECT they run and EXPLAINs it with the same
+# parameters, judged by migrate.py's table_scans(). migrate.py's own `plans` check runs too.
+import datetime
+import re
+
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+import app as appmod
+from app import db, User, Complaint, ComplaintArchive
+from flask_jwt_extended import create_access_token
+from utils.migrations import apply_migrations
+from utils.pagination import then_start_cursor
+from migrate import HOT_TABLES, check_plans, table_scans
+
+PAGE = appmod.DASHBOARD_PAGE_SIZE + 10      # enough rows that every listing has a second page
+
+
+@pytest.fixture(scope="module")
+def app():
+    application = appmod.create_app(background=False)
+    with application.app_context():
+        apply_migrations(db.engine, log=None)
+        db.session.execute(User.__table__.insert(), [
+            {"username": name, "password": generate_password_hash("pw"), "role": role, "is_available": True,
+             "latitude": 28.5, "longitude": 77.1}
+            for name, role in [("admin", "admin"), ("officer", "officer"), ("citizen@example.com", "user")]])
+        ids = dict(db.session.query(User.username, User.id))
+        start = datetime.datetime(2025, 1, 1)
+        db.session.execute(Complaint.__table__.insert(), [
+            {"ref_id": f"REF{i:08d}", "email": "citizen@example.com", "description": "bike stolen near market",
+             "incident_type": "Theft", "latitude": 28.5, "longitude": 77.1,
+             "status": "New" if i % 3 == 0 else "Assigned",
+             "assigned_officer_id": None if i % 3 == 0 else ids["officer"],
+             "created_at": start + datetime.timedelta(minutes=i)}
+            for i in range(PAGE * 2)])
+        # the citizen's archived complaints, listed after the live ones
+        db.session.execute(ComplaintArchive.__table__.insert(), [
+            {"id": 100000 + i, "ref_id": f"ARC{i:08d}", "email": "citizen@example.com", "status": "Closed",
+             "created_at": start - datetime.timedelta(minutes=i)}
+            for i in range(PAGE)])
+        db.session.commit()
+    application.config["TESTING"] = True
+    application.test_ids = ids
+    return application
+
+
+@pytest.fixture
+def statements(app):
+    """Every SELECT on a hot table run while the test body runs, as (sql, parameters)."""
+    seen = []
+
+    def record(conn, cursor, sql, params, context, executemany):
+        if sql.lstrip().upper().startswith("SELECT") and any(re.search(rf'\b"?{t}"?\b', sql) for t in HOT_TABLES):
+            seen.append((sql, params))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def query_plan(app, sql, params):
+    with app.app_context():
+        conn = db.engine.raw_connection()
+        try:
+            return [row[-1] for row in conn.cursor().execute("EXPLAIN QUERY PLAN " + sql, params)]
+        finally:
+            conn.close()
+
+
+def bearer(app, username, role):
+    with app.app_context():
+        token = create_access_token(identity=str(app.test_ids[username]),
+                                    additional_claims={"role": role, "username": username})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def get_two_pages(client, path, start="", **kwargs):
+    """First page (from the `start` cursor) and the one its X-Next-Cursor points at."""
+    sep = "&" if "?" in path else "?"
+    first = client.get(f"{path}{sep}limit=20" + (f"&cursor={start}" if start else ""), **kwargs)
+    assert first.status_code == 200, first.data
+    cursor = first.headers.get("X-Next-Cursor")
+    assert cursor, f"{path} should have a second page"
+    second = client.get(f"{path}{sep}limit=20&cursor={cursor}", **kwargs)
+    assert second.status_code == 200, second.data
+
+
+def assert_indexed(app, statements):
+    assert statements, "no queries were recorded"
+    bad = []
+    for sql, params in statements:
+        plan = query_plan(app, sql, params)
+        if table_scans(sql, plan):
+            bad.append(f"{' '.join(sql.split())}\n    -> {' | '.join(plan)}")
+    assert not bad, "full table scans:\n" + "\n".join(bad)
+
+
+def test_api_listings_use_indexes(app, statements):
+    client = app.test_client()
+    get_two_pages(client, "/api/my-complaints", headers=bearer(app, "citizen@example.com", "user"))
+    get_two_pages(client, "/api/my-complaints", then_start_cursor(), headers=bearer(app, "citizen@example.com", "user"))
+    get_two_pages(client, "/api/officer/assigned", headers=bearer(app, "officer", "officer"))
+    get_two_pages(client, "/api/admin/complaints", headers=bearer(app, "admin", "admin"))
+    get_two_pages(client, f"/api/officers/{app.test_ids['officer']}/complaints")
+    assert client.get("/api/complaints/1").status_code == 200
+    assert_indexed(app, statements)
+
+
+def test_dashboards_use_indexes(app, statements):
+    for username in ("citizen@example.com", "officer", "admin"):
+        client = app.test_client()
+        assert client.post("/login", data={"username": username, "password": "pw"}).status_code == 302
+        first = client.get("/dashboard")
+        assert first.status_code == 200
+        cursor = re.search(rb"cursor=([\w-]+)", first.data)
+        assert cursor, f"{username}'s dashboard should link a second page"
+        assert client.get(f"/dashboard?cursor={cursor.group(1).decode()}").status_code == 200
+    # the citizen's listing carries on into the archive
+    citizen = app.test_client()
+    citizen.post("/login", data={"username": "citizen@example.com", "password": "pw"})
+    archived = citizen.get(f"/dashboard?cursor={then_start_cursor()}")
+    assert b"ARC00000000" in archived.data
+    cursor = re.search(rb"cursor=([\w-]+)", archived.data)
+    assert cursor and citizen.get(f"/dashboard?cursor={cursor.group(1).decode()}").status_code == 200
+    # a ref that matches nothing live falls back to the archive
+    assert client.get("/dashboard?search_ref=NOSUCHREF").status_code == 200
+    assert_indexed(app, statements)
+
+
+def test_status_listings_use_indexes(app, statements):
+    # waiting-complaint queue and officer index loads, as on startup
+    with app.app_context():
+        appmod.dispatch_queue.loaded = False
+        appmod._ensure_dispatch_queue()
+        appmod.dispatch_ticker.stop()
+        appmod.officer_index.clear()
+        appmod._ensure_officer_index()
+        db.session.rollback()
+    # and the batch matcher's pending listing
+    resp = app.test_client().post("/api/admin/dispatch/batch", json={"max_km": 1},
+                                  headers=bearer(app, "admin", "admin"))
+    assert resp.status_code == 200
+    assert_indexed(app, statements)
+
+
+def test_migrate_plans_check_passes(app, capsys):
+    with app.app_context():
+        ok = check_plans()
+    assert ok, capsys.readouterr().out
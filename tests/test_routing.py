@@ -0,0 +1,30 @@
+# tests/test_routing.py
+# RoadGraph.rank on a small synthetic network: routable candidates by travel time,
+# the rest after them in the straight-line order dispatch_order() passed in.
+from utils.routing import MAX_SNAP_KM, RoadGraph
+
+# a straight road east along lat 28.5, nodes ~1 km apart, 30 s per km
+ROAD = RoadGraph.from_edges([28.5] * 6, [77.0 + 0.01 * i for i in range(6)],
+                            [(i, i + 1, 30.0, 0) for i in range(5)])
+FAR = (29.5, 78.0)      # ~150 km from any road node
+
+
+def test_rank_by_travel_time():
+    ranked = ROAD.rank(28.5, 77.0, [(1, 28.5, 77.05), (2, 28.5, 77.01), (3, 28.5, 77.03)])
+    assert [cid for cid, _ in ranked] == [2, 3, 1]
+    assert all(seconds is not None for _, seconds in ranked)
+
+
+def test_complaint_off_the_road_graph_keeps_straight_line_order():
+    assert ROAD.snap(*FAR) is None
+    # nearest first, as dispatch_order() hands them over; ids deliberately out of order
+    candidates = [(42, 28.5, 77.0), (7, 28.5, 77.03), (3, 28.5, 77.05)]
+    assert ROAD.rank(*FAR, candidates) == [(42, None), (7, None), (3, None)]
+
+
+def test_unroutable_officers_follow_routable_ones_in_given_order():
+    off_road = 28.5 + MAX_SNAP_KM / 50      # ~4.4 km north of the road
+    candidates = [(42, off_road, 77.0), (9, 28.5, 77.05), (7, off_road, 77.02), (3, 28.5, 77.01)]
+    ranked = ROAD.rank(28.5, 77.0, candidates)
+    assert [cid for cid, _ in ranked] == [3, 9, 42, 7]
+    assert [seconds is None for _, seconds in ranked] == [False, False, True, True]
@@ -0,0 +1,149 @@
+# utils/archive.py
+# Moves cold complaints out of the hot tables.
+#
+# A complaint that has been Resolved / Closed for `days` (counted from its last
+# history row) is copied with its history into complaint_archive /
+# complaint_history_archive and deleted from complaint / complaint_history, one
+# batch per transaction so the writer is never held for long. Ids are kept, so
+# lookups by id or ref_id can fall back to the archive; the counters in
+# complaint_stats keep counting archived complaints.
+import datetime
+import threading
+import time
+
+from sqlalchemy import bindparam, inspect, text
+
+DONE_STATUSES = ("Resolved", "Closed", "resolved", "closed")
+
+
+class ArchivedComplaint(Exception):
+    """The complaint was moved to the archive while it was being changed; archived ones are read-only."""
+
+# full-text indexes the moves touch (migrations 2 and 4). Each archived row leaves a delete marker in
+# complaint_fts that every search reads past until the segments are merged.
+FTS_TABLES = ("complaint_fts", "complaint_archive_fts")
+
+
+def _due(c, history):
+    """Complaint `c` is done and has been quiet since the cutoff, going by its rows in `history`."""
+    return (f"{c}.status IN :statuses AND COALESCE((SELECT MAX(h.timestamp) FROM {history} h "
+            f"WHERE h.complaint_id = {c}.id), {c}.created_at) < :cutoff")
+
+
+# the newest complaint / history row stays put: SQLite hands out max(id) + 1, and an emptied
+# table would start again at 1 and reuse ids that are in the archive
+CANDIDATES = text(
+    "SELECT c.id FROM complaint c "
+    f"WHERE {_due('c', 'complaint_history')} "
+    "AND c.id < (SELECT MAX(id) FROM complaint) "
+    "AND NOT EXISTS (SELECT 1 FROM complaint_history h WHERE h.complaint_id = c.id "
+    "AND h.id = (SELECT MAX(id) FROM complaint_history)) "
+    "LIMIT :batch"
+).bindparams(bindparam("statuses", expanding=True))
+
+
+def _copy(source, target, columns, key):
+    cols = ", ".join(columns)
+    return text(f"INSERT INTO {target} ({cols}) SELECT {cols} FROM {source} WHERE {key} IN :ids") \
+        .bindparams(bindparam("ids", expanding=True))
+
+
+def _delete(table, key):
+    return text(f"DELETE FROM {table} WHERE {key} IN :ids").bindparams(bindparam("ids", expanding=True))
+
+
+# candidates are picked before the writer lock is taken, so a complaint may have been reopened
+# since; the copy and the delete check again. The delete runs after the history has moved, so it
+# reads the archived copy of it.
+DELETE_COMPLAINTS = text(
+    f"DELETE FROM complaint WHERE id IN :ids AND {_due('complaint', 'complaint_history_archive')}"
+).bindparams(bindparam("ids", expanding=True), bindparam("statuses", expanding=True))
+MOVED = text("SELECT id FROM complaint_archive WHERE id IN :ids").bindparams(bindparam("ids", expanding=True))
+
+
+class Archiver:
+    def __init__(self, engine, complaint_columns, history_columns, days=90, batch=500, pause=0.05,
+                 on_moved=None):
+        """
+        complaint_columns / history_columns: column names shared by each hot table and its archive.
+        on_moved(complaint_ids): called after every committed batch (e.g. drop cached pages).
+        """
+        self.engine = engine
+        self.days = days
+        self.batch = batch
+        self.pause = pause
+        self.on_moved = on_moved
+        self._copy_complaints = text(
+            f"INSERT INTO complaint_archive ({', '.join(complaint_columns)}, archived_at) "
+            f"SELECT {', '.join(complaint_columns)}, :now FROM complaint c "
+            f"WHERE c.id IN :ids AND {_due('c', 'complaint_history')}"
+        ).bindparams(bindparam("ids", expanding=True), bindparam("statuses", expanding=True))
+        self._copy_history = _copy("complaint_history", "complaint_history_archive", history_columns, "complaint_id")
+        self._lock = threading.Lock()       # one run at a time (ticker vs CLI in the same process)
+        self.complaints_moved = 0
+        self.history_moved = 0
+        self.batches = 0
+        self.last_run = None
+
+    def cutoff(self, now=None):
+        return (now or datetime.datetime.utcnow()) - datetime.timedelta(days=self.days)
+
+    def archive_batch(self, now=None):
+        """Move up to `batch` complaints. Returns the number moved."""
+        now = now or datetime.datetime.utcnow()
+        due = {"statuses": list(DONE_STATUSES), "cutoff": self.cutoff(now)}
+        with self.engine.begin() as conn:
+            ids = [r[0] for r in conn.execute(CANDIDATES, {**due, "batch": self.batch})]
+            if not ids:
+                return 0
+            # first write: holds the writer lock from here, so what got copied is what moves
+            conn.execute(self._copy_complaints, {**due, "ids": ids, "now": now})
+            ids = [r[0] for r in conn.execute(MOVED, {"ids": ids})]
+            if not ids:
+                return 0
+            history = conn.execute(self._copy_history, {"ids": ids}).rowcount
+            conn.execute(_delete("complaint_history", "complaint_id"), {"ids": ids})
+            if conn.execute(DELETE_COMPLAINTS, {**due, "ids": ids}).rowcount != len(ids):
+                raise RuntimeError("complaints changed while being archived")
+        self.complaints_moved += len(ids)
+        self.history_moved += history
+        self.batches += 1
+        if self.on_moved:
+            self.on_moved(ids)
+        return len(ids)
+
+    def run(self, max_batches=None, log=None):
+        """Archive everything due, batch by batch. Returns the number of complaints moved."""
+        if self.days <= 0:
+            return 0
+        with self._lock:
+            moved = batches = 0
+            started = time.perf_counter()
+            while max_batches is None or batches < max_batches:
+                n = self.archive_batch()
+                moved += n
+                batches += 1
+                if log and n:
+                    rate = moved / max(time.perf_counter() - started, 1e-9)
+                    log(f"archived {moved:,} complaints ({rate:,.0f}/s)")
+                if n < self.batch:
+                    break
+                # let request writers in between batches
+                time.sleep(self.pause)
+            if moved:
+                self.optimize()
+            self.last_run = time.time()
+            return moved
+
+    def optimize(self):
+        """Merge the full-text index segments after a run (SQLite only)."""
+        if self.engine.dialect.name != "sqlite":
+            return
+        with self.engine.begin() as conn:
+            for table in FTS_TABLES:
+                if inspect(conn).has_table(table):
+                    conn.execute(text(f"INSERT INTO {table} ({table}) VALUES ('optimize')"))
+
+    def stats(self):
+        return {"complaints_moved": self.complaints_moved, "history_moved": self.history_moved,
+                "batches": self.batches, "last_run": self.last_run}
@@ -0,0 +1,140 @@
+# utils/batch_dispatch.py
+# Batch dispatch: match a burst of complaints to officers in one go instead of
+# greedily grabbing the nearest officer per complaint.
+import threading
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy is optional, fall back to our own solver
+    linear_sum_assignment = None
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_matrix(lat1, lon1, lat2, lon2):
+    """Distance in km between every point of set 1 (rows) and set 2 (columns)."""
+    lat1 = np.radians(np.asarray(lat1, dtype=float))[:, None]
+    lon1 = np.radians(np.asarray(lon1, dtype=float))[:, None]
+    lat2 = np.radians(np.asarray(lat2, dtype=float))[None, :]
+    lon2 = np.radians(np.asarray(lon2, dtype=float))[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def hungarian(cost):
+    """
+    Minimum cost assignment for a rectangular cost matrix.
+    Returns (rows, cols) like scipy's linear_sum_assignment.
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.size == 0:
+        return np.array([], dtype=int), np.array([], dtype=int)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    # shortest augmenting path with potentials, 1-based like the textbook version
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)      # p[j] = row matched to column j
+    way = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            cand = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(cand)) + 1
+            delta = cand[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    cols = np.nonzero(p[1:])[0]
+    rows = p[1:][cols] - 1
+    order = np.argsort(rows)
+    rows, cols = rows[order], cols[order]
+    if transposed:
+        rows, cols = cols, rows
+        order = np.argsort(rows)
+        rows, cols = rows[order], cols[order]
+    return rows, cols
+
+
+def solve_assignment(cost):
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cost)
+    return hungarian(cost)
+
+
+def plan_assignments(complaints, officers, max_km=None):
+    """
+    complaints: [(complaint_id, lat, lon), ...]
+    officers:   [(officer_id, lat, lon), ...]
+
+    Returns [(complaint_id, officer_id, distance_km), ...] minimising the total
+    distance over the whole batch. Pairs further apart than max_km are never made.
+    """
+    if not complaints or not officers:
+        return []
+    dist = haversine_matrix([c[1] for c in complaints], [c[2] for c in complaints],
+                            [o[1] for o in officers], [o[2] for o in officers])
+    cost = dist
+    if max_km is not None:
+        # out of range pairs get a cost larger than any feasible total, so the
+        # solver first maximises the number of in-range matches
+        big = (float(np.max(dist, initial=0.0)) + 1.0) * (min(dist.shape) + 1)
+        cost = np.where(dist <= max_km, dist, big)
+
+    rows, cols = solve_assignment(cost)
+    plan = []
+    for r, c in zip(rows, cols):
+        d = float(dist[r, c])
+        if max_km is not None and d > max_km:
+            continue
+        plan.append((complaints[r][0], officers[c][0], d))
+    return plan
+
+
+class BatchWindow:
+    """
+    Collects dispatch requests for `window` seconds and then calls `run` once.
+    nudge() is cheap and safe to call from every request.
+    """
+
+    def __init__(self, window, run):
+        self.window = window
+        self.run = run
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def nudge(self):
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.window, self._fire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _fire(self):
+        with self._lock:
+            self._timer = None
+        self.run()
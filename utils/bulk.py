@@ -0,0 +1,291 @@
+# utils/bulk.py
+# Streaming bulk import / export of users, complaints and complaint history (see bulk.py).
+#
+# Files are read and written one row at a time (CSV or JSONL), rows are inserted
+# in chunks with one executemany per chunk and one transaction per chunk, and
+# passwords are hashed in a process pool a chunk ahead of the inserts. Memory
+# stays flat no matter how big the file is.
+import csv
+import datetime
+import io
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import select
+from werkzeug.security import generate_password_hash
+
+from utils.serialize import dumps
+
+HASH_METHOD = "pbkdf2:sha256"   # same as create_officer.py
+
+
+def _bool(v):
+    return str(v).strip().lower() in ("1", "true", "yes", "y", "t")
+
+
+def _dt(v):
+    return v if isinstance(v, datetime.datetime) else datetime.datetime.fromisoformat(str(v))
+
+
+# per table: column -> parser for values read from a file
+FIELDS = {
+    "users": {
+        "id": int, "username": str, "password": str, "role": str, "latitude": float, "longitude": float,
+        "fcm_token": str, "is_available": _bool,
+    },
+    "complaints": {
+        "id": int, "ref_id": str, "reporter_name": str, "email": str, "phone_number": str, "incident_type": str,
+        "description": str, "location": str, "latitude": float, "longitude": float, "maps_link": str,
+        "photo_path": str, "status": str, "assigned_officer_id": int, "created_at": _dt,
+    },
+    "history": {
+        "id": int, "complaint_id": int, "old_status": str, "new_status": str, "changed_by": str, "timestamp": _dt,
+    },
+}
+REQUIRED = {"users": ("username",), "complaints": (), "history": ("complaint_id", "new_status")}
+# exported under another name so the file imports straight back (hashes aren't re-hashed)
+RENAMED = {"users": {"password": "password_hash"}}
+# model defaults, filled in here because executemany needs the same keys in every row
+DEFAULTS = {
+    "users": {"role": lambda: "user", "is_available": lambda: True},
+    "complaints": {"ref_id": lambda: uuid.uuid4().hex[:12].upper(), "status": lambda: "New",
+                   "created_at": datetime.datetime.utcnow},
+    "history": {"timestamp": datetime.datetime.utcnow},
+}
+
+
+# ---------- reading / writing files ----------
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def _open(path, mode):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+def read_rows(path, fmt):
+    """Dicts from a CSV (header row) or JSONL file, lazily."""
+    f = _open(path, "r")
+    try:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def clean(table, raw):
+    """Parse one file row into insertable values; raises ValueError for a bad row."""
+    fields = FIELDS[table]
+    row = {}
+    for key, value in raw.items():
+        parse = fields.get(key)
+        if parse is None or value is None or value == "":
+            continue
+        try:
+            row[key] = parse(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{key}={value!r}")
+    for key in REQUIRED[table]:
+        if key not in row:
+            raise ValueError(f"missing {key}")
+    for key, default in DEFAULTS[table].items():
+        if key not in row:
+            row[key] = default()
+    return row
+
+
+class Writer:
+    def __init__(self, path, fmt, columns):
+        self.f = _open(path, "w")
+        self.fmt = fmt
+        self.columns = columns
+        if fmt == "csv":
+            self.csv = csv.writer(self.f)
+            self.csv.writerow(columns)
+
+    def write(self, rows):
+        if self.fmt == "csv":
+            self.csv.writerows([_text(v) for v in r] for r in rows)
+        else:
+            buf = io.StringIO()
+            for r in rows:
+                buf.write(dumps({c: _text(v) for c, v in zip(self.columns, r)}).decode())
+                buf.write("\n")
+            self.f.write(buf.getvalue())
+
+    def close(self):
+        if self.f is not sys.stdout:
+            self.f.close()
+        else:
+            self.f.flush()
+
+
+def _text(v):
+    # ISO timestamps so an export imports straight back
+    return v.isoformat() if isinstance(v, datetime.datetime) else v
+
+
+# ---------- progress ----------
+class Progress:
+    def __init__(self, label, every=1.0, out=sys.stderr):
+        self.label = label
+        self.every = every
+        self.out = out
+        self.start = self.last = time.perf_counter()
+        self.rows = 0
+
+    def add(self, rows):
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self.last >= self.every:
+            self.last = now
+            self._print(now, "\r")
+
+    def done(self):
+        self._print(time.perf_counter(), "\n")
+        return self.rows
+
+    def rate(self, now=None):
+        elapsed = (now or time.perf_counter()) - self.start
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def _print(self, now, end):
+        self.out.write(f"{self.label}: {self.rows:,} rows | {self.rate(now):,.0f} rows/s "
+                       f"({self.rate(now) * 60:,.0f}/min){end}")
+        self.out.flush()
+
+
+# ---------- import ----------
+def _chunks(rows, size):
+    chunk = []
+    for r in rows:
+        chunk.append(r)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def hash_passwords(passwords):
+    return [generate_password_hash(p, method=HASH_METHOD) for p in passwords]
+
+
+def _insert_stmt(table, engine, skip_existing):
+    stmt = table.insert()
+    if skip_existing:
+        if engine.dialect.name == "sqlite":
+            stmt = stmt.prefix_with("OR IGNORE")
+        elif engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(table).on_conflict_do_nothing()
+    return stmt
+
+
+def import_rows(engine, table, kind, rows, chunk=5000, workers=None, skip_existing=True, progress=None,
+                errors=sys.stderr):
+    """
+    Insert `rows` (raw dicts) into `table` as `kind` ("users", "complaints", "history").
+    Users' plain `password` values are hashed in a process pool; a `password_hash`
+    column is stored as is. Returns (rows inserted, bad rows skipped).
+    """
+    stmt = _insert_stmt(table, engine, skip_existing)
+    counts = {"inserted": 0, "bad": 0}
+
+    def parsed():
+        for n, raw in enumerate(rows, 1):
+            try:
+                row = clean(kind, raw)
+                if kind == "users":
+                    if raw.get("password_hash"):
+                        row["password"] = raw["password_hash"]
+                        row["_hashed"] = True
+                    elif "password" not in row:
+                        raise ValueError("missing password or password_hash")
+            except ValueError as e:
+                counts["bad"] += 1
+                errors.write(f"\nrow {n} skipped: {e}\n")
+                continue
+            yield row
+
+    def insert(batch):
+        keys = set().union(*batch)
+        batch = [{k: r.get(k) for k in keys} for r in batch]
+        with engine.begin() as conn:
+            inserted = conn.execute(stmt, batch).rowcount
+        # rows skipped as existing aren't counted
+        counts["inserted"] += inserted
+        if progress:
+            progress.add(inserted)
+
+    if kind != "users":
+        for batch in _chunks(parsed(), chunk):
+            insert(batch)
+        return counts["inserted"], counts["bad"]
+
+    # users: hash chunk n+1 in the pool while chunk n is being inserted
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        workers = workers or os.cpu_count() or 1
+        pending = None
+        for batch in _chunks(parsed(), chunk):
+            jobs = _submit_hashes(pool, batch, workers)
+            if pending is not None:
+                insert(_finish_hashes(*pending))
+            pending = (batch, jobs)
+        if pending is not None:
+            insert(_finish_hashes(*pending))
+    return counts["inserted"], counts["bad"]
+
+
+def _submit_hashes(pool, batch, workers):
+    todo = [i for i, r in enumerate(batch) if not r.pop("_hashed", False)]
+    step = max(1, -(-len(todo) // (workers * 4)))
+    parts = [todo[i:i + step] for i in range(0, len(todo), step)]
+    return [(part, pool.submit(hash_passwords, [batch[i]["password"] for i in part])) for part in parts]
+
+
+def _finish_hashes(batch, jobs):
+    for part, future in jobs:
+        for i, hashed in zip(part, future.result()):
+            batch[i]["password"] = hashed
+    return batch
+
+
+# ---------- export ----------
+def export_columns(table, kind):
+    return [RENAMED.get(kind, {}).get(c.name, c.name) for c in table.columns]
+
+
+def iter_by_id(conn, table, batch=5000):
+    """Every row of `table` in id order, one keyset page (id > last) at a time."""
+    last = None
+    while True:
+        q = select(table).order_by(table.c.id).limit(batch)
+        if last is not None:
+            q = q.where(table.c.id > last)
+        rows = conn.execute(q).all()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1].id
+
+
+def export_rows(engine, table, writer, batch=5000, progress=None):
+    with engine.connect() as conn:
+        for rows in iter_by_id(conn, table, batch):
+            writer.write(rows)
+            if progress:
+                progress.add(len(rows))
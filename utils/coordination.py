@@ -0,0 +1,182 @@
+# utils/coordination.py
+# Keeping several app processes on one database in step.
+#
+# Each worker holds in-memory state next to the database: the officer index,
+# the waiting-complaint queue, the dashboard cache and the SSE subscribers. The
+# after_commit hooks in app.py keep that state right for the worker's own
+# commits only, so with more than one worker:
+#
+#   ChangeFeed  a commit that changes any of it also appends one row to
+#               sync_log, inside the same transaction. Every worker polls the
+#               log and hands the other workers' rows to the same code the
+#               local hooks run. A worker that falls further behind than the
+#               log keeps rows for starts over from the database instead.
+#   Leases      one row per job that should run in a single place at a time
+#               (schema setup, the dispatch escalation pass, the archive pass).
+#               Whoever holds the unexpired lease runs it; a dead holder's
+#               lease runs out and somebody else takes over.
+#
+# Officer and complaint reservations need neither: they are conditional
+# UPDATEs, which the database already serialises across processes.
+#
+# The poller relies on sync_log ids becoming visible in order, which SQLite's
+# single writer guarantees; other databases are refused for now.
+import contextlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+from sqlalchemy import text
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS sync_log (id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, "
+    "body TEXT NOT NULL, created_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)",
+]
+
+# taken if free, expired or already ours; rowcount says which
+ACQUIRE = text(
+    "INSERT INTO leases (name, holder, expires_at) VALUES (:name, :holder, :expires) "
+    "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+    "WHERE leases.holder = excluded.holder OR leases.expires_at < :now"
+)
+RELEASE = text("DELETE FROM leases WHERE name = :name AND holder = :holder")
+APPEND = text("INSERT INTO sync_log (origin, body, created_at) VALUES (:origin, :body, :now)")
+READ = text("SELECT id, origin, body FROM sync_log WHERE id > :last ORDER BY id LIMIT :limit")
+
+
+def process_id():
+    """Name for this process in sync_log / leases: host, pid and a random part (pids get reused)."""
+    return f"{socket.gethostname()[:32]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def install(engine):
+    """Create the coordination tables if they are missing. Safe to run from every worker at once."""
+    if engine.dialect.name != "sqlite":
+        raise RuntimeError(f"MULTIPROCESS=1 needs SQLite, not {engine.dialect.name}")
+    with engine.begin() as conn:
+        for stmt in SCHEMA:
+            conn.execute(text(stmt))
+
+
+class Leases:
+    def __init__(self, engine, holder):
+        self.engine = engine
+        self.holder = holder
+
+    def acquire(self, name, ttl):
+        """Take or renew `name` for ttl seconds. False if another live holder has it."""
+        now = time.time()
+        with self.engine.begin() as conn:
+            taken = conn.execute(ACQUIRE, {"name": name, "holder": self.holder, "expires": now + ttl, "now": now})
+            return bool(taken.rowcount)
+
+    def release(self, name):
+        with self.engine.begin() as conn:
+            conn.execute(RELEASE, {"name": name, "holder": self.holder})
+
+    @contextlib.contextmanager
+    def hold(self, name, ttl, wait=0.1):
+        """Block until `name` is ours, release it afterwards. ttl bounds how long a crashed holder blocks others."""
+        while not self.acquire(name, ttl):
+            time.sleep(wait)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+
+class ChangeFeed:
+    """
+    write() / publish() append {kind: payload} bodies; a poller thread started by
+    start() passes other processes' bodies to apply(body). on_resync() is
+    called instead when the poller missed rows that were already pruned.
+    """
+
+    def __init__(self, engine, origin, apply, on_resync, poll=0.2, retention=600.0, batch=500):
+        self.engine = engine
+        self.origin = origin
+        self.apply = apply
+        self.on_resync = on_resync
+        self.poll = poll
+        self.retention = retention
+        self.batch = batch
+        self._last = 0
+        self._last_ok = None
+        self._pruned_at = 0.0
+        self._thread = None
+        self._stop = threading.Event()
+        self.written = 0
+        self.applied = 0
+        self.resyncs = 0
+
+    # ---------- producer side ----------
+    def write(self, conn, body):
+        """Append body on an open connection, so it commits (or not) with the caller's transaction."""
+        conn.execute(APPEND, {"origin": self.origin, "body": json.dumps(body, separators=(",", ":")),
+                              "now": time.time()})
+        self.written += 1
+
+    def publish(self, body):
+        """Append body in a transaction of its own, for changes made outside the ORM."""
+        with self.engine.begin() as conn:
+            self.write(conn, body)
+
+    # ---------- consumer side ----------
+    def start(self):
+        if self._thread is not None:
+            return
+        # everything up to here is already in the database the worker loads its state from
+        with self.engine.connect() as conn:
+            self._last = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM sync_log")).scalar()
+        self._last_ok = time.time()
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.poll):
+            try:
+                self.poll_once()
+            except Exception as e:
+                print("Change Feed Error:", e)
+
+    def poll_once(self):
+        """Apply whatever other processes committed since the last call. Returns the number of rows read."""
+        now = time.time()
+        if now - self._last_ok > self.retention * 0.9:
+            # rows we never saw may be pruned by now
+            self.resyncs += 1
+            with self.engine.connect() as conn:
+                self._last = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM sync_log")).scalar()
+            self.on_resync()
+        read = 0
+        while True:
+            with self.engine.connect() as conn:
+                rows = conn.execute(READ, {"last": self._last, "limit": self.batch}).all()
+            for row_id, origin, body in rows:
+                self._last = row_id
+                if origin != self.origin:
+                    self.apply(json.loads(body))
+                    self.applied += 1
+            read += len(rows)
+            if len(rows) < self.batch:
+                break
+        self._last_ok = now
+        if now - self._pruned_at > self.retention / 4:
+            self._pruned_at = now
+            self.prune(now)
+        return read
+
+    def prune(self, now=None):
+        cutoff = (time.time() if now is None else now) - self.retention
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM sync_log WHERE created_at < :cutoff"), {"cutoff": cutoff})
+
+    def stats(self):
+        return {"written": self.written, "applied": self.applied, "resyncs": self.resyncs, "last_id": self._last}
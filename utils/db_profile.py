@@ -0,0 +1,119 @@
+# utils/db_profile.py
+# Database engine profiles.
+#
+#   default     stock SQLAlchemy / sqlite3 settings (what the app always used)
+#   production  SQLite: WAL, relaxed fsync, bigger page cache, mmap, busy timeout
+#               and one writer at a time (across processes too, given a lock file).
+#               Other databases: sized connection pool with pre-ping.
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:     # not on Windows; writers there fall back to SQLite's busy handler
+    fcntl = None
+
+from sqlalchemy import event
+
+PROFILES = ("default", "production")
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",          # readers no longer block behind writers
+    "synchronous": "NORMAL",        # fsync at checkpoints, not every commit (safe with WAL)
+    "cache_size": "-65536",         # 64 MB page cache per connection
+    "mmap_size": "268435456",       # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+}
+
+
+def _env(name, default):
+    return os.getenv(name, default)
+
+
+def engine_options(uri, profile):
+    """SQLALCHEMY_ENGINE_OPTIONS for the given database URI and profile."""
+    if profile not in PROFILES:
+        raise ValueError(f"unknown DB_PROFILE {profile!r}, expected one of {PROFILES}")
+    if profile == "default":
+        return {}
+    if uri.startswith("sqlite"):
+        busy_ms = int(_env("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+        return {"connect_args": {"timeout": busy_ms / 1000, "check_same_thread": False}}
+    return {
+        "pool_size": int(_env("DB_POOL_SIZE", "10")),
+        "max_overflow": int(_env("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(_env("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(_env("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
+def configure_engine(engine, profile, lock_path=None):
+    """
+    Install per-connection pragmas and the writer lock on an engine. With lock_path,
+    writers in other processes using the same file queue behind the same lock.
+    """
+    if profile == "default" or engine.dialect.name != "sqlite":
+        return None
+
+    pragmas = dict(SQLITE_PRAGMAS)
+    for key in ("synchronous", "cache_size", "mmap_size"):
+        pragmas[key] = _env(f"SQLITE_{key.upper()}", pragmas[key])
+    pragmas["busy_timeout"] = _env("SQLITE_BUSY_TIMEOUT_MS", "10000")
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, record):
+        cur = dbapi_conn.cursor()
+        for key, value in pragmas.items():
+            cur.execute(f"PRAGMA {key}={value}")
+        cur.close()
+
+    # connections opened before the listener existed
+    engine.dispose()
+
+    writer = WriterLock(lock_path)
+    writer.install(engine)
+    return writer
+
+
+class WriterLock:
+    """
+    SQLite allows a single writer. Rather than letting every thread start a
+    write, hit SQLITE_BUSY and spin in the busy handler, writers queue on this
+    lock from their first write statement until the transaction is over.
+    Between processes the busy handler would be back (retrying with sleeps of
+    up to 100 ms), so given a path every process also takes an flock() on that
+    file after the thread lock and the next writer wakes as soon as it's free.
+    """
+
+    WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+        self._file = open(path, "a") if path and fcntl is not None else None
+        self.waits = 0
+
+    def install(self, engine):
+        @event.listens_for(engine, "before_cursor_execute")
+        def _acquire(conn, cursor, statement, params, context, executemany):
+            if conn.info.get("writer"):
+                return
+            if statement.lstrip()[:7].upper().startswith(self.WRITE_PREFIXES):
+                if not self._lock.acquire(blocking=False):
+                    self.waits += 1
+                    self._lock.acquire()
+                if self._file is not None:
+                    fcntl.flock(self._file, fcntl.LOCK_EX)
+                conn.info["writer"] = True
+
+        # sessions hand their connection back to the pool right after COMMIT /
+        # ROLLBACK, which is the earliest point the next writer can't hit SQLITE_BUSY
+        @event.listens_for(engine.pool, "checkin")
+        def _release_on_checkin(dbapi_conn, record):
+            self._release(record.info)
+
+    def _release(self, info):
+        if info.pop("writer", False):
+            if self._file is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._lock.release()
@@ -0,0 +1,87 @@
+# utils/events.py
+# In-process pub/sub for pushing complaint events to dashboards over SSE.
+#
+# Channels: "admin" gets everything, "officer:<id>" gets that officer's
+# complaints. Each subscriber has a small bounded queue; a slow client loses its
+# oldest events rather than growing memory without limit.
+import json
+import queue
+import threading
+
+
+class Subscription:
+    def __init__(self, channels, maxsize=100):
+        self.channels = tuple(channels)
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, event):
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}     # channel -> set(Subscription)
+        self.published = 0
+
+    def subscribe(self, channels, maxsize=100):
+        sub = Subscription(channels, maxsize)
+        with self._lock:
+            for ch in sub.channels:
+                self._channels.setdefault(ch, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for ch in sub.channels:
+                subs = self._channels.get(ch)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._channels[ch]
+
+    def publish(self, channels, event):
+        with self._lock:
+            targets = set()
+            for ch in channels:
+                targets.update(self._channels.get(ch, ()))
+            self.published += 1
+        for sub in targets:
+            sub.put(event)
+        return len(targets)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subs in self._channels.values() for s in subs})
+
+
+def sse_stream(broker, channels, heartbeat=15.0):
+    """Generator of Server-Sent Events text for a Flask streaming Response."""
+    sub = broker.subscribe(channels)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            event = sub.get(timeout=heartbeat)
+            if event is None:
+                # keeps proxies from closing an idle connection and notices dead clients
+                yield ": ping\n\n"
+                continue
+            yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
+    finally:
+        broker.unsubscribe(sub)
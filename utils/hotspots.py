@@ -0,0 +1,334 @@
+# utils/hotspots.py
+# Incident hotspots: complaint counts per (hour, geohash cell, incident type).
+#
+# complaint_hotspots holds one row per hour x cell x type that saw a complaint,
+# upserted on the intake connection like complaint_stats, so it commits with the
+# complaint and bulk loads only need backfill(). Cells are geohashes at
+# PRECISION characters (~1.2 x 0.6 km), stored as their integer bits; coarser
+# cells are a right shift away.
+#
+# HotspotIndex keeps the same rows in NumPy arrays sorted by hour, so a window
+# is a searchsorted slice and top-N is a bincount over the aggregate rows, which
+# stay far fewer than complaints (a city does a few hundred cells per hour at most).
+import datetime
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import inspect, text
+
+PRECISION = 6
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EPOCH = datetime.datetime(1970, 1, 1)
+
+UPSERT = text(
+    "INSERT INTO complaint_hotspots (hour, cell, incident_type, value) VALUES (:h, :c, :t, :v) "
+    "ON CONFLICT (hour, cell, incident_type) DO UPDATE SET value = complaint_hotspots.value + excluded.value"
+)
+
+
+# ---------- cells ----------
+def _bits(precision):
+    total = 5 * precision
+    return (total + 1) // 2, total // 2     # lon bits, lat bits (geohash starts with longitude)
+
+
+def encode(lat, lon, precision=PRECISION):
+    """Geohash cells of coordinate arrays as int64 bits."""
+    lon_bits, lat_bits = _bits(precision)
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    x = np.clip(((lon + 180.0) / 360.0 * (1 << lon_bits)).astype(np.int64), 0, (1 << lon_bits) - 1)
+    y = np.clip(((lat + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1)
+    cell = np.zeros(x.shape, dtype=np.int64)
+    # interleave from the top: lon, lat, lon, lat...
+    for i in range(5 * precision):
+        src, bit = (x, lon_bits - 1 - i // 2) if i % 2 == 0 else (y, lat_bits - 1 - i // 2)
+        cell = (cell << 1) | ((src >> bit) & 1)
+    return cell
+
+
+def _split(cell, precision):
+    lon_bits, lat_bits = _bits(precision)
+    cell = np.asarray(cell, dtype=np.int64)
+    x = np.zeros(cell.shape, dtype=np.int64)
+    y = np.zeros(cell.shape, dtype=np.int64)
+    total = 5 * precision
+    for i in range(total):
+        b = (cell >> (total - 1 - i)) & 1
+        if i % 2 == 0:
+            x = (x << 1) | b
+        else:
+            y = (y << 1) | b
+    return x, y, lon_bits, lat_bits
+
+
+def centers(cell, precision=PRECISION):
+    """(lat, lon) arrays of cell centres."""
+    x, y, lon_bits, lat_bits = _split(cell, precision)
+    return (y + 0.5) * 180.0 / (1 << lat_bits) - 90.0, (x + 0.5) * 360.0 / (1 << lon_bits) - 180.0
+
+
+def bounds(cell, precision=PRECISION):
+    """(n, 4) array of [min_lat, min_lon, max_lat, max_lon] per cell."""
+    x, y, lon_bits, lat_bits = _split(cell, precision)
+    dlat, dlon = 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+    return np.column_stack([y * dlat - 90, x * dlon - 180, (y + 1) * dlat - 90, (x + 1) * dlon - 180])
+
+
+def to_geohash(cell, precision=PRECISION):
+    cell = int(cell)
+    return "".join(BASE32[(cell >> (5 * (precision - 1 - i))) & 31] for i in range(precision))
+
+
+def hour_of(ts):
+    """Hours since the epoch (UTC, like created_at)."""
+    return int((ts - EPOCH).total_seconds() // 3600)
+
+
+def hour_after(ts):
+    """First hour starting at or after ts: the end of a window that still counts ts's own partial hour."""
+    return -int((EPOCH - ts).total_seconds() // 3600)
+
+
+# ---------- counting ----------
+def complaint_row(lat, lon, incident_type, created_at):
+    """The (hour, cell, type) a complaint counts towards, None without coordinates."""
+    if lat is None or lon is None or created_at is None:
+        return None
+    return hour_of(created_at), int(encode([lat], [lon])[0]), incident_type or "Unknown"
+
+
+def apply_rows(conn, rows):
+    """Upsert [(hour, cell, type, count)]."""
+    if rows:
+        conn.execute(UPSERT, [{"h": h, "c": c, "t": t, "v": v} for h, c, t, v in rows])
+
+
+def aggregate(hours, cells, types, counts=None):
+    """Sum duplicate (hour, cell, type) keys: arrays in, [(hour, cell, type, count)] out."""
+    if not len(hours):
+        return []
+    names, codes = np.unique(np.asarray(types, dtype=object).astype(str), return_inverse=True)
+    keys = np.rec.fromarrays([np.asarray(hours, dtype=np.int64), np.asarray(cells, dtype=np.int64),
+                              codes.astype(np.int64)])
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse.ravel(), weights=counts, minlength=len(uniq)).astype(np.int64)
+    return [(int(h), int(c), str(names[t]), int(v)) for (h, c, t), v in zip(uniq.tolist(), sums)]
+
+
+def backfill(conn, chunk=200000):
+    """Rebuild complaint_hotspots from the complaint table and its archive (migration / repair)."""
+    conn.execute(text("DELETE FROM complaint_hotspots"))
+    sql = "SELECT latitude, longitude, incident_type, created_at FROM complaint"
+    if inspect(conn).has_table("complaint_archive"):
+        sql += " UNION ALL SELECT latitude, longitude, incident_type, created_at FROM complaint_archive"
+    result = conn.execute(text(f"SELECT * FROM ({sql}) AS c WHERE latitude IS NOT NULL AND longitude IS NOT NULL "
+                               f"AND created_at IS NOT NULL"))
+    totals = {}
+    while True:
+        batch = result.fetchmany(chunk)
+        if not batch:
+            break
+        lat, lon, kind, created = zip(*batch)
+        # SQLite hands back text, other drivers datetimes
+        created = np.array([c if isinstance(c, str) else c.isoformat(sep=" ") for c in created], dtype="datetime64[s]")
+        hours = (created - np.datetime64(0, "s")).astype(np.int64) // 3600
+        for h, c, t, v in aggregate(hours, encode(lat, lon), [k or "Unknown" for k in kind]):
+            totals[(h, c, t)] = totals.get((h, c, t), 0) + v
+    apply_rows(conn, [(h, c, t, v) for (h, c, t), v in totals.items()])
+
+
+# ---------- in-memory index ----------
+class HotspotIndex:
+    def __init__(self, compact_at=4096):
+        self.compact_at = compact_at
+        self._lock = threading.Lock()
+        self._types = {}            # incident type -> code
+        self._names = []
+        self._pending = []          # (hour, cell, code, count) added since the last compaction
+        self._set(*(np.zeros(0, dtype=np.int64) for _ in range(4)))   # _cells: every cell seen, sorted
+        self.loaded_at = None
+        self.refreshed_at = None
+        self.added = 0
+
+    def __len__(self):
+        return len(self._hour) + len(self._pending)
+
+    def _code(self, name):
+        code = self._types.get(name)
+        if code is None:
+            code = self._types[name] = len(self._names)
+            self._names.append(name)
+        return code
+
+    def _set(self, hour, cell, kind, count):
+        """Rows sorted by hour, cells replaced by their position in self._cells."""
+        cells = np.unique(cell)
+        order = np.argsort(hour, kind="stable")
+        self._hour = hour[order]
+        self._cid = np.searchsorted(cells, cell[order]).astype(np.int32)
+        self._kind = kind[order].astype(np.int16)
+        self._count = count[order].astype(np.int32)
+        self._set_cells(cells)
+
+    def _set_cells(self, cells):
+        self._cells = cells
+        self._clat, self._clon = centers(cells)
+        self._coarse = {}           # precision -> (coarse cells, coarse position of each cell)
+
+    def _append(self, hour, cell, kind, count):
+        # new complaints are almost always the newest hour, so this is an append, not a re-sort
+        if not len(hour):
+            return
+        cells = np.union1d(self._cells, cell)
+        if len(cells) > len(self._cells):
+            self._cid = np.searchsorted(cells, self._cells).astype(np.int32)[self._cid]
+            self._set_cells(cells)
+        in_order = not len(self._hour) or hour.min() >= self._hour[-1]
+        self._hour = np.concatenate([self._hour, hour])
+        self._cid = np.concatenate([self._cid, np.searchsorted(cells, cell).astype(np.int32)])
+        self._kind = np.concatenate([self._kind, kind.astype(np.int16)])
+        self._count = np.concatenate([self._count, count.astype(np.int32)])
+        if not in_order or not (np.diff(hour) >= 0).all():
+            order = np.argsort(self._hour, kind="stable")
+            self._hour, self._cid, self._kind, self._count = (
+                a[order] for a in (self._hour, self._cid, self._kind, self._count))
+
+    def load(self, rows):
+        """Replace everything with [(hour, cell, type, count)] rows (e.g. the whole table)."""
+        with self._lock:
+            self._types, self._names, self._pending = {}, [], []
+            cols = list(zip(*rows)) or [(), (), (), ()]
+            self._set(np.array(cols[0], dtype=np.int64), np.array(cols[1], dtype=np.int64),
+                      np.array([self._code(t) for t in cols[2]], dtype=np.int64), np.array(cols[3], dtype=np.int64))
+            self.loaded_at = self.refreshed_at = time.time()
+
+    def refresh(self, rows, since_hour):
+        """
+        Replace the counts of hours >= since_hour with `rows` (that part of the table), which picks up
+        complaints other processes have committed and drops the duplicates add() left behind.
+        """
+        with self._lock:
+            rows = [(h, c, self._code(t), v) for h, c, t, v in rows]
+            cut = int(np.searchsorted(self._hour, since_hour, "left"))
+            self._hour, self._cid, self._kind, self._count = (
+                a[:cut] for a in (self._hour, self._cid, self._kind, self._count))
+            self._pending = [p for p in self._pending if p[0] < since_hour]
+            extra = np.array(rows, dtype=np.int64).reshape(-1, 4)
+            self._append(extra[:, 0], extra[:, 1], extra[:, 2], extra[:, 3])
+            self.refreshed_at = time.time()
+
+    def add(self, rows):
+        """Count more complaints, [(hour, cell, type, count)]."""
+        with self._lock:
+            self._pending.extend((h, c, self._code(t), v) for h, c, t, v in rows)
+            self.added += len(rows)
+            if len(self._pending) >= self.compact_at:
+                self._compact()
+
+    def _compact(self):
+        # duplicates of existing keys are fine, queries sum them anyway
+        extra = np.array(self._pending, dtype=np.int64).reshape(-1, 4)
+        self._pending = []
+        self._append(extra[:, 0], extra[:, 1], extra[:, 2], extra[:, 3])
+
+    def _coarse_cells(self, precision):
+        if precision not in self._coarse:
+            coarse, position = np.unique(self._cells >> (5 * (PRECISION - precision)), return_inverse=True)
+            self._coarse[precision] = (coarse, position.ravel())
+        return self._coarse[precision]
+
+    def top(self, since=None, until=None, bbox=None, types=None, hours_of_day=None, precision=PRECISION,
+            limit=20):
+        """
+        Busiest cells for complaints filed in [since, until) (naive datetimes, UTC). Counts are per
+        hour, so the window widens to whole hours: every hour it touches counts.
+        bbox: (min_lat, min_lon, max_lat, max_lon) on cell centres; types: incident types;
+        hours_of_day: UTC hours 0-23 to keep; precision: 1..PRECISION, coarser cells merge.
+        Returns (total, [{"cell", "count", "lat", "lon", "bounds", "by_type", "by_hour"}]).
+        """
+        with self._lock:
+            hour, cid, kind, count = self._hour, self._cid, self._kind, self._count
+            cells, clat, clon = self._cells, self._clat, self._clon
+            coarse, position = self._coarse_cells(precision)
+            pending = list(self._pending)
+            names = list(self._names)
+            codes = [self._types[t] for t in (types or ()) if t in self._types]
+        lo = np.searchsorted(hour, hour_of(since), "left") if since else 0
+        hi = np.searchsorted(hour, hour_after(until), "left") if until else len(hour)
+        hour, cid, kind, count = hour[lo:hi], cid[lo:hi], kind[lo:hi], count[lo:hi]
+
+        # filters as lookup tables over cells / types / hours of day, one gather per row
+        kind_ok = np.isin(np.arange(len(names)), codes) if types else None
+        hour_ok = np.isin(np.arange(24), list(hours_of_day)) if hours_of_day is not None else None
+        if bbox is not None:
+            cell_ok = (clat >= bbox[0]) & (clat <= bbox[2]) & (clon >= bbox[1]) & (clon <= bbox[3])
+            mask = cell_ok[cid]
+        else:
+            mask = None
+        for ok, values in ((kind_ok, kind), (hour_ok, hour % 24 if hour_ok is not None else None)):
+            if ok is not None:
+                mask = ok[values] if mask is None else mask & ok[values]
+        if mask is not None:
+            hour, cid, kind, count = hour[mask], cid[mask], kind[mask], count[mask]
+        group = position[cid]
+
+        if pending:
+            # not compacted yet, few enough to filter and place one by one
+            extra = np.array(pending, dtype=np.int64)
+            keep = np.ones(len(extra), dtype=bool)
+            if since:
+                keep &= extra[:, 0] >= hour_of(since)
+            if until:
+                keep &= extra[:, 0] < hour_after(until)
+            if kind_ok is not None:
+                keep &= kind_ok[extra[:, 2]]
+            if hour_ok is not None:
+                keep &= hour_ok[extra[:, 0] % 24]
+            if bbox is not None:
+                elat, elon = centers(extra[:, 1])
+                keep &= (elat >= bbox[0]) & (elat <= bbox[2]) & (elon >= bbox[1]) & (elon <= bbox[3])
+            extra = extra[keep]
+            extra_coarse = extra[:, 1] >> (5 * (PRECISION - precision))
+            merged = np.union1d(coarse, extra_coarse)
+            if len(merged) > len(coarse):
+                group = np.searchsorted(merged, coarse)[group]
+                coarse = merged
+            hour, kind, count = (np.concatenate(pair) for pair in
+                                 ((hour, extra[:, 0]), (kind, extra[:, 2]), (count, extra[:, 3])))
+            group = np.concatenate([group, np.searchsorted(coarse, extra_coarse)])
+
+        sums = np.bincount(group, weights=count, minlength=len(coarse)).astype(np.int64)
+        total = int(sums.sum())
+        n = min(limit, int(np.count_nonzero(sums)))
+        if not n:
+            return total, []
+        best = np.argpartition(-sums, n - 1)[:n]
+        best = best[np.lexsort((coarse[best], -sums[best]))]
+
+        # breakdowns for the winners only
+        rank = np.full(len(coarse), -1)
+        rank[best] = np.arange(n)
+        r = rank[group]
+        sel = r >= 0
+        r, k, hod, c = r[sel], kind[sel], hour[sel] % 24, count[sel]
+        by_type = np.bincount(r * len(names) + k, weights=c, minlength=n * len(names)).reshape(n, len(names))
+        by_hour = np.bincount(r * 24 + hod, weights=c, minlength=n * 24).reshape(n, 24)
+        box = bounds(coarse[best], precision)
+        out = []
+        for i, idx in enumerate(best):
+            out.append({
+                "cell": to_geohash(coarse[idx], precision), "count": int(sums[idx]),
+                "lat": round(float(box[i, 0] + box[i, 2]) / 2, 6), "lon": round(float(box[i, 1] + box[i, 3]) / 2, 6),
+                "bounds": box[i].tolist(),
+                "by_type": {names[t]: int(v) for t, v in enumerate(by_type[i]) if v},
+                "by_hour": {h: int(v) for h, v in enumerate(by_hour[i]) if v},
+            })
+        return total, out
+
+    def stats(self):
+        with self._lock:
+            return {"rows": len(self._hour) + len(self._pending), "cells": len(self._cells),
+                    "types": len(self._names), "added": self.added, "loaded_at": self.loaded_at,
+                    "refreshed_at": self.refreshed_at}
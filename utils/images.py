@@ -0,0 +1,110 @@
+# utils/images.py
+# Complaint photo processing off the request thread.
+#
+# The request only streams the upload to a temp file. Decoding, resizing and
+# re-encoding happen in a process pool (PIL work holds the GIL), and results are
+# stored under content-hash names so the same photo uploaded twice is stored once.
+import hashlib
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from utils import metrics
+
+# name -> max (width, height); largest first
+RENDITIONS = {"full": (800, 800), "thumb": (200, 200)}
+
+
+def file_digest(path, chunk=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def rendition_paths(out_dir, digest):
+    return {name: os.path.join(out_dir, f"{digest[:32]}_{name}.jpg") for name in RENDITIONS}
+
+
+def process_photo(src_path, out_dir, quality=70):
+    """
+    Runs in a worker process. Writes every rendition of src_path into out_dir,
+    removes src_path and returns {rendition name: path}.
+    """
+    try:
+        paths = rendition_paths(out_dir, file_digest(src_path))
+        if all(os.path.exists(p) for p in paths.values()):
+            return paths  # duplicate upload
+
+        with Image.open(src_path) as img:
+            # let the JPEG decoder downscale while decoding (no-op for other formats)
+            biggest = max(RENDITIONS.values())
+            img.draft("RGB", biggest)
+            img = img.convert("RGB")
+            for name, size in RENDITIONS.items():
+                out = img.copy()
+                out.thumbnail(size)
+                # write then rename, so a reader never sees half a file
+                tmp = f"{paths[name]}.{uuid.uuid4().hex}.tmp"
+                out.save(tmp, "JPEG", optimize=True, quality=quality)
+                os.replace(tmp, paths[name])
+                img = out
+        return paths
+    finally:
+        try:
+            os.remove(src_path)
+        except OSError:
+            pass
+
+
+class PhotoPipeline:
+    def __init__(self, upload_folder, workers=2, on_done=None):
+        self.upload_folder = upload_folder
+        self.tmp_folder = os.path.join(upload_folder, "tmp")
+        self.workers = workers
+        self.on_done = on_done      # on_done(complaint_id, {rendition: path})
+        self._pool = None
+        os.makedirs(self.tmp_folder, exist_ok=True)
+
+    def pool(self):
+        if self._pool is None:
+            # spawn: the web process has threads and DB connections we don't want forked
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    @metrics.timed("photo_stage")
+    def stage(self, file_storage):
+        """Stream an uploaded werkzeug FileStorage to a temp file and return its path."""
+        path = os.path.join(self.tmp_folder, uuid.uuid4().hex)
+        file_storage.save(path)
+        return path
+
+    def submit(self, tmp_path, complaint_id):
+        future = self.pool().submit(process_photo, tmp_path, self.upload_folder)
+        submitted = time.perf_counter()
+        future.add_done_callback(lambda f: self._finished(f, complaint_id, submitted))
+        return future
+
+    def _finished(self, future, complaint_id, submitted):
+        # includes the wait for a free worker
+        metrics.observe("photo_process", time.perf_counter() - submitted)
+        try:
+            paths = future.result()
+        except Exception as e:
+            print("Photo Error:", e)
+            return
+        if self.on_done:
+            try:
+                self.on_done(complaint_id, paths)
+            except Exception as e:
+                print("Photo Error:", e)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
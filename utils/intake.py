@@ -0,0 +1,217 @@
+# utils/intake.py
+# Guards in front of complaint intake, for clients that resubmit on flaky networks.
+#
+#   IntakeGuard  remembers recent submissions for `window` seconds. A request carrying an
+#                Idempotency-Key we've seen, or a near-duplicate of a recent complaint (same
+#                phone or email, within radius_km, similar description), gets the original
+#                complaint back instead of a new one. A duplicate arriving while the original
+#                is still being written waits for it rather than racing it into the database.
+#   RateLimiter  token bucket per client: `burst` submissions at once, refilled at `rate`/s.
+#
+# Both are in memory and per process; entries expire on their own.
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from utils.spatial import haversine
+
+_WORDS = re.compile(r"\w+")
+
+
+def contact_keys(email=None, phone=None, *extra):
+    """Normalised contact keys: lowercased email, last 10 phone digits (so +91 / 0 prefixes match)."""
+    keys = set(k for k in extra if k)
+    if email and email.strip():
+        keys.add("email:" + email.strip().lower())
+    digits = re.sub(r"\D", "", phone or "")[-10:]
+    if len(digits) >= 6:
+        keys.add("phone:" + digits)
+    return keys
+
+
+def shingles(text):
+    """Character trigrams of the lowercased words, so typos and punctuation barely move the score."""
+    t = " ".join(_WORDS.findall((text or "").lower()))
+    return {t[i:i + 3] for i in range(max(len(t) - 2, 1))} if t else set()
+
+
+def _coord(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def similarity(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class _Submission:
+    __slots__ = ("contacts", "key", "lat", "lon", "location", "shingles", "expires", "result")
+
+    def __init__(self, contacts, key, lat, lon, location, description, expires, result=None):
+        self.contacts = contacts
+        self.key = key
+        self.lat = _coord(lat)
+        self.lon = _coord(lon)
+        self.location = (location or "").strip().lower()
+        self.shingles = shingles(description)
+        self.expires = expires
+        self.result = result        # None while the original is being written
+
+
+class IntakeGuard:
+    def __init__(self, window=600.0, radius_km=0.5, min_similarity=0.6, maxsize=100000, wait=10.0):
+        self.window = window
+        self.radius_km = radius_km
+        self.min_similarity = min_similarity
+        self.maxsize = maxsize
+        self.wait = wait
+        self._cond = threading.Condition()
+        self._entries = OrderedDict()   # submission -> None, oldest first (same window for all, so also by expiry)
+        self._by_contact = {}           # contact key -> set(submission)
+        self._by_key = {}               # idempotency key -> submission
+        self.duplicates = {"key": 0, "similar": 0}
+
+    def claim(self, contacts, lat=None, lon=None, location=None, description=None, key=None):
+        """
+        (result, None) if this is a repeat of a recent submission, result being whatever the
+        original passed to complete(). Otherwise (None, ticket): go ahead, then complete(ticket,
+        result) after the commit or abandon(ticket) if it failed.
+        """
+        probe = _Submission(frozenset(contacts), key, lat, lon, location, description, 0.0)
+        deadline = time.monotonic() + self.wait
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                match, kind = self._match(probe)
+                if match is None or (match.result is None and now >= deadline):
+                    # nothing like it, or the original is stuck: this one goes through
+                    break
+                if match.result is not None:
+                    self.duplicates[kind] += 1
+                    return match.result, None
+                self._cond.wait(deadline - now)
+            probe.expires = now + self.window
+            self._add(probe)
+            return None, probe
+
+    def complete(self, ticket, result):
+        with self._cond:
+            ticket.result = result
+            self._cond.notify_all()
+
+    def abandon(self, ticket):
+        with self._cond:
+            self._remove(ticket)
+            self._cond.notify_all()
+
+    def remember(self, result, contacts, lat=None, lon=None, location=None, description=None, key=None, age=0.0):
+        """Record a submission that was written elsewhere (another worker), `age` seconds ago."""
+        if age >= self.window:
+            return
+        sub = _Submission(frozenset(contacts), key, lat, lon, location, description,
+                          time.monotonic() + self.window - age, result)
+        with self._cond:
+            self._add(sub)
+            self._cond.notify_all()
+
+    def _match(self, probe):
+        if probe.key is not None:
+            hit = self._by_key.get(probe.key)
+            if hit is not None:
+                return hit, "key"
+        seen = set()
+        for contact in probe.contacts:
+            for sub in self._by_contact.get(contact, ()):
+                if sub in seen:
+                    continue
+                seen.add(sub)
+                if self._same_place(sub, probe) and similarity(sub.shingles, probe.shingles) >= self.min_similarity:
+                    return sub, "similar"
+        return None, None
+
+    def _same_place(self, a, b):
+        if None not in (a.lat, a.lon, b.lat, b.lon):
+            return haversine(a.lat, a.lon, b.lat, b.lon) <= self.radius_km
+        # no coordinates on either side: the typed location has to agree
+        return None in (a.lat, a.lon) and None in (b.lat, b.lon) and a.location == b.location
+
+    def _add(self, sub):
+        self._entries[sub] = None
+        for contact in sub.contacts:
+            self._by_contact.setdefault(contact, set()).add(sub)
+        if sub.key is not None:
+            self._by_key[sub.key] = sub
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, sub):
+        if self._entries.pop(sub, False) is False:
+            return
+        for contact in sub.contacts:
+            subs = self._by_contact.get(contact)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._by_contact[contact]
+        if sub.key is not None and self._by_key.get(sub.key) is sub:
+            del self._by_key[sub.key]
+
+    def _expire(self, now):
+        while self._entries:
+            oldest = next(iter(self._entries))
+            if oldest.expires > now:
+                break
+            self._remove(oldest)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._cond:
+            return {"entries": len(self._entries), **self.duplicates}
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"rate limited, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    def __init__(self, rate, burst, maxsize=100000):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()   # client -> (tokens, updated_at), least recently seen first
+        self.allowed = 0
+        self.limited = 0
+
+    def allow(self, client, cost=1.0):
+        """(True, 0) if the client may go ahead, else (False, seconds until it may)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, at = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - at) * self.rate)
+            ok = tokens >= cost
+            if ok:
+                tokens -= cost
+                self.allowed += 1
+            else:
+                self.limited += 1
+            self._buckets[client] = (tokens, now)
+            # an evicted client comes back with a full bucket, which is what an idle one has by now anyway
+            idle = self.burst / self.rate
+            while len(self._buckets) > self.maxsize or now - next(iter(self._buckets.values()))[1] > idle:
+                self._buckets.popitem(last=False)
+        return ok, 0.0 if ok else (cost - tokens) / self.rate
+
+    def stats(self):
+        with self._lock:
+            return {"clients": len(self._buckets), "allowed": self.allowed, "limited": self.limited}
@@ -0,0 +1,114 @@
+# utils/locations.py
+# Buffer for live officer positions reported by the mobile app.
+#
+# Devices ping often, the dispatcher only needs the latest fix per officer and
+# the database only needs it eventually. Pings are coalesced in memory (newest
+# per officer wins) and written out in one executemany every `interval` seconds,
+# so DB writes per flush are bounded by the number of officers, not pings.
+#
+# Pings are ordered by when they reached us; the device's own timestamp only
+# orders the pings of one batch, since phone clocks can't be trusted across
+# requests. A fix older than `ttl` stops overriding what the database says.
+import threading
+import time
+
+
+class LocationBuffer:
+    def __init__(self, write, interval=2.0, on_update=None, ttl=120.0):
+        """
+        write(rows): persist [(officer_id, lat, lon, ts), ...]; called from the flusher thread.
+        on_update(officer_id, lat, lon): called for every accepted ping (e.g. move it in the index).
+        """
+        self.write = write
+        self.interval = interval
+        self.on_update = on_update
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._dirty = {}        # officer_id -> (lat, lon, ts) not yet written
+        self._latest = {}       # officer_id -> (lat, lon, ts, received) newest seen
+        self._stop = threading.Event()
+        self._thread = None
+        self.pings = 0
+        self.stale = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def record(self, officer_id, lat, lon, ts=None, received=None):
+        """
+        Accept one ping. `received` is when its request arrived (default now), pings of one
+        request share it and their device `ts` decides among them. Returns False if it is
+        older than what we already have.
+        """
+        received = time.time() if received is None else received
+        ts = received if ts is None else ts
+        with self._lock:
+            self.pings += 1
+            current = self._latest.get(officer_id)
+            if current is not None and (current[3], current[2]) > (received, ts):
+                # out of order delivery, keep the newer fix
+                self.stale += 1
+                return False
+            self._latest[officer_id] = (lat, lon, ts, received)
+            self._dirty[officer_id] = (lat, lon, ts)
+        if self.on_update:
+            self.on_update(officer_id, lat, lon)
+        self._ensure_thread()
+        return True
+
+    def latest(self, officer_id, default=None):
+        """(lat, lon) of the newest ping for this officer if it's under ttl old, else `default`."""
+        with self._lock:
+            fix = self._latest.get(officer_id)
+        if fix is None or time.time() - fix[3] > self.ttl:
+            return default
+        return fix[:2]
+
+    def flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            self._expire()
+        if not dirty:
+            return 0
+        rows = [(oid, lat, lon, ts) for oid, (lat, lon, ts) in dirty.items()]
+        try:
+            self.write(rows)
+        except Exception:
+            # put them back unless a newer ping arrived meanwhile
+            with self._lock:
+                for oid, fix in dirty.items():
+                    self._dirty.setdefault(oid, fix)
+            raise
+        with self._lock:
+            self.flushes += 1
+            self.rows_written += len(rows)
+        return len(rows)
+
+    def _expire(self):
+        # written long ago and the DB row is the truth again; also keeps _latest from growing forever
+        cutoff = time.time() - self.ttl
+        for oid in [oid for oid, fix in self._latest.items() if fix[3] < cutoff and oid not in self._dirty]:
+            del self._latest[oid]
+
+    def stats(self):
+        with self._lock:
+            return {"pings": self.pings, "stale": self.stale, "pending": len(self._dirty),
+                    "flushes": self.flushes, "rows_written": self.rows_written}
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="location-flush", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print("Location Flush Error:", e)
+
+    def shutdown(self):
+        self._stop.set()
+        self.flush()
@@ -0,0 +1,272 @@
+# utils/metrics.py
+# Request and DB profiling with a Prometheus text endpoint.
+#
+# Everything is kept in process: counters and fixed-bucket histograms behind one
+# lock each, so recording a request costs a few microseconds. RequestProfiler
+# hooks Flask (latency per route) and the SQLAlchemy engine (query count / time
+# per request); timed() wraps the slow helpers. Requests slower than a threshold
+# are logged with every query they ran.
+import bisect
+import contextvars
+import functools
+import logging
+import threading
+import time
+from collections import deque
+
+from flask import request
+
+# seconds; roughly Prometheus' defaults, with more resolution at the low end for SQL
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+MAX_QUERIES = 200       # per request kept for the slow log, the count is always exact
+
+slow_log = logging.getLogger("rapid_rescue.slow_requests")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _labels(self.labels, k), v) for k, v in sorted(items)]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.bounds = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}       # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *label_values):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            s = self._series.get(label_values)
+            if s is None:
+                s = self._series[label_values] = [0] * (len(self.bounds) + 1) + [0.0]
+            s[i] += 1
+            s[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(s)) for k, s in self._series.items()]
+        out = []
+        for key, s in sorted(items):
+            total = 0
+            for bound, n in zip(self.bounds + (float("inf"),), s):
+                total += n
+                out.append((f"{self.name}_bucket", _labels(self.labels + ("le",), key + (_num(bound),)), total))
+            out.append((f"{self.name}_sum", _labels(self.labels, key), s[-1]))
+            out.append((f"{self.name}_count", _labels(self.labels, key), total))
+        return out
+
+
+class Registry:
+    def __init__(self, prefix="rapid_rescue_"):
+        self.prefix = prefix
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labels=()):
+        m = Counter(self.prefix + name, help, labels)
+        self._metrics.append(m)
+        return m
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        m = Histogram(self.prefix + name, help, labels, buckets)
+        self._metrics.append(m)
+        return m
+
+    def collector(self, fn):
+        """
+        fn() -> [(name, kind, help, value or {((label, value), ...): value})], called at
+        scrape time for numbers other components already keep.
+        """
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for m in self._metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(f"{name}{labels} {_num(v)}" for name, labels, v in m.samples())
+        for fn in self._collectors:
+            try:
+                families = fn()
+            except Exception as e:
+                lines.append(f"# collector {getattr(fn, '__name__', fn)} failed: {_escape(e)}")
+                continue
+            for name, kind, help, values in families:
+                name = self.prefix + name
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                if not isinstance(values, dict):
+                    values = {(): values}
+                for key, v in values.items():
+                    if v is None:
+                        continue
+                    lines.append(f"{name}{_labels(*zip(*key)) if key else ''} {_num(v)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+operation_seconds = REGISTRY.histogram(
+    "operation_seconds", "Time spent in instrumented helpers (dispatch, notifications, photos).", ("op",))
+
+
+def observe(op, seconds):
+    operation_seconds.observe(seconds, op)
+
+
+def timed(op):
+    """Decorator: time every call of the function as operation_seconds{op=...}."""
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapped(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                operation_seconds.observe(time.perf_counter() - t0, op)
+        return wrapped
+    return decorator
+
+
+class _Profile:
+    __slots__ = ("start", "queries", "sql_seconds", "statements")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements = []
+
+
+class RequestProfiler:
+    """
+    Latency per route, SQL count / time per request and a slow-request log.
+    Latency is measured up to the response headers, so streamed bodies (SSE,
+    NDJSON exports) don't count their whole lifetime.
+    """
+
+    def __init__(self, registry=REGISTRY, slow_seconds=1.0, keep_slow=50):
+        self.slow_seconds = slow_seconds
+        self.slow = deque(maxlen=keep_slow)
+        self._current = contextvars.ContextVar("request_profile", default=None)
+        self.requests = registry.counter("http_requests_total", "Requests by route, method and status.",
+                                         ("route", "method", "status"))
+        self.latency = registry.histogram("http_request_seconds", "Request latency up to the response headers.",
+                                          ("route", "method"))
+        self.sql_count = registry.histogram("http_request_sql_queries", "SQL statements run per request.",
+                                            ("route",), COUNT_BUCKETS)
+        self.sql_time = registry.histogram("http_request_sql_seconds", "Time in SQL per request.", ("route",))
+        self.sql_outside = registry.counter("sql_queries_outside_request_total",
+                                            "SQL statements run by background threads and scripts.")
+
+    def init_app(self, app, engine):
+        app.before_request(self._begin)
+        app.after_request(self._end)
+        app.teardown_request(self._teardown)
+        self.install_engine(engine)
+
+    def install_engine(self, engine):
+        from sqlalchemy import event
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "handle_error")
+        def _failed(context):
+            starts = context.connection.info.get("query_start") if context.connection is not None else None
+            if starts:
+                starts.pop()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["query_start"].pop()
+            profile = self._current.get()
+            if profile is None:
+                self.sql_outside.inc()
+                return
+            seconds = time.perf_counter() - started
+            profile.queries += 1
+            profile.sql_seconds += seconds
+            if len(profile.statements) < MAX_QUERIES:
+                profile.statements.append((statement, seconds))
+
+    # ---------- Flask hooks ----------
+    def _begin(self):
+        self._current.set(_Profile())
+
+    def _end(self, response):
+        profile = self._current.get()
+        if profile is None:
+            return response
+        self._current.set(None)
+        elapsed = time.perf_counter() - profile.start
+        req = request._get_current_object()     # one proxy lookup instead of one per attribute
+        route, method = req.endpoint or "unmatched", req.method
+        self.requests.inc(route, method, response.status_code)
+        self.latency.observe(elapsed, route, method)
+        self.sql_count.observe(profile.queries, route)
+        self.sql_time.observe(profile.sql_seconds, route)
+        response.headers["Server-Timing"] = (f"app;dur={elapsed * 1000:.1f}, "
+                                             f'db;dur={profile.sql_seconds * 1000:.1f};desc="{profile.queries} queries"')
+        if elapsed >= self.slow_seconds:
+            self._log_slow(req, response.status_code, elapsed, profile)
+        return response
+
+    def _teardown(self, exc):
+        # after_request didn't run (e.g. the client went away mid-request)
+        self._current.set(None)
+
+    def _log_slow(self, request, status, elapsed, profile):
+        entry = {
+            "at": time.time(), "method": request.method, "path": request.path, "route": request.endpoint,
+            "status": status, "seconds": round(elapsed, 4), "sql_queries": profile.queries,
+            "sql_seconds": round(profile.sql_seconds, 4),
+            "queries": [{"sql": sql, "ms": round(s * 1000, 2)} for sql, s in profile.statements],
+        }
+        self.slow.append(entry)
+        slow_log.warning("slow request %s %s %.0f ms, %d queries (%.0f ms SQL):\n%s", request.method, request.path,
+                         elapsed * 1000, profile.queries, profile.sql_seconds * 1000,
+                         "\n".join(f"  {s * 1000:8.2f} ms  {' '.join(sql.split())}" for sql, s in profile.statements))
+
+    def slow_requests(self):
+        return list(self.slow)
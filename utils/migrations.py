@@ -0,0 +1,139 @@
+# utils/migrations.py
+# Versioned schema migrations.
+#
+# db.create_all() only creates missing tables, so anything added to an existing
+# table (indexes, columns) has to ship as a migration here. Each migration runs
+# once per database; the applied versions are recorded in schema_version.
+import datetime
+
+from sqlalchemy import inspect, text
+
+from utils import hotspots, stats
+
+# (version, name, [statements], dialects) -- append only, never edit an applied migration.
+# dialects limits a migration to some databases (None = all); elsewhere it is recorded but skipped.
+# A statement is either SQL text or a function called with the connection.
+MIGRATIONS = [
+    (1, "hot query indexes", [
+        # dashboard(user) / my_complaints: WHERE email = ? ORDER BY created_at DESC, id DESC
+        "CREATE INDEX IF NOT EXISTS ix_complaint_email_created ON complaint (email, created_at, id)",
+        # dashboard(officer) / officer_assigned: WHERE assigned_officer_id = ? ORDER BY created_at DESC, id DESC
+        "CREATE INDEX IF NOT EXISTS ix_complaint_officer_created ON complaint (assigned_officer_id, created_at, id)",
+        # dispatch_pending: WHERE status = 'New' ... ORDER BY created_at
+        "CREATE INDEX IF NOT EXISTS ix_complaint_status_created ON complaint (status, created_at, id)",
+        # admin listing / export: ORDER BY created_at DESC, id DESC
+        "CREATE INDEX IF NOT EXISTS ix_complaint_created_at ON complaint (created_at)",
+        # officer index load: WHERE role = 'officer' AND is_available = 1
+        "CREATE INDEX IF NOT EXISTS ix_user_role_available ON user (role, is_available)",
+        "CREATE INDEX IF NOT EXISTS ix_complaint_history_complaint ON complaint_history (complaint_id, timestamp)",
+    ], None),
+    (2, "complaint full-text search", [
+        # external content table: the text lives in complaint, FTS5 only keeps the index
+        "CREATE VIRTUAL TABLE IF NOT EXISTS complaint_fts USING fts5("
+        "description, location, incident_type, reporter_name, "
+        "content='complaint', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS complaint_fts_ai AFTER INSERT ON complaint BEGIN "
+        "INSERT INTO complaint_fts (rowid, description, location, incident_type, reporter_name) "
+        "VALUES (new.id, new.description, new.location, new.incident_type, new.reporter_name); END",
+        "CREATE TRIGGER IF NOT EXISTS complaint_fts_ad AFTER DELETE ON complaint BEGIN "
+        "INSERT INTO complaint_fts (complaint_fts, rowid, description, location, incident_type, reporter_name) "
+        "VALUES ('delete', old.id, old.description, old.location, old.incident_type, old.reporter_name); END",
+        "CREATE TRIGGER IF NOT EXISTS complaint_fts_au AFTER UPDATE OF description, location, incident_type, "
+        "reporter_name ON complaint BEGIN "
+        "INSERT INTO complaint_fts (complaint_fts, rowid, description, location, incident_type, reporter_name) "
+        "VALUES ('delete', old.id, old.description, old.location, old.incident_type, old.reporter_name); "
+        "INSERT INTO complaint_fts (rowid, description, location, incident_type, reporter_name) "
+        "VALUES (new.id, new.description, new.location, new.incident_type, new.reporter_name); END",
+        "INSERT INTO complaint_fts (complaint_fts) VALUES ('rebuild')",
+        "INSERT INTO complaint_fts (complaint_fts) VALUES ('optimize')",
+    ], ("sqlite",)),
+    # complaint_stats itself comes from create_all(), this fills it for existing data
+    (3, "backfill complaint counters", [stats.backfill], None),
+    # complaint_archive comes from create_all(); same FTS setup as migration 2 so admin search can fall
+    # back to it. Archived rows are never updated, inserts and deletes are enough.
+    (4, "archive full-text search", [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS complaint_archive_fts USING fts5("
+        "description, location, incident_type, reporter_name, "
+        "content='complaint_archive', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS complaint_archive_fts_ai AFTER INSERT ON complaint_archive BEGIN "
+        "INSERT INTO complaint_archive_fts (rowid, description, location, incident_type, reporter_name) "
+        "VALUES (new.id, new.description, new.location, new.incident_type, new.reporter_name); END",
+        "CREATE TRIGGER IF NOT EXISTS complaint_archive_fts_ad AFTER DELETE ON complaint_archive BEGIN "
+        "INSERT INTO complaint_archive_fts (complaint_archive_fts, rowid, description, location, incident_type, "
+        "reporter_name) VALUES ('delete', old.id, old.description, old.location, old.incident_type, "
+        "old.reporter_name); END",
+        "INSERT INTO complaint_archive_fts (complaint_archive_fts) VALUES ('rebuild')",
+    ], ("sqlite",)),
+    # complaint_hotspots comes from create_all(), this fills it for existing data
+    (5, "backfill hotspot cells", [hotspots.backfill], None),
+    (6, "archive email index", [
+        # dashboard(user) / my_complaints once the live rows run out: same shape as ix_complaint_email_created
+        "CREATE INDEX IF NOT EXISTS ix_complaint_archive_email_created ON complaint_archive (email, created_at, id)",
+    ], None),
+]
+
+VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(200),
+    applied_at DATETIME
+)
+"""
+
+
+def current_version(conn):
+    conn.execute(text(VERSION_TABLE))
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def pending(engine):
+    with engine.begin() as conn:
+        version = current_version(conn)
+    return [m for m in MIGRATIONS if m[0] > version]
+
+
+def applied_version(conn):
+    """Like current_version() but a plain read: 0 if schema_version doesn't exist yet."""
+    if not inspect(conn).has_table("schema_version"):
+        return 0
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def has_migration(engine, version):
+    """True if `version` was applied and actually ran on this database's dialect."""
+    dialects = next((m[3] for m in MIGRATIONS if m[0] == version), None)
+    if dialects is not None and engine.dialect.name not in dialects:
+        return False
+    with engine.connect() as conn:
+        return applied_version(conn) >= version
+
+
+def apply_migrations(engine, log=print):
+    """Apply every pending migration, each in its own transaction. Returns the versions applied."""
+    applied = []
+    for version, name, statements, dialects in pending(engine):
+        with engine.begin() as conn:
+            # someone else may have got here first
+            if current_version(conn) >= version:
+                continue
+            if dialects is None or engine.dialect.name in dialects:
+                for stmt in statements:
+                    if callable(stmt):
+                        stmt(conn)
+                    else:
+                        conn.execute(text(_quote_user(stmt, engine)))
+            conn.execute(
+                text("INSERT INTO schema_version (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": version, "n": name, "t": datetime.datetime.utcnow()}
+            )
+        applied.append(version)
+        if log:
+            log(f"migration {version} applied: {name}")
+    return applied
+
+
+def _quote_user(stmt, engine):
+    # "user" is reserved outside SQLite
+    if engine.dialect.name == "sqlite":
+        return stmt
+    return stmt.replace(" ON user ", ' ON "user" ')
@@ -0,0 +1,463 @@
+# utils/notify.py
+# Background delivery of email and FCM notifications.
+#
+# Request handlers only enqueue(). Messages are stored in a small SQLite file so
+# they survive a restart, and worker threads deliver them over a reused SMTP
+# session / requests.Session with timeouts and exponential backoff.
+import json
+import smtplib
+import sqlite3
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+import requests
+
+from utils import metrics
+
+
+class PermanentError(Exception):
+    """Delivery failed in a way retrying won't fix (bad token, rejected address...)."""
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+# ---------------- CHANNELS ----------------
+class SmtpSender:
+    """Keeps one logged-in SMTP session per worker thread and reuses it."""
+
+    def __init__(self, host, port, username, password, starttls=True, timeout=10):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        self._local.server = server
+        return server
+
+    def send(self, payload):
+        msg = MIMEMultipart()
+        msg['From'] = payload.get('from') or self.username
+        msg['To'] = payload['to']
+        msg['Subject'] = payload['subject']
+        msg.attach(MIMEText(payload['body'], 'plain'))
+
+        server = getattr(self._local, 'server', None)
+        try:
+            if server is None:
+                server = self._connect()
+            server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # pooled session went stale, reconnect once
+            self.close()
+            self._connect().send_message(msg)
+        except smtplib.SMTPRecipientsRefused as e:
+            raise PermanentError(str(e))
+
+    def close(self):
+        server = getattr(self._local, 'server', None)
+        self._local.server = None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+
+class FcmSender:
+    """
+    Posts FCM messages over a pooled, keep-alive requests.Session per worker.
+
+    With batch_window > 0 the queue hands over every message collected in the
+    window at once: messages for the same token are merged into one digest and
+    identical notifications go out as multicast requests of up to max_batch
+    registration ids.
+    """
+
+    # body of one digest; FCM answers MessageTooBig past 4 KB of payload, which would fail every
+    # message merged into it (a backlog after an outage can hold hundreds for one token)
+    MAX_DIGEST_BYTES = 3000
+
+    INVALID_TOKEN_ERRORS = {"NotRegistered", "InvalidRegistration", "MismatchSenderId", "MissingRegistration"}
+    RETRY_ERRORS = {"Unavailable", "InternalServerError", "DeviceMessageRateExceeded", "TopicsMessageRateExceeded"}
+
+    def __init__(self, url, server_key, timeout=10, batch_window=0.0, max_batch=1000, on_invalid=None):
+        self.url = url
+        self.server_key = server_key
+        self.timeout = timeout
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_claim = max_batch * 10
+        self.on_invalid = on_invalid        # called with a list of tokens FCM rejected
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"messages": 0, "notifications": 0, "http_calls": 0, "invalid_tokens": 0}
+
+    def session(self):
+        s = getattr(self._local, 'session', None)
+        if s is None:
+            s = requests.Session()
+            s.headers.update({
+                'Authorization': f'key={self.server_key}',
+                'Content-Type': 'application/json',
+            })
+            self._local.session = s
+        return s
+
+    def send(self, payload):
+        body = {
+            'to': payload['token'],
+            'notification': {'title': payload['title'], 'body': payload['body']}
+        }
+        resp = self.session().post(self.url, json=body, timeout=self.timeout)
+        self._bump(messages=1, notifications=1, http_calls=1)
+        # FCM answers 200 for a dead token too, the error is in results[]
+        err, = self._errors(resp, 1)
+        if err is not None:
+            if self._invalid_token(err):
+                self._prune([payload['token']])
+            raise err
+
+    def send_batch(self, payloads):
+        """Returns one error (or None) per payload, in order."""
+        errors = [None] * len(payloads)
+
+        # coalesce per token
+        per_token = {}
+        for i, p in enumerate(payloads):
+            per_token.setdefault(p['token'], []).append(i)
+        groups = {}
+        for token, idxs in per_token.items():
+            groups.setdefault(self.digest([payloads[i] for i in idxs]), []).append(token)
+
+        self._bump(messages=len(payloads), notifications=len(per_token))
+        invalid = []
+        for (title, body), tokens in groups.items():
+            for start in range(0, len(tokens), self.max_batch):
+                chunk = tokens[start:start + self.max_batch]
+                for token, err in zip(chunk, self._multicast(chunk, title, body)):
+                    if self._invalid_token(err):
+                        invalid.append(token)
+                    for i in per_token[token]:
+                        errors[i] = err
+
+        if invalid:
+            self._prune(invalid)
+        return errors
+
+    @classmethod
+    def digest(cls, payloads):
+        if len(payloads) == 1:
+            return payloads[0]['title'], payloads[0]['body']
+        titles = {p['title'] for p in payloads}
+        title = payloads[0]['title'] if len(titles) == 1 else "Rapid Rescue updates"
+        return f"{title} ({len(payloads)})", cls._join([p['body'] for p in payloads], cls.MAX_DIGEST_BYTES)
+
+    @staticmethod
+    def _join(bodies, budget):
+        """Bodies one per line, oldest first, within `budget` bytes; what doesn't fit becomes "… and K more"."""
+        lines, used = [], 0
+        for i, body in enumerate(bodies):
+            left = len(bodies) - i - 1
+            # room for the closing line if anything is still to come after this one
+            reserve = len(f"\n… and {left} more".encode()) if left else 0
+            size = len(body.encode()) + (1 if lines else 0)
+            if used + size + reserve > budget:
+                if lines:
+                    return "\n".join(lines) + f"\n… and {left + 1} more"
+                # even the first one is too long on its own
+                body = body.encode()[:max(budget - reserve - 3, 0)].decode(errors="ignore") + "…"
+                size = len(body.encode())
+            lines.append(body)
+            used += size
+        return "\n".join(lines)
+
+    def _multicast(self, tokens, title, body):
+        payload = {'registration_ids': tokens, 'notification': {'title': title, 'body': body}}
+        self._bump(http_calls=1)
+        try:
+            resp = self.session().post(self.url, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            return [e] * len(tokens)
+        return self._errors(resp, len(tokens))
+
+    def _errors(self, resp, n):
+        """One error (or None) per registration id of the request `resp` answers."""
+        if resp.status_code == 429 or resp.status_code >= 500:
+            return [RuntimeError(f"FCM HTTP {resp.status_code}")] * n
+        if resp.status_code >= 400:
+            return [PermanentError(f"FCM HTTP {resp.status_code}: {resp.text[:200]}")] * n
+        try:
+            results = resp.json().get('results') or []
+        except ValueError:
+            results = []
+        out = []
+        for i in range(n):
+            err = results[i].get('error') if i < len(results) else None
+            if err is None:
+                out.append(None)
+            elif err in self.RETRY_ERRORS:
+                out.append(RuntimeError(err))
+            else:
+                out.append(PermanentError(err))
+        return out
+
+    def _invalid_token(self, err):
+        return isinstance(err, PermanentError) and str(err) in self.INVALID_TOKEN_ERRORS
+
+    def _prune(self, tokens):
+        self._bump(invalid_tokens=len(tokens))
+        if self.on_invalid:
+            try:
+                self.on_invalid(tokens)
+            except Exception as e:
+                print("FCM Error: token cleanup failed:", e)
+
+    def _bump(self, **counts):
+        with self._stats_lock:
+            for k, v in counts.items():
+                self._stats[k] += v
+
+    def stats(self):
+        with self._stats_lock:
+            s = dict(self._stats)
+        s["http_calls_saved"] = s["messages"] - s["http_calls"]
+        return s
+
+    def close(self):
+        s = getattr(self._local, 'session', None)
+        self._local.session = None
+        if s is not None:
+            s.close()
+
+
+# ---------------- QUEUE ----------------
+class NotificationQueue:
+    def __init__(self, path, senders, workers=2, max_attempts=5, backoff=2.0, poll=1.0, claim_timeout=300.0):
+        self.path = path
+        self.senders = senders          # channel name -> sender with .send(payload)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.poll = poll
+        self.claim_timeout = claim_timeout
+        self._claim_lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._metrics_lock = threading.Lock()
+        self._metrics = {name: self._empty_metrics() for name in senders}
+        self._local = threading.local()
+        self._conn().conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _empty_metrics():
+        return {"enqueued": 0, "sent": 0, "retried": 0, "failed": 0, "send_seconds": 0.0}
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return _Tx(conn)
+
+    # ---------- producer side ----------
+    def enqueue(self, channel, payload):
+        if channel not in self.senders:
+            raise ValueError(f"unknown channel {channel!r}")
+        now = time.time()
+        # batching channels hold messages for a short window so they can be coalesced
+        due = now + getattr(self.senders[channel], 'batch_window', 0)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO outbox (channel, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                (channel, json.dumps(payload), due, now)
+            )
+        self._count(channel, "enqueued")
+        self.start()
+        with self._wake:
+            self._wake.notify()
+
+    # ---------- workers ----------
+    def start(self):
+        if self._threads:
+            return
+        with self._claim_lock:
+            if self._threads:
+                return
+            self._stopping = False
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"notify-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self, timeout=5):
+        self._stopping = True
+        with self._wake:
+            self._wake.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _claim(self):
+        """Claim the next due message, or every due message of a batching channel."""
+        with self._claim_lock, self._conn() as conn:
+            now = time.time()
+            # a claim holds a message for claim_timeout; one still "sending" after that belonged
+            # to a process that died mid-delivery (other app workers share this file, so a
+            # restart can't just reset every "sending" row)
+            row = conn.execute(
+                "SELECT id, channel, payload, attempts FROM outbox "
+                "WHERE status IN ('pending', 'sending') AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return []
+            rows = [row]
+            sender = self.senders.get(row[1])
+            if getattr(sender, 'batch_window', 0):
+                rows = conn.execute(
+                    "SELECT id, channel, payload, attempts FROM outbox "
+                    "WHERE status IN ('pending', 'sending') AND channel = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                    (row[1], now, sender.max_claim)
+                ).fetchall()
+            conn.executemany("UPDATE outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                             [(now + self.claim_timeout, r[0]) for r in rows])
+            return rows
+
+    def _run(self):
+        while not self._stopping:
+            rows = self._claim()
+            if not rows:
+                with self._wake:
+                    self._wake.wait(self.poll)
+                continue
+            if len(rows) == 1 and not getattr(self.senders.get(rows[0][1]), 'batch_window', 0):
+                self.deliver(*rows[0])
+            else:
+                self.deliver_batch(rows)
+        for sender in self.senders.values():
+            sender.close()
+
+    def deliver(self, msg_id, channel, payload, attempts):
+        sender = self.senders[channel]
+        t0 = time.perf_counter()
+        try:
+            sender.send(json.loads(payload))
+        except Exception as e:
+            metrics.observe(f"{channel}_delivery", time.perf_counter() - t0)
+            self._settle(channel, [(msg_id, attempts, e)], 0)
+            return False
+        seconds = time.perf_counter() - t0
+        metrics.observe(f"{channel}_delivery", seconds)
+        self._settle(channel, [(msg_id, attempts, None)], seconds)
+        return True
+
+    def deliver_batch(self, rows):
+        """rows all belong to one channel whose sender has send_batch()."""
+        channel = rows[0][1]
+        t0 = time.perf_counter()
+        try:
+            errors = self.senders[channel].send_batch([json.loads(r[2]) for r in rows])
+        except Exception as e:
+            errors = [e] * len(rows)
+        # one observation per request to the provider, not per message
+        metrics.observe(f"{channel}_delivery", time.perf_counter() - t0)
+        seconds = (time.perf_counter() - t0) / len(rows)
+        self._settle(channel, [(r[0], r[3], err) for r, err in zip(rows, errors)], seconds)
+
+    def _settle(self, channel, outcomes, seconds):
+        """outcomes: [(msg_id, attempts_so_far, error_or_None), ...]"""
+        done, failed, retry = [], [], []
+        now = time.time()
+        for msg_id, attempts, err in outcomes:
+            if err is None:
+                done.append((msg_id,))
+                continue
+            attempts += 1
+            if isinstance(err, PermanentError) or attempts >= self.max_attempts:
+                failed.append((attempts, str(err)[:500], msg_id))
+            else:
+                delay = self.backoff * (2 ** (attempts - 1))
+                retry.append((attempts, str(err)[:500], now + delay, msg_id))
+            print(f"{channel.upper()} Error:", err)
+        with self._conn() as conn:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", done)
+            conn.executemany(
+                "UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?", failed
+            )
+            conn.executemany(
+                "UPDATE outbox SET status = 'pending', attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                retry
+            )
+        for _ in done:
+            self._count(channel, "sent", seconds)
+        for _ in failed:
+            self._count(channel, "failed")
+        for _ in retry:
+            self._count(channel, "retried")
+
+    # ---------- metrics ----------
+    def _count(self, channel, key, seconds=None):
+        with self._metrics_lock:
+            m = self._metrics[channel]
+            m[key] += 1
+            if seconds is not None:
+                m["send_seconds"] += seconds
+
+    def metrics(self):
+        with self._metrics_lock:
+            snap = {name: dict(m) for name, m in self._metrics.items()}
+        with self._conn() as conn:
+            rows = conn.execute("SELECT channel, status, COUNT(*) FROM outbox GROUP BY channel, status").fetchall()
+        for name in snap:
+            snap[name]["pending"] = 0
+            snap[name]["dead"] = 0
+        for channel, status, n in rows:
+            if channel in snap:
+                snap[channel]["dead" if status == "failed" else "pending"] += n
+        for name, sender in self.senders.items():
+            if hasattr(sender, 'stats'):
+                snap[name].update(sender.stats())
+        for m in snap.values():
+            m["avg_send_ms"] = round(1000 * m["send_seconds"] / m["sent"], 2) if m["sent"] else None
+        return snap
+
+
+class _Tx:
+    """`with` wrapper giving a short BEGIN IMMEDIATE ... COMMIT around a connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
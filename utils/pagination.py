@@ -0,0 +1,129 @@
+# utils/pagination.py
+# Keyset ("seek") pagination on (created_at, id), newest first.
+#
+# Instead of OFFSET, each page remembers the last (created_at, id) it returned
+# and the next page starts strictly after it, so page 1000 costs the same as
+# page 1 as long as the order columns are indexed.
+#
+# keyset_page_then() pages through a second query once the first runs out (live
+# complaints, then the archived ones); its cursors say which of the two they are in.
+import base64
+import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+
+
+def encode_cursor(created_at, row_id, then=False):
+    raw = f"{created_at.isoformat()}|{row_id}" + ("|a" if then else "")
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def then_start_cursor():
+    """Cursor for "the first query is done, the second one's first page is next"."""
+    return base64.urlsafe_b64encode(b"|a").decode().rstrip("=")
+
+
+def _raw(token):
+    return base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+
+
+def decode_cursor(token):
+    """Returns (created_at, id). Raises ValueError for anything malformed."""
+    try:
+        created, row_id = _raw(token).rsplit("|", 1)
+        return datetime.datetime.fromisoformat(created), int(row_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def decode_then_cursor(token):
+    """
+    (cursor, then) for keyset_page_then(): cursor as decode_cursor() returns it, then True when
+    it points into the second query. The start cursor decodes to (None, True).
+    """
+    try:
+        raw = _raw(token)
+        then = raw.endswith("|a")
+        if raw == "|a":
+            return None, True
+        created, row_id = raw[:-2 if then else None].rsplit("|", 1)
+        return (datetime.datetime.fromisoformat(created), int(row_id)), then
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def parse_limit(value, default=DEFAULT_LIMIT):
+    try:
+        limit = int(value) if value else default
+    except (TypeError, ValueError):
+        raise ValueError("invalid limit")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def after(query, created_col, id_col, cursor):
+    if cursor is None:
+        return query
+    created, row_id = cursor
+    # written so the (created_at) index can seek straight to the start of the page
+    return query.filter(created_col <= created, or_(created_col < created, and_(created_col == created, id_col < row_id)))
+
+
+def keyset_page(query, created_col, id_col, cursor=None, limit=DEFAULT_LIMIT, conn=None, then=False):
+    """
+    One page of `query` (which must select created_col and id_col) newest first.
+    `query` is an ORM Query, or a Core select() run on `conn`.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    then: mark next_cursor as keyset_page_then()'s second query.
+    """
+    stmt = after(query, created_col, id_col, cursor).order_by(
+        created_col.desc(), id_col.desc()
+    ).limit(limit + 1)
+    rows = conn.execute(stmt).all() if conn is not None else stmt.all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key), then)
+
+
+def keyset_page_then(first, second, cursor=None, then=False, limit=DEFAULT_LIMIT, conn=None):
+    """
+    keyset_page() over `first`, then `second`, each a (query, created_col, id_col) selecting the
+    same columns: a page that runs out of `first` rows is topped up from `second` and the cursor
+    carries on there. (cursor, then) is decode_then_cursor() of the previous page's token.
+    Each query is newest first on its own; all of `first` comes before any of `second`.
+    """
+    if then:
+        return keyset_page(*second, cursor, limit, conn, then=True)
+    rows, token = keyset_page(*first, cursor, limit, conn)
+    if token is not None:
+        return rows, token
+    room = limit - len(rows)
+    if room == 0:
+        # `first` ends exactly on this page; only point at `second` if it has something
+        more, _ = keyset_page(*second, None, 1, conn)
+        return rows, then_start_cursor() if more else None
+    more, token = keyset_page(*second, None, room, conn, then=True)
+    return list(rows) + list(more), token
+
+
+def iter_keyset(query, created_col, id_col, batch=1000, conn=None, cursor=None):
+    """Every row of `query` (after `cursor`), newest first, fetched one page at a time."""
+    while True:
+        rows, token = keyset_page(query, created_col, id_col, cursor, batch, conn)
+        yield from rows
+        if token is None:
+            return
+        last = rows[-1]
+        cursor = (getattr(last, created_col.key), getattr(last, id_col.key))
+
+
+def iter_keyset_then(first, second, batch=1000, conn=None, cursor=None, then=False):
+    """Every row of keyset_page_then()'s two queries from (cursor, then) on."""
+    if not then:
+        yield from iter_keyset(*first, batch, conn, cursor)
+        cursor = None
+    yield from iter_keyset(*second, batch, conn, cursor)
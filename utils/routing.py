@@ -0,0 +1,231 @@
+# utils/routing.py
+# Road network travel times for dispatch, from a local OpenStreetMap extract.
+#
+# Loads the drivable ways of an .osm / .osm.gz / .osm.bz2 XML file into an
+# in-memory graph (edge weight = seconds at the road's speed), snaps points to
+# the nearest road node and answers node-to-node travel times with A*. Results
+# are kept in an LRU cache since officers and hotspots repeat. Fully offline.
+import bz2
+import gzip
+import heapq
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+from utils.spatial import OfficerIndex, haversine
+
+# km/h when a way has no usable maxspeed tag
+SPEEDS = {
+    "motorway": 90, "motorway_link": 50, "trunk": 70, "trunk_link": 45,
+    "primary": 55, "primary_link": 40, "secondary": 45, "secondary_link": 35,
+    "tertiary": 35, "tertiary_link": 30, "unclassified": 30, "residential": 25,
+    "living_street": 10, "service": 15, "road": 25,
+}
+ACCESS_KMH = 15         # getting from a point to the nearest road node and back off it
+MAX_SNAP_KM = 2.0       # further than this from any road = not routable
+
+
+def _open(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def _speed(tags):
+    raw = (tags.get("maxspeed") or "").strip().lower()
+    try:
+        if raw.endswith("mph"):
+            return float(raw[:-3]) * 1.609
+        return float(raw.split()[0])
+    except (ValueError, IndexError):
+        return SPEEDS[tags["highway"]]
+
+
+def _direction(tags):
+    """1 = forward only, -1 = backward only, 0 = both ways"""
+    oneway = tags.get("oneway", "").lower()
+    if oneway in ("yes", "true", "1"):
+        return 1
+    if oneway == "-1":
+        return -1
+    if oneway == "no":
+        return 0
+    return 1 if tags["highway"] == "motorway" or tags.get("junction") == "roundabout" else 0
+
+
+class RoadGraph:
+    """
+    nodes are 0..n-1; lat[i], lon[i]; adj[i] = [(j, seconds), ...].
+    Build with RoadGraph.load(path) or from_edges() for synthetic networks.
+    """
+
+    def __init__(self, lat, lon, adj, cache_size=100000):
+        self.lat, self.lon, self.adj = lat, lon, adj
+        self.max_speed = max([SPEEDS["motorway"]] + [
+            haversine(lat[i], lon[i], lat[j], lon[j]) / s * 3600 for i, edges in enumerate(adj) for j, s in edges if s
+        ])
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self._snap = OfficerIndex(cell_km=0.5)
+        self._snap.load((i, lat[i], lon[i]) for i in self._main_component())
+
+    @classmethod
+    def load(cls, path, cache_size=100000):
+        coords = {}     # osm node id -> (lat, lon)
+        ways = []       # ([osm node ids], seconds-per-km factor, direction)
+        with _open(path) as f:
+            for _, el in ET.iterparse(f, events=("end",)):
+                if el.tag == "node":
+                    coords[int(el.get("id"))] = (float(el.get("lat")), float(el.get("lon")))
+                elif el.tag == "way":
+                    tags = {t.get("k"): t.get("v") for t in el.iter("tag")}
+                    if tags.get("highway") in SPEEDS:
+                        refs = [int(nd.get("ref")) for nd in el.iter("nd")]
+                        ways.append((refs, 3600.0 / max(_speed(tags), 1.0), _direction(tags)))
+                elif el.tag == "relation":
+                    el.clear()
+                    continue
+                else:
+                    continue
+                el.clear()
+
+        index, edges = {}, []
+        for refs, secs_per_km, direction in ways:
+            refs = [r for r in refs if r in coords]
+            for a, b in zip(refs, refs[1:]):
+                for r in (a, b):
+                    if r not in index:
+                        index[r] = len(index)
+                seconds = haversine(*coords[a], *coords[b]) * secs_per_km
+                edges.append((index[a], index[b], seconds, direction))
+        lat = [0.0] * len(index)
+        lon = [0.0] * len(index)
+        for ref, i in index.items():
+            lat[i], lon[i] = coords[ref]
+        return cls.from_edges(lat, lon, edges, cache_size)
+
+    @classmethod
+    def from_edges(cls, lat, lon, edges, cache_size=100000):
+        """edges: (a, b, seconds, direction) with direction as in _direction()."""
+        adj = [[] for _ in lat]
+        for a, b, seconds, direction in edges:
+            if direction >= 0:
+                adj[a].append((b, seconds))
+            if direction <= 0:
+                adj[b].append((a, seconds))
+        return cls(lat, lon, adj, cache_size)
+
+    def __len__(self):
+        return len(self.adj)
+
+    def _main_component(self):
+        # snap only onto the biggest connected piece, a stray fragment would make everything unreachable
+        undirected = [set() for _ in self.adj]
+        for a, edges in enumerate(self.adj):
+            for b, _ in edges:
+                undirected[a].add(b)
+                undirected[b].add(a)
+        seen, best = [False] * len(self.adj), []
+        for start in range(len(self.adj)):
+            if seen[start]:
+                continue
+            seen[start] = True
+            comp, stack = [], [start]
+            while stack:
+                n = stack.pop()
+                comp.append(n)
+                for m in undirected[n]:
+                    if not seen[m]:
+                        seen[m] = True
+                        stack.append(m)
+            if len(comp) > len(best):
+                best = comp
+        return best
+
+    # ---------- queries ----------
+    def snap(self, lat, lon):
+        """(node, km away) of the nearest road node, or None if there is no road within MAX_SNAP_KM."""
+        found = self._snap.k_nearest(lat, lon, 1, MAX_SNAP_KM)
+        return found[0] if found else None
+
+    def node_time(self, src, dst):
+        """Seconds from node src to node dst (None if unreachable), cached."""
+        key = (src, dst)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+        seconds = self._astar(src, dst)
+        with self._lock:
+            self._cache[key] = seconds
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return seconds
+
+    def travel_time(self, from_lat, from_lon, to_lat, to_lon):
+        """Seconds to drive from one point to another, None if either is off the network or unreachable."""
+        a, b = self.snap(from_lat, from_lon), self.snap(to_lat, to_lon)
+        if a is None or b is None:
+            return None
+        seconds = self.node_time(a[0], b[0])
+        if seconds is None:
+            return None
+        return seconds + (a[1] + b[1]) / ACCESS_KMH * 3600
+
+    def rank(self, lat, lon, candidates):
+        """
+        candidates: [(id, lat, lon)] travelling to (lat, lon), best guess first (e.g. straight line).
+        Returns [(id, seconds)] fastest first; unreachable ones last with seconds None, still in
+        the order they came in.
+        """
+        target = self.snap(lat, lon)
+        ranked = []
+        for cid, clat, clon in candidates:
+            seconds = None
+            if target is not None:
+                src = self.snap(clat, clon)
+                if src is not None:
+                    path = self.node_time(src[0], target[0])
+                    if path is not None:
+                        seconds = path + (src[1] + target[1]) / ACCESS_KMH * 3600
+            ranked.append((cid, seconds))
+        # stable: ties and unroutable candidates keep the caller's order
+        ranked.sort(key=lambda r: (r[1] is None, r[1] or 0))
+        return ranked
+
+    def cache_stats(self):
+        with self._lock:
+            return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    def _astar(self, src, dst):
+        if src == dst:
+            return 0.0
+        lat, lon, adj = self.lat, self.lon, self.adj
+        tlat, tlon = lat[dst], lon[dst]
+        secs_per_km = 3600.0 / self.max_speed    # admissible: nothing is faster than the fastest road
+
+        def h(n):
+            return haversine(lat[n], lon[n], tlat, tlon) * secs_per_km
+
+        best = {src: 0.0}
+        heap = [(h(src), 0.0, src)]
+        done = set()
+        while heap:
+            _, g, n = heapq.heappop(heap)
+            if n == dst:
+                return g
+            if n in done:
+                continue
+            done.add(n)
+            for m, w in adj[n]:
+                ng = g + w
+                if ng < best.get(m, float("inf")):
+                    best[m] = ng
+                    heapq.heappush(heap, (ng + h(m), ng, m))
+        return None
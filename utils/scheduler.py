@@ -0,0 +1,158 @@
+# utils/scheduler.py
+# Waiting-complaint queue for dispatch.
+#
+# A complaint that finds no officer at intake waits here instead of sitting in
+# "New" forever. Order is severity first, then how long it has waited: each
+# incident type gets a head start in minutes, so a violent incident filed now
+# outranks a theft filed up to 30 minutes ago, and a theft that has waited long
+# enough still gets served. Since every entry ages at the same rate the order
+# never changes and a plain heap keyed on (created - head start) is enough.
+#
+# The search radius for a waiting complaint grows with its wait, from base_km up
+# to max_km, after which any officer will do.
+import heapq
+import threading
+import time
+from collections import deque
+
+# minutes of head start per incident type (lower-cased); anything else gets DEFAULT_HEAD_START
+HEAD_START = {"violence": 30, "accident": 30, "theft": 10, "other": 0}
+DEFAULT_HEAD_START = 0
+
+
+def head_start(incident_type):
+    return HEAD_START.get((incident_type or "").strip().lower(), DEFAULT_HEAD_START)
+
+
+class DispatchQueue:
+    def __init__(self, base_km=10.0, growth_km_per_min=2.0, max_km=50.0):
+        self.base_km = base_km
+        self.growth = growth_km_per_min
+        self.max_km = max_km
+        self._lock = threading.Lock()
+        self._heap = []         # (key, complaint_id)
+        self._entries = {}      # complaint_id -> (lat, lon, created_ts, head_start_min)
+        self._waits = deque(maxlen=1000)    # seconds from filing to assignment, recent assignments
+        self.loaded = False
+        self.queued = 0
+        self.assigned = 0
+        self.handoffs = 0
+        self.escalated = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---------- membership ----------
+    def push(self, complaint_id, lat, lon, incident_type, created_ts):
+        if lat is None or lon is None:
+            return False    # nowhere to search from, left for manual assignment
+        hs = head_start(incident_type)
+        with self._lock:
+            if complaint_id in self._entries:
+                return False
+            self._entries[complaint_id] = (lat, lon, created_ts, hs)
+            heapq.heappush(self._heap, (created_ts - hs * 60, complaint_id))
+            self.queued += 1
+        return True
+
+    def discard(self, complaint_id, assigned_at=None):
+        """Drop a complaint that no longer waits; pass assigned_at to count its time-to-assign."""
+        with self._lock:
+            entry = self._entries.pop(complaint_id, None)
+            if entry is None:
+                return False
+            if assigned_at is not None:
+                self.assigned += 1
+                self._waits.append(max(0.0, assigned_at - entry[2]))
+            # heap entry goes stale and is skipped, compact when mostly garbage
+            if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+                self._heap = [(k, cid) for k, cid in self._heap if cid in self._entries]
+                heapq.heapify(self._heap)
+        return True
+
+    def load(self, rows):
+        """Rebuild from (id, lat, lon, incident_type, created_ts) rows of waiting complaints."""
+        with self._lock:
+            self._heap, self._entries = [], {}
+        for row in rows:
+            self.push(*row)
+        self.loaded = True
+
+    # ---------- ordering ----------
+    def radius(self, waited_s):
+        """Search radius in km after waiting this long, None once it has outgrown max_km."""
+        km = self.base_km + self.growth * waited_s / 60
+        return None if km > self.max_km else km
+
+    def waiting(self, now=None):
+        """[(complaint_id, lat, lon, radius_km)] highest priority first."""
+        now = time.time() if now is None else now
+        with self._lock:
+            order = sorted(self._heap)
+            entries = dict(self._entries)
+        out = []
+        for _, cid in order:
+            entry = entries.pop(cid, None)
+            if entry is None:
+                continue
+            lat, lon, created, _ = entry
+            out.append((cid, lat, lon, self.radius(now - created)))
+        return out
+
+    def candidates_for(self, lat, lon, distance, now=None):
+        """
+        Waiting complaints an officer at (lat, lon) is within range of, best first.
+        distance(lat1, lon1, lat2, lon2) -> km.
+        """
+        for cid, clat, clon, radius in self.waiting(now):
+            if radius is None or distance(lat, lon, clat, clon) <= radius:
+                yield cid
+
+    # ---------- metrics ----------
+    def metrics(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = list(self._entries.values())
+            waits = sorted(self._waits)
+        by_head_start = {}
+        for _, _, _, hs in entries:
+            by_head_start[hs] = by_head_start.get(hs, 0) + 1
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(len(waits) * p / 100))], 1) if waits else None
+
+        return {
+            "depth": len(entries),
+            "depth_by_head_start_min": by_head_start,
+            "oldest_wait_s": round(max((now - e[2] for e in entries), default=0), 1),
+            "queued": self.queued,
+            "assigned": self.assigned,
+            "handoffs": self.handoffs,
+            "escalated": self.escalated,
+            "time_to_assign_s": {"p50": pct(50), "p95": pct(95), "max": round(waits[-1], 1) if waits else None},
+        }
+
+
+class Ticker:
+    """Calls run() every `interval` seconds on a daemon thread, started by the first start()."""
+
+    def __init__(self, interval, run, name="dispatch-queue"):
+        self.interval = interval
+        self.run = run
+        self.name = name
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,157 @@
+# utils/search.py
+# Full-text complaint search on the complaint_fts FTS5 table (migration 2).
+#
+# Results are ranked with BM25 and paged with a keyset cursor on (score, id)
+# rather than OFFSET. Scoring every match of a common word is what makes FTS
+# slow on big tables, so only the newest `candidates` matches (after filters)
+# are ranked; older ones are reachable by narrowing the query or time range.
+# Every search says whether that window cut any matches off (`truncated`).
+#
+# search_all() continues into complaint_archive_fts (migration 4) once the live
+# table has no more matches, so archived complaints are still found, after the live ones.
+# It doesn't after a truncated live window: the live matches it skipped are newer.
+import base64
+import re
+
+from sqlalchemy import DateTime, bindparam, text
+
+# bm25() column weights, in complaint_fts column order
+WEIGHTS = {"description": 1.0, "location": 3.0, "incident_type": 2.0, "reporter_name": 1.0}
+
+RESULT_COLUMNS = "c.id, c.ref_id, c.status, c.incident_type, c.location, c.latitude, c.longitude, " \
+                 "c.assigned_officer_id, c.created_at"
+
+
+def build_match(q):
+    """
+    Turn free text into a safe FTS5 query: every word must match (AND), a
+    trailing * keeps prefix search. Returns None if there is nothing to search.
+    """
+    terms = []
+    for word, star in re.findall(r"(\w+)(\*?)", q or "", re.UNICODE):
+        terms.append(f'"{word}"{star}')
+    return " ".join(terms) or None
+
+
+# live table, archive table
+SOURCES = {False: ("complaint_fts", "complaint"), True: ("complaint_archive_fts", "complaint_archive")}
+
+
+def encode_cursor(score, row_id, floor, archived=False):
+    raw = f"{score!r}|{row_id}|{floor}" + ("|a" if archived else "")
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def archive_start_cursor():
+    """Cursor for "live matches are done, the archive's first page is next"."""
+    return base64.urlsafe_b64encode(b"||a").decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    (score, id, floor, archived) -- floor pins the candidate window so pages stay consistent.
+    The archive start cursor decodes to (None, None, None, True).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        if raw == "||a":
+            return None, None, None, True
+        parts = raw.split("|")
+        score, row_id, floor = parts[:3]
+        return float(score), int(row_id), int(floor), parts[3:] == ["a"]
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def search_complaints(session, q, statuses=None, since=None, until=None, bbox=None, cursor=None, limit=50,
+                      candidates=2000, archive=False):
+    """
+    statuses: list of status values, since/until: datetimes,
+    bbox: (min_lat, min_lon, max_lat, max_lon), cursor: decode_cursor() of the previous page's token.
+    archive: search the archive tables instead of the live ones.
+    Returns (rows, next_cursor, truncated), truncated meaning there are more matches than the
+    `candidates` newest that were ranked. Lower score = better match (that's how bm25() counts).
+    """
+    match = build_match(q)
+    if match is None:
+        return [], None, False
+    fts, table = SOURCES[archive]
+
+    where = [f"{fts} MATCH :match"]
+    params = {"match": match, "limit": limit + 1}
+    if statuses:
+        names = [f":status{i}" for i in range(len(statuses))]
+        where.append(f"c.status IN ({', '.join(names)})")
+        params.update({n[1:]: s for n, s in zip(names, statuses)})
+    if since is not None:
+        where.append("c.created_at >= :since")
+        params["since"] = since
+    if until is not None:
+        where.append("c.created_at < :until")
+        params["until"] = until
+    if bbox is not None:
+        where.append("c.latitude BETWEEN :min_lat AND :max_lat AND c.longitude BETWEEN :min_lon AND :max_lon")
+        params.update(zip(("min_lat", "min_lon", "max_lat", "max_lon"), bbox))
+
+    def typed(sql):
+        stmt = text(sql).columns(created_at=DateTime)
+        if "since" in params:
+            stmt = stmt.bindparams(bindparam("since", type_=DateTime))
+        if "until" in params:
+            stmt = stmt.bindparams(bindparam("until", type_=DateTime))
+        return stmt
+
+    source = f"FROM {fts} JOIN {table} c ON c.id = {fts}.rowid WHERE {' AND '.join(where)}"
+    if cursor is not None and cursor[0] is not None:
+        floor = cursor[2]
+    else:
+        cursor = None
+        # rowid of the oldest match inside the candidate window, 0 when the window holds every
+        # match (FTS5 walks rowids newest first cheaply)
+        edge = session.execute(
+            typed(f"SELECT {fts}.rowid {source} ORDER BY {fts}.rowid DESC LIMIT 2 OFFSET :skip"),
+            {**params, "skip": candidates - 1}
+        ).scalars().all()
+        floor = edge[0] if len(edge) == 2 else 0
+    truncated = floor > 0
+
+    weights = ", ".join(str(w) for w in WEIGHTS.values())
+    sql = (
+        f"SELECT * FROM (SELECT {RESULT_COLUMNS}, {int(archive)} AS archived, bm25({fts}, {weights}) AS score "
+        f"{source} AND {fts}.rowid >= :floor)"
+    )
+    params["floor"] = floor
+    if cursor is not None:
+        sql += " WHERE score > :score OR (score = :score AND id > :after_id)"
+        params["score"], params["after_id"] = cursor[0], cursor[1]
+    sql += " ORDER BY score, id LIMIT :limit"
+
+    rows = session.execute(typed(sql), params).all()
+    if len(rows) <= limit:
+        return rows, None, truncated
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].score, rows[-1].id, floor, archive), truncated
+
+
+def search_all(session, q, statuses=None, since=None, until=None, bbox=None, cursor=None, limit=50,
+               candidates=2000, archive=True):
+    """
+    search_complaints() over the live table, then the archive: a page that runs out of
+    live matches is topped up from the archive and the cursor carries on there.
+    Scores of the two tables aren't comparable, so live matches always come first.
+    A truncated live window ends the search there, still reported as truncated: older live
+    matches were skipped, so moving on to even older archived ones would hide that.
+    """
+    filters = (statuses, since, until, bbox)
+    if cursor is not None and cursor[3]:
+        return search_complaints(session, q, *filters, cursor, limit, candidates, archive=True)
+    rows, next_cursor, truncated = search_complaints(session, q, *filters, cursor, limit, candidates)
+    if next_cursor is not None or truncated or not archive:
+        return rows, next_cursor, truncated
+    room = limit - len(rows)
+    if room == 0:
+        # live matches end exactly on this page; only point at the archive if it has something
+        more, _, _ = search_complaints(session, q, *filters, None, 1, candidates, archive=True)
+        return rows, archive_start_cursor() if more else None, False
+    more, next_cursor, truncated = search_complaints(session, q, *filters, None, room, candidates, archive=True)
+    return list(rows) + list(more), next_cursor, truncated
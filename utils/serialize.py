@@ -0,0 +1,76 @@
+# utils/serialize.py
+# JSON output for the REST API.
+#
+# FastJSONProvider swaps Flask's encoder for orjson when it is installed (plain
+# json otherwise) without changing the wire format: datetimes still go out as
+# HTTP dates and keys stay sorted. Projection names the columns an endpoint
+# returns, so it can select them with Core and build dicts straight from the
+# row tuples. ndjson() streams rows in chunks for results too big for one page.
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select
+
+try:
+    import orjson
+except ImportError:     # optional, see requirements.txt
+    orjson = None
+
+_default = DefaultJSONProvider.default
+
+
+def dumps(obj, sort_keys=False):
+    """obj as compact UTF-8 JSON bytes, Flask's conventions for dates, UUIDs, dataclasses."""
+    if orjson is not None:
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+    import json
+    return json.dumps(obj, default=_default, sort_keys=sort_keys, separators=(",", ":")).encode()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, self.sort_keys).decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, self.sort_keys) + b"\n", mimetype=self.mimetype)
+
+
+class Projection:
+    """
+    Output fields of one endpoint: Projection(id=Complaint.id, assigned_officer=Complaint.assigned_officer_id).
+    `extra` columns are selected but not output (e.g. created_at for the page cursor).
+    """
+
+    def __init__(self, extra=(), **fields):
+        self.names = tuple(fields)
+        # identity check, == on columns builds SQL
+        self.columns = tuple(fields.values()) + tuple(c for c in extra if not any(c is f for f in fields.values()))
+
+    def select(self):
+        return select(*self.columns)
+
+    def row(self, r):
+        # extra columns come last, zip stops before them
+        return dict(zip(self.names, r))
+
+    def rows(self, rows):
+        names = self.names
+        return [dict(zip(names, r)) for r in rows]
+
+
+def ndjson(rows, row_to_dict, chunk=500):
+    """Generator of NDJSON bytes, `chunk` lines per write."""
+    buf = []
+    for r in rows:
+        buf.append(dumps(row_to_dict(r)))
+        if len(buf) >= chunk:
+            yield b"\n".join(buf) + b"\n"
+            buf = []
+    if buf:
+        yield b"\n".join(buf) + b"\n"
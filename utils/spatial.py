@@ -0,0 +1,185 @@
+# utils/spatial.py
+# In-memory spatial index of officer positions for dispatch.
+#
+# Positions are stored as unit vectors on the sphere and bucketed in a uniform
+# 3D grid. Straight-line (chord) distance between unit vectors grows with the
+# great-circle distance, so searching grid rings outward from the query cell
+# finds the same nearest officers as a full haversine scan while only touching
+# nearby cells.
+import threading
+from math import radians, cos, sin, asin, sqrt, floor
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    return EARTH_RADIUS_KM * c
+
+
+def to_unit_vector(lat, lon):
+    la, lo = radians(lat), radians(lon)
+    return (cos(la) * cos(lo), cos(la) * sin(lo), sin(la))
+
+
+def has_position(lat, lon):
+    # same rule as the old brute force dispatch: 0 / None means "no position"
+    return bool(lat) and bool(lon)
+
+
+class OfficerIndex:
+    """
+    Grid index over available officers.
+
+    update() / remove() are O(1); nearest() and k_nearest() visit only the grid
+    rings that can still contain a closer officer. Results (including tie
+    breaking on the lowest officer id) match a brute force haversine scan.
+    """
+
+    def __init__(self, cell_km=5.0):
+        self.cell = cell_km / EARTH_RADIUS_KM   # cell edge in chord units
+        self._lock = threading.RLock()
+        self._cells = {}        # cell key -> {officer_id: (lat, lon)}
+        self._where = {}        # officer_id -> cell key
+        self._unlocated = set() # available officers without a position
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._where) + len(self._unlocated)
+
+    def _key(self, lat, lon):
+        x, y, z = to_unit_vector(lat, lon)
+        c = self.cell
+        return (floor(x / c), floor(y / c), floor(z / c))
+
+    # ---------- updates ----------
+    def update(self, officer_id, lat, lon, available=True):
+        with self._lock:
+            self._discard(officer_id)
+            if not available:
+                return
+            if not has_position(lat, lon):
+                self._unlocated.add(officer_id)
+                return
+            key = self._key(lat, lon)
+            self._cells.setdefault(key, {})[officer_id] = (lat, lon)
+            self._where[officer_id] = key
+
+    def move(self, officer_id, lat, lon):
+        """New position for an officer already in the index; busy officers stay out."""
+        with self._lock:
+            if officer_id not in self._where and officer_id not in self._unlocated:
+                return False
+            self.update(officer_id, lat, lon)
+            return True
+
+    def remove(self, officer_id):
+        with self._lock:
+            self._discard(officer_id)
+
+    def _discard(self, officer_id):
+        self._unlocated.discard(officer_id)
+        key = self._where.pop(officer_id, None)
+        if key is not None:
+            bucket = self._cells[key]
+            bucket.pop(officer_id, None)
+            if not bucket:
+                del self._cells[key]
+
+    def load(self, rows):
+        """Rebuild from (officer_id, lat, lon) rows of available officers."""
+        with self._lock:
+            self.clear()
+            for oid, lat, lon in rows:
+                self.update(oid, lat, lon)
+            self.loaded = True
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._where.clear()
+            self._unlocated.clear()
+            self.loaded = False
+
+    # ---------- queries ----------
+    def position(self, officer_id):
+        """(lat, lon) the index has for an officer, or None."""
+        with self._lock:
+            key = self._where.get(officer_id)
+            return self._cells[key][officer_id] if key is not None else None
+
+    def nearest(self, lat, lon):
+        """Officer id nearest to (lat, lon), or None."""
+        found = self.k_nearest(lat, lon, 1)
+        if found:
+            return found[0][0]
+        with self._lock:
+            # brute force picked the first officer even when nobody had a position
+            return min(self._unlocated) if self._unlocated else None
+
+    def k_nearest(self, lat, lon, k=1, max_km=None):
+        """[(officer_id, distance_km), ...] sorted by distance, then id."""
+        if lat is None or lon is None or k <= 0:
+            return []
+        qx, qy, qz = to_unit_vector(lat, lon)
+        c = self.cell
+        cx, cy, cz = floor(qx / c), floor(qy / c), floor(qz / c)
+
+        with self._lock:
+            if not self._cells:
+                return []
+            best = []   # (dist, officer_id)
+            seen_cells = 0
+            r = 0
+            while seen_cells < len(self._cells):
+                # every officer in ring r is at least (r - 1) cells away in chord units
+                if len(best) >= k:
+                    bound_km = 2 * EARTH_RADIUS_KM * asin(min(1.0, max(0, r - 1) * c / 2))
+                    if bound_km > best[k - 1][0] + 1e-9:
+                        break
+                if max_km is not None:
+                    if 2 * EARTH_RADIUS_KM * asin(min(1.0, max(0, r - 1) * c / 2)) > max_km:
+                        break
+                ring = self._ring(cx, cy, cz, r)
+                if ring is None:
+                    # the ring is larger than the occupied grid, scan what's left instead
+                    for key, bucket in self._cells.items():
+                        if max(abs(key[0] - cx), abs(key[1] - cy), abs(key[2] - cz)) >= r:
+                            self._collect(bucket, lat, lon, best)
+                    break
+                for key in ring:
+                    bucket = self._cells.get(key)
+                    if bucket:
+                        seen_cells += 1
+                        self._collect(bucket, lat, lon, best)
+                best.sort()
+                r += 1
+
+            best.sort()
+            if max_km is not None:
+                best = [b for b in best if b[0] <= max_km]
+            return [(oid, d) for d, oid in best[:k]]
+
+    def _collect(self, bucket, lat, lon, best):
+        for oid, (olat, olon) in bucket.items():
+            best.append((haversine(lat, lon, olat, olon), oid))
+
+    def _ring(self, cx, cy, cz, r):
+        if r == 0:
+            return [(cx, cy, cz)]
+        size = (2 * r + 1) ** 3 - (2 * r - 1) ** 3
+        if size > 4 * len(self._cells):
+            return None
+        keys = []
+        for dx in range(-r, r + 1):
+            for dy in range(-r, r + 1):
+                if abs(dx) == r or abs(dy) == r:
+                    for dz in range(-r, r + 1):
+                        keys.append((cx + dx, cy + dy, cz + dz))
+                else:
+                    keys.append((cx + dx, cy + dy, cz - r))
+                    keys.append((cx + dx, cy + dy, cz + r))
+        return keys
@@ -0,0 +1,104 @@
+# utils/stats.py
+# Materialized complaint counters.
+#
+# complaint_stats holds one row per (dimension, bucket). Every ComplaintHistory
+# insert turns into a handful of upserts on the same connection, so the
+# counters commit (or roll back) together with the change that caused them and
+# reading them never touches the complaint table.
+import datetime
+from collections import defaultdict
+
+from sqlalchemy import inspect, text
+
+TERMINAL = {"resolved", "closed"}
+
+UPSERT = text(
+    "INSERT INTO complaint_stats (dimension, bucket, value) VALUES (:d, :b, :v) "
+    "ON CONFLICT (dimension, bucket) DO UPDATE SET value = complaint_stats.value + excluded.value"
+)
+
+
+def hour_bucket(ts):
+    return ts.strftime("%Y-%m-%dT%H") if ts else "unknown"
+
+
+def _open(status, officer_id):
+    # an officer is "busy" with a complaint from assignment until it's resolved / closed
+    return bool(officer_id) and status not in (None, "New") and status.lower() not in TERMINAL
+
+
+def history_deltas(old_status, new_status, officer_id, incident_type, created_at):
+    """Counter changes for one history row, as {(dimension, bucket): delta}."""
+    d = defaultdict(int)
+    if old_status is None:
+        d[("total", "all")] += 1
+        d[("incident_type", incident_type or "Unknown")] += 1
+        d[("hour", hour_bucket(created_at))] += 1
+    else:
+        d[("status", old_status)] -= 1
+    d[("status", new_status)] += 1
+    if officer_id:
+        if new_status == "Assigned" and old_status != "Assigned":
+            d[("officer_assigned", str(officer_id))] += 1
+        d[("officer_open", str(officer_id))] += _open(new_status, officer_id) - _open(old_status, officer_id)
+    return {k: v for k, v in d.items() if v}
+
+
+def apply_deltas(conn, deltas):
+    if deltas:
+        conn.execute(UPSERT, [{"d": d, "b": b, "v": v} for (d, b), v in deltas.items()])
+
+
+def backfill(conn):
+    """Rebuild every counter from the complaint table and its archive (migration / repair)."""
+    conn.execute(text("DELETE FROM complaint_stats"))
+    totals = defaultdict(int)
+    sql = "SELECT status, assigned_officer_id, incident_type, created_at FROM complaint"
+    if inspect(conn).has_table("complaint_archive"):
+        # archived complaints still count, see utils/archive.py
+        sql += " UNION ALL SELECT status, assigned_officer_id, incident_type, created_at FROM complaint_archive"
+    rows = conn.execute(text(sql))
+    for status, officer_id, incident_type, created_at in rows:
+        if isinstance(created_at, str):
+            created_at = _parse(created_at)
+        totals[("total", "all")] += 1
+        totals[("status", status)] += 1
+        totals[("incident_type", incident_type or "Unknown")] += 1
+        totals[("hour", hour_bucket(created_at))] += 1
+        if officer_id:
+            totals[("officer_assigned", str(officer_id))] += 1
+            totals[("officer_open", str(officer_id))] += _open(status, officer_id)
+    apply_deltas(conn, {k: v for k, v in totals.items() if v})
+
+
+def _parse(value):
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def read_stats(conn, since_hour=None):
+    """Counters grouped by dimension; hours limited to >= since_hour when given."""
+    out = {"total": 0, "by_status": {}, "by_incident_type": {}, "by_officer": {}, "by_hour": {}}
+    sql = "SELECT dimension, bucket, value FROM complaint_stats WHERE dimension != 'hour'"
+    rows = list(conn.execute(text(sql)))
+    if since_hour is not None:
+        rows += list(conn.execute(
+            text("SELECT dimension, bucket, value FROM complaint_stats WHERE dimension = 'hour' AND bucket >= :h"),
+            {"h": since_hour}
+        ))
+    for dimension, bucket, value in rows:
+        if dimension == "total":
+            out["total"] = value
+        elif dimension == "status":
+            if value:
+                out["by_status"][bucket] = value
+        elif dimension == "incident_type":
+            out["by_incident_type"][bucket] = value
+        elif dimension == "hour":
+            out["by_hour"][bucket] = value
+        elif dimension in ("officer_assigned", "officer_open"):
+            entry = out["by_officer"].setdefault(bucket, {"assigned": 0, "open": 0})
+            entry["assigned" if dimension == "officer_assigned" else "open"] = value
+    return out
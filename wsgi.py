@@ -0,0 +1,16 @@
+# wsgi.py
+# WSGI entry point for process-based servers:
+#
+#   gunicorn -w 4 --threads 8 -b 0.0.0.0:5000 wsgi:app
+#
+# Every worker process imports this and builds its own app; MULTIPROCESS=1
+# keeps their in-memory state in step (see utils/coordination.py). Don't use
+# --preload: the background threads and DB connections have to start in the
+# workers, not in the master before it forks.
+import os
+
+os.environ.setdefault("MULTIPROCESS", "1")
+
+from app import create_app
+
+app = create_app()